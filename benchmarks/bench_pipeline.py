@@ -0,0 +1,191 @@
+"""
+Pipeline benchmark: parse -> sort -> transform -> CSV write -> discrepancy check over synthetic
+histories from one week to ten years, with throughput, peak memory and per-stage timings.
+
+    python benchmarks/bench_pipeline.py --sizes 1w,1y,10y
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-20250719-101500.json
+
+Results are saved as JSON under benchmarks/results/ (or --output) so runs can be compared.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+from synthetic_datalist import DEFAULT_SEED, SIZES, generate_history, payload
+from novatime_time import annotate_timestamps, parse_date, parse_datetime, format_work_date
+from record_transform import compile_profile
+from fetch_historical_timesheet import HISTORICAL_COLUMNS, historical_sort_key, iter_historical_rows
+from timeCardChecker import check_discrepancies
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+TIMECARD_COLUMNS, build_timecard_row = compile_profile("timecard")
+MIN_COMPARED_SECONDS = 0.001
+
+
+def write_csv(path, columns, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def run_pipeline(body, workdir, stage):
+    """
+    Runs every stage once over the response body; `stage(name, func)` runs and measures one.
+    Returns the number of discrepancies found, so the work can't be skipped unnoticed.
+    """
+    for cache in (parse_date, parse_datetime, format_work_date):
+        cache.cache_clear()  # Every run starts cold, as a fresh process would
+    records = stage("parse", lambda: json.loads(body)["DataList"])
+    ordered = stage("sort", lambda: sorted(annotate_timestamps(records), key=historical_sort_key))
+    layouts = {
+        "timecard": (TIMECARD_COLUMNS, lambda: [build_timecard_row(rec) for rec in records]),
+        "historical": (HISTORICAL_COLUMNS, lambda: list(iter_historical_rows(ordered))),
+    }
+    found = 0
+    for layout, (columns, transform) in layouts.items():
+        rows = stage(f"transform.{layout}", transform)
+        path = os.path.join(workdir, f"{layout}.csv")
+        stage(f"csv_write.{layout}", lambda: write_csv(path, columns, rows))
+        found += len(stage(f"check.{layout}", lambda: check_discrepancies(pd.read_csv(path))))
+    return found
+
+
+def measure(body, repeat, workdir, trace_memory):
+    """Best-of-`repeat` seconds per stage, plus the peak traced memory during each stage from one extra run."""
+    seconds = {}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        seconds[name] = min(seconds.get(name, elapsed), elapsed)
+        return result
+
+    found = None
+    for _ in range(repeat):
+        found = run_pipeline(body, workdir, timed)
+
+    peaks = {}
+    if trace_memory:
+        def traced(name, func):
+            tracemalloc.reset_peak()
+            result = func()
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            return result
+
+        tracemalloc.start()
+        run_pipeline(body, workdir, traced)
+        tracemalloc.stop()
+    return seconds, peaks, found
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path, threshold):
+    """Prints per-stage time ratios against an earlier result file. Returns the regressions."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {result["size"]: result for result in json.load(f)["results"]}
+    regressions = []
+    print(f"\nvs {previous_path}")
+    for result in current["results"]:
+        before = previous.get(result["size"])
+        if not before:
+            continue
+        for name, stage in result["stages"].items():
+            old = before["stages"].get(name)
+            if not old:
+                continue
+            ratio = stage["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+            flag = ""
+            # Sub-millisecond stages are mostly timer noise
+            if ratio > 1 + threshold and old["seconds"] >= MIN_COMPARED_SECONDS:
+                flag = "  <-- slower"
+                regressions.append((result["size"], name, ratio))
+            print(f"{result['size']:>4} {name:<22} {old['seconds']:>9.4f}s -> {stage['seconds']:>9.4f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1w,1y,10y", help=f"comma-separated days or names ({', '.join(SIZES)})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--discrepancy-rate", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/pipeline-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    args = parser.parse_args()
+
+    # A fixed end date keeps the generated histories identical between runs
+    end = datetime(2025, 7, 19).date()
+    report = {
+        "benchmark": "pipeline",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        for size in args.sizes.split(","):
+            size = size.strip()
+            records = generate_history(size if size in SIZES else int(size), end, args.seed, args.discrepancy_rate)
+            count = len(records)
+            body = payload(records)
+            del records  # Each run parses its own copy from the body
+            seconds, peaks, found = measure(body, args.repeat, workdir, not args.no_memory)
+            total = sum(seconds.values())
+            stages = {
+                name: {
+                    "seconds": round(elapsed, 6),
+                    "records_per_s": round(count / elapsed) if elapsed else None,
+                    "peak_mib": round(peaks[name] / 2 ** 20, 2) if name in peaks else None,
+                }
+                for name, elapsed in seconds.items()
+            }
+            report["results"].append({
+                "size": size, "records": count, "payload_bytes": len(body), "discrepancies": found,
+                "total_seconds": round(total, 6), "records_per_s": round(count / total) if total else None,
+                "stages": stages,
+            })
+            print(f"\n{size}: {count:,} records, {len(body) / 2 ** 20:.1f} MiB payload, "
+                  f"{total:.3f}s total ({count / total:,.0f} rec/s), {found} discrepancies")
+            for name, stage in stages.items():
+                peak = f"{stage['peak_mib']:>8.1f} MiB peak" if stage["peak_mib"] is not None else ""
+                print(f"  {name:<22} {stage['seconds']:>9.4f}s {stage['records_per_s'] or 0:>12,} rec/s {peak}")
+    report["max_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n💾 Results saved to {output} (max RSS {report['max_rss_mib']} MiB)")
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
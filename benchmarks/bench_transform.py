@@ -0,0 +1,152 @@
+"""
+Micro-benchmark: compiled record_transform profiles vs. the hand-rolled per-column loops
+timecard.py and fetch_historical_timesheet.py used before.
+
+    python benchmarks/bench_transform.py --records 50000
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from record_transform import compile_profile
+from synthetic_datalist import generate_records
+
+
+# --- The loops this replaced, kept verbatim in behaviour for comparison ---
+
+LEGACY_TIMECARD_COLUMNS = [
+    "Date", "Pay Code", "In", "Out", "Reg", "OT-1", "OT-2", "Daily Hours *",
+    "Shift Exp", "Schedule", "Total Hours\xa0*", "Account", "ActShortCode", "Facility",
+]
+LEGACY_TIMECARD_FIELDS = {
+    "Date": "DateKey", "Pay Code": "cPayCodeDescription", "In": "dIn", "Out": "dOut",
+    "Reg": "nWorkHours", "OT-1": "nOT1Hours", "OT-2": "nOT2Hours", "Daily Hours *": "nDailyHours",
+    "Shift Exp": "cShiftExpression", "Schedule": "cSchedule", "Total Hours\xa0*": "nWeeklyHours",
+}
+
+
+def legacy_timecard_row(rec):
+    row_data = []
+    account_value = act_short_code_value = facility_value = ""
+    for group in rec.get("GroupingList", []) + rec.get("GroupValueList", []):
+        if group.get("iGroupNumber") == 3:
+            account_value = group.get("cGroupValueDescription", "")
+            act_short_code_value = group.get("cGroupValue", "")
+        elif group.get("iGroupNumber") == 17:
+            facility_value = group.get("cGroupValueDescription", "")
+        elif group.get("iGroupNumber") == 16 and not facility_value:
+            facility_value = group.get("cGroupValueDescription", "")
+    for col in LEGACY_TIMECARD_COLUMNS:
+        if col == "Account":
+            row_data.append(account_value)
+        elif col == "ActShortCode":
+            row_data.append(act_short_code_value)
+        elif col == "Facility":
+            row_data.append(facility_value)
+        else:
+            row_data.append(rec.get(LEGACY_TIMECARD_FIELDS.get(col, col), ""))
+    return row_data
+
+
+LEGACY_HISTORICAL_COLUMNS = [
+    "Date", "Pay Code", "In", "", "Out", "", "Reg", "OT-1", "OT-2",
+    "Daily Hours\xa0*", "Shift Exp", "Schedule", "Total Hours\xa0*",
+    "Account", "ActShortCode", "Facility", "", "", "", "",
+]
+LEGACY_HISTORICAL_FIELDS = {"Pay Code": "cPayCodeDescription", "Schedule": "cSchedule", "Shift Exp": "cExpCode"}
+
+
+def _legacy_group(rec, number):
+    for group_val in rec.get("GroupValueList", []):
+        if group_val.get("iGroupNumber") == number:
+            return f"{group_val.get('cGroupValue', '')} [{group_val.get('cGroupValueDescription', '')}]"
+    return ""
+
+
+def _legacy_time(value):
+    if value is None:
+        return ""
+    try:
+        return datetime.strptime(value, "%m/%d/%Y %H:%M:%S").strftime("%I:%M %p")
+    except ValueError:
+        return str(value)
+
+
+def legacy_historical_row(rec, daily_total=None):
+    row_data = []
+    for col in LEGACY_HISTORICAL_COLUMNS:
+        if col == "Date":
+            value = rec.get("dWorkDate")
+            if value is None:
+                row_data.append("")
+            else:
+                try:
+                    row_data.append(datetime.strptime(value.split(" ")[0], "%m/%d/%Y").strftime("%a %m/%d/%Y"))
+                except ValueError:
+                    row_data.append(str(value))
+        elif col == "In":
+            row_data.append(_legacy_time(rec.get("dIn")))
+        elif col == "":
+            row_data.append("")
+        elif col == "Out":
+            row_data.append(_legacy_time(rec.get("dOut")))
+        elif col == "Reg":
+            row_data.append(f"{float(rec.get('nWorkHours', 0.0)):.2f}")
+        elif col == "OT-1":
+            row_data.append(f"{float(rec.get('nOT1Pay', 0.0)):.2f}")
+        elif col == "OT-2":
+            row_data.append(f"{float(rec.get('nOT2Pay', 0.0)):.2f}")
+        elif col == "Daily Hours\xa0*":
+            row_data.append("" if daily_total is None else f"{daily_total:.1f}")
+        elif col == "Total Hours\xa0*":
+            row_data.append(f"{float(rec.get('nDailyTotalHours', 0.0)):.1f}")
+        elif col == "Account":
+            row_data.append(_legacy_group(rec, 12))
+        elif col == "ActShortCode":
+            row_data.append(_legacy_group(rec, 3))
+        elif col == "Facility":
+            row_data.append(_legacy_group(rec, 1))
+        elif col == "Shift Exp":
+            row_data.append(str(rec.get(LEGACY_HISTORICAL_FIELDS[col], "")))
+        else:
+            value = rec.get(LEGACY_HISTORICAL_FIELDS.get(col, col), "")
+            row_data.append(f"{value:.2f}" if isinstance(value, (int, float)) else str(value))
+    return row_data
+
+
+def time_rows(build_row, records, repeat):
+    """Best-of-`repeat` records/sec for building every row."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for rec in records:
+            build_row(rec)
+        best = min(best, time.perf_counter() - start)
+    return len(records) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records = generate_records(args.records)
+    for name, legacy in (("timecard", legacy_timecard_row), ("historical", legacy_historical_row)):
+        headers, compiled = compile_profile(name)
+        legacy_headers = LEGACY_TIMECARD_COLUMNS if name == "timecard" else LEGACY_HISTORICAL_COLUMNS
+        # Same output or the numbers don't mean anything
+        assert headers == legacy_headers
+        assert all(compiled(rec) == legacy(rec) for rec in records[:1000]), f"{name} rows differ"
+
+        legacy_rate = time_rows(legacy, records, args.repeat)
+        compiled_rate = time_rows(compiled, records, args.repeat)
+        print(f"{name:<11} legacy {legacy_rate:>10,.0f} rec/s   compiled {compiled_rate:>10,.0f} rec/s   "
+              f"x{compiled_rate / legacy_rate:.2f}")
+
+
+if __name__ == "__main__":
+    main()
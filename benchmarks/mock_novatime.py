@@ -0,0 +1,335 @@
+"""
+Local stand-in for the parts of the NovaTime portal the scrapers touch: the login form, the
+Employee Web landing page with its Timesheet tile, the MainContentFrame > iFrame > TimesheetSection
+frames with their pay-period dropdown and table, and the timesheetdetail JSON API.
+
+    python benchmarks/mock_novatime.py --port 8765 --punches-per-day 3 --latency-ms 150
+
+Prints the .env values that point timecard.py, timecard_previous.py and
+fetch_historical_timesheet.py at it. Records come from synthetic_datalist.py, seeded per pay
+period, so repeated and overlapping fetches agree with each other.
+"""
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from novatime_api import API_DATE_FORMAT, pay_period_for
+from synthetic_datalist import DEFAULT_SEED, generate_datalist
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>NovaTime</title></head><body>
+<form method="post" action="/novatime/ewsfunctionkey.aspx?CID={cid}">
+  <input id="txtUserName" name="txtUserName" type="text">
+  <input id="txtPassword" name="txtPassword" type="password">
+  <input type="submit" name="btnEmployee" value="Employee Web">
+</form>
+</body></html>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><title>Employee Web</title></head><body>
+<div class="tiles">
+  <div class="tile"><h4 onclick="location.href='/novatime/Main.aspx'">Timesheet</h4></div>
+  <div class="tile"><h4>Schedule</h4></div>
+</div>
+</body></html>"""
+
+MAIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Employee Web</title></head><body>
+<iframe id="MainContentFrame" src="/novatime/Content.aspx" width="2400" height="1300"></iframe>
+</body></html>"""
+
+CONTENT_PAGE = """<!DOCTYPE html>
+<html><body>
+<iframe id="iFrame" src="/novatime/TimesheetSection.aspx" width="2350" height="1250"></iframe>
+</body></html>"""
+
+TIMESHEET_PAGE = """<!DOCTYPE html>
+<html><head><title>Timesheet</title>
+<style>table {{ border-collapse: collapse; }} td, th {{ border: 1px solid #999; padding: 2px 6px; }}</style>
+</head><body>
+<div id="TimesheetSection">
+  <div id="titleRightDiv">
+    <select id="periodSelect">
+      <option value="">Select</option>
+      <option value="current">Current Pay Period</option>
+      <option value="last">Last Pay Period</option>
+    </select>
+  </div>
+  <div class="row visible-lg-block visible-md-block visible-sm-block hidden-xs table-al-change">
+    <table id="timesheetTable"></table>
+  </div>
+</div>
+<script>
+const API = {api};
+const PERIODS = {periods};
+const COLUMNS = ["DateKey", "cPayCodeDescription", "dIn", "dOut", "nWorkHours", "nOT1Hours", "nTotalHours"];
+function render(data) {{
+  const rows = (data.DataList || []).map(rec =>
+    "<tr>" + COLUMNS.map(col => "<td>" + (rec[col] ?? "") + "</td>").join("") + "</tr>");
+  document.getElementById("timesheetTable").innerHTML =
+    "<tr>" + COLUMNS.map(col => "<th>" + col + "</th>").join("") + "</tr>" + rows.join("");
+}}
+function load(period) {{
+  const [start, end] = PERIODS[period];
+  const query = new URLSearchParams({{
+    AccessSeq: "{access_seq}", EmployeeSeq: "{employee_seq}", StartDate: start, EndDate: end,
+    UserSeq: "0", CustomDateRange: "false", ShowOneMoreDay: "false", EmployeeSeqList: "",
+    DailyDate: start, ForceAbsent: "false", PolicyGroup: ""
+  }});
+  fetch(API + "?" + query.toString(), {{credentials: "same-origin"}}).then(r => r.json()).then(render);
+}}
+document.getElementById("periodSelect").addEventListener("change", e => e.target.value && load(e.target.value));
+load("current");
+</script>
+</body></html>"""
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockNovaTime/1.0"
+
+    # --- plumbing ---
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None, throttle=False):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        kbps = self.server.options.bandwidth_kbps
+        if not (throttle and kbps):
+            self.wfile.write(data)
+            return
+        chunk = 16 * 1024
+        for offset in range(0, len(data), chunk):
+            self.wfile.write(data[offset:offset + chunk])
+            time.sleep(chunk / 1024 / kbps)
+
+    def _redirect(self, location, headers=None):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _session_valid(self):
+        cookies = dict(
+            part.strip().split("=", 1) for part in self.headers.get("Cookie", "").split(";") if "=" in part
+        )
+        created = self.server.sessions.get(cookies.get(SESSION_COOKIE))
+        return created is not None and time.monotonic() - created < self.server.options.session_ttl
+
+    def _login_location(self):
+        return f"/novatime/ewsfunctionkey.aspx?CID={self.server.options.cid}"
+
+    def _delay(self, ms, jitter_ms=0):
+        if ms or jitter_ms:
+            time.sleep(max(0.0, ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    # --- routes ---
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.lower()
+        self.server.count(path)
+        options = self.server.options
+        if path == "/novatime/ewsfunctionkey.aspx":
+            self._delay(options.page_latency_ms)
+            return self._send(200, LOGIN_PAGE.format(cid=options.cid))
+        if path.endswith("/timesheetdetail"):
+            return self._timesheetdetail(parse_qs(url.query))
+        pages = {
+            "/novatime/home.aspx": lambda: HOME_PAGE,
+            "/novatime/main.aspx": lambda: MAIN_PAGE,
+            "/novatime/content.aspx": lambda: CONTENT_PAGE,
+            "/novatime/timesheetsection.aspx": self._timesheet_page,
+        }
+        if path not in pages:
+            return self._send(404, "Not Found", "text/plain")
+        if not self._session_valid():
+            return self._redirect(self._login_location())
+        self._delay(options.page_latency_ms)
+        self._send(200, pages[path]())
+
+    def do_POST(self):
+        path = urlparse(self.path).path.lower()
+        self.server.count(path)
+        if path != "/novatime/ewsfunctionkey.aspx":
+            return self._send(404, "Not Found", "text/plain")
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        options = self.server.options
+        username = form.get("txtUserName", [""])[0]
+        password = form.get("txtPassword", [""])[0]
+        self._delay(options.login_latency_ms)
+        if (options.username and username != options.username) or (options.password and password != options.password):
+            return self._send(200, LOGIN_PAGE.format(cid=options.cid))
+        token = secrets.token_hex(16)
+        self.server.sessions[token] = time.monotonic()
+        self._redirect("/novatime/Home.aspx", {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; HttpOnly"})
+
+    def _timesheet_page(self):
+        options = self.server.options
+        current = pay_period_for()
+        last = pay_period_for(current[0] - timedelta(days=1))
+        periods = {
+            name: [start.strftime(API_DATE_FORMAT), end.strftime(API_DATE_FORMAT)]
+            for name, (start, end) in (("current", current), ("last", last))
+        }
+        return TIMESHEET_PAGE.format(
+            api=json.dumps(f"/novatimeservicesV2/api/{options.cid}/timesheetdetail"),
+            periods=json.dumps(periods), access_seq=options.access_seq, employee_seq=options.employee_seq,
+        )
+
+    def _timesheetdetail(self, query):
+        options = self.server.options
+        self._delay(options.latency_ms, options.jitter_ms)
+        if not self._session_valid():
+            return self._redirect(self._login_location())
+
+        # Fault injection, one roll per request
+        roll = random.random()
+        for fault, rate in (("error", options.error_rate), ("expired", options.expired_rate),
+                            ("slow", options.slow_rate), ("truncated", options.truncate_rate)):
+            if roll < rate:
+                break
+            roll -= rate
+        else:
+            fault = None
+        if fault:
+            self.server.count(f"fault:{fault}")
+        if fault == "error":
+            return self._send(500, "Internal Server Error", "text/plain")
+        if fault == "expired":
+            return self._send(200, LOGIN_PAGE.format(cid=options.cid))
+        if fault == "slow":
+            time.sleep(options.slow_ms / 1000)
+
+        try:
+            start = datetime.strptime(query["StartDate"][0], API_DATE_FORMAT).date()
+            end = datetime.strptime(query["EndDate"][0], API_DATE_FORMAT).date()
+        except (KeyError, ValueError):
+            return self._send(400, json.dumps({"Message": "Invalid date range"}), "application/json")
+        records = generate_datalist(start, end, options.seed, options.discrepancy_rate, options.punches_per_day)
+        body = json.dumps({"DataList": records, "Message": None}).encode("utf-8")
+        if fault == "truncated":
+            body = body[:len(body) // 2]
+        self._send(200, body, "application/json; charset=utf-8", throttle=True)
+
+
+class MockNovaTimeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, MockHandler)
+        self.options = options
+        self.sessions = {}  # token -> time.monotonic() at login
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def env_for(base_url, options):
+    """The .env values that point the scrapers at a mock server."""
+    api = f"{base_url}/novatimeservicesV2/api/{options.cid}/timesheetdetail"
+    current = pay_period_for()
+    start = current[0] - timedelta(days=options.history_days)
+    historical = (f"{api}?AccessSeq={options.access_seq}&EmployeeSeq={options.employee_seq}"
+                  f"&StartDate={quote(start.strftime(API_DATE_FORMAT))}&EndDate={quote(current[1].strftime(API_DATE_FORMAT))}"
+                  f"&UserSeq=0&CustomDateRange=true&ShowOneMoreDay=false&EmployeeSeqList="
+                  f"&DailyDate={quote(start.strftime(API_DATE_FORMAT))}&ForceAbsent=false&PolicyGroup=")
+    return {
+        "LOGIN_URL": f"{base_url}/novatime/ewsfunctionkey.aspx?CID={options.cid}",
+        "API_PREFIX": api,
+        "HISTORICAL_API_URL": historical,
+        "NOVATIME_ACCESS_SEQ": str(options.access_seq),
+        "NOVATIME_EMPLOYEE_SEQ": str(options.employee_seq),
+        "TIMESHEET_SELECTOR": "#TimesheetSection > div.row.visible-lg-block.visible-md-block.visible-sm-block.hidden-xs.table-al-change",
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local NovaTime stand-in for offline benchmarks and load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--cid", default="mock", help="company id used in the URLs")
+    parser.add_argument("--username", help="accept only this username (default: any)")
+    parser.add_argument("--password", help="accept only this password (default: any)")
+    parser.add_argument("--access-seq", type=int, default=1)
+    parser.add_argument("--employee-seq", type=int, default=1)
+    parser.add_argument("--session-ttl", type=float, default=8 * 3600, help="seconds before a login expires")
+    # Response size
+    parser.add_argument("--punches-per-day", type=int, help="punches on every work day (default: a realistic mix)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--discrepancy-rate", type=float, default=0, help="fraction of work days with a discrepancy")
+    parser.add_argument("--history-days", type=int, default=3 * 365, help="range of the printed HISTORICAL_API_URL")
+    # Latency
+    parser.add_argument("--latency-ms", type=float, default=0, help="timesheetdetail response delay")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="+/- random spread on --latency-ms")
+    parser.add_argument("--page-latency-ms", type=float, default=0, help="delay of every HTML page")
+    parser.add_argument("--login-latency-ms", type=float, default=0, help="delay of the login POST")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="throttle timesheetdetail bodies (KiB/s)")
+    # Fault injection (fractions of timesheetdetail requests)
+    parser.add_argument("--error-rate", type=float, default=0, help="answer HTTP 500")
+    parser.add_argument("--expired-rate", type=float, default=0, help="answer the login form, as an expired session does")
+    parser.add_argument("--slow-rate", type=float, default=0, help="add --slow-ms before answering")
+    parser.add_argument("--slow-ms", type=float, default=30000)
+    parser.add_argument("--truncate-rate", type=float, default=0, help="cut the JSON body in half")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def start_in_thread(argv=(), **overrides):
+    """Starts a mock server on a background thread (port 0 by default). Returns the server; call shutdown() when done."""
+    options = build_parser().parse_args(["--port", "0", *argv])
+    for name, value in overrides.items():
+        setattr(options, name, value)
+    server = MockNovaTimeServer((options.host, options.port), options)
+    threading.Thread(target=server.serve_forever, name="mock-novatime", daemon=True).start()
+    return server
+
+
+def main():
+    options = build_parser().parse_args()
+    server = MockNovaTimeServer((options.host, options.port), options)
+    print(f"🧪 Mock NovaTime listening on {server.base_url}")
+    print("Point the scrapers at it with:")
+    for name, value in env_for(server.base_url, options).items():
+        print(f"{name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Requests served: " + ", ".join(f"{key} {count}" for key, count in sorted(server.stats.items())))
+
+
+if __name__ == "__main__":
+    main()
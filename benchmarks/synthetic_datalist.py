@@ -0,0 +1,205 @@
+"""
+Seeded generator of realistic NovaTime timesheetdetail DataList records for benchmarks and the
+mock server: weekday shifts with lunch breaks, split and overnight shifts, PTO and holidays, daily
+and weekly overtime, and group values 1/3/12/16/17.
+
+Records are generated one pay period at a time from (seed, period start), so any date range
+always yields the same records for the same days, however it is sliced.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from novatime_api import pay_period_for
+
+DEFAULT_SEED = 42
+# Named history sizes accepted wherever a size is asked for, in days
+SIZES = {"1w": 7, "1m": 30, "1y": 365, "3y": 3 * 365, "5y": 5 * 365, "10y": 3652}
+
+# Group number -> pool of (value, description); the scripts read 1, 3, 12, 16 and 17
+GROUP_POOLS = {
+    1: [("FAC01", "Main Campus"), ("FAC02", "North Clinic"), ("FAC03", "Warehouse")],
+    3: [("ADM", "Administration"), ("OPS", "Operations"), ("MNT", "Maintenance"), ("TRN", "Training")],
+    12: [("4100", "Payroll - Hourly"), ("4200", "Payroll - Project"), ("4300", "Payroll - Support")],
+    16: [("D10", "Day Shift"), ("N20", "Night Shift")],
+    17: [("BLDG-A", "Building A"), ("BLDG-B", "Building B")],
+}
+DAILY_OT_AFTER = 8.0
+DAILY_OT2_AFTER = 12.0
+WEEKLY_OT_AFTER = 40.0
+
+
+def _stamp(moment):
+    return moment.strftime("%m/%d/%Y %H:%M:%S")
+
+
+def _groups(rng, assignment):
+    """GroupValueList for one punch: the employee's usual values, now and then another one."""
+    groups = []
+    for number, pool in GROUP_POOLS.items():
+        value, description = pool[assignment[number]] if rng.random() > 0.1 else rng.choice(pool)
+        groups.append({"iGroupNumber": number, "cGroupValue": value, "cGroupValueDescription": description})
+    return groups
+
+
+def _shift(rng, day, punches_per_day=None, overnight=True):
+    """(in, out) pairs for one work day."""
+    midnight = datetime.combine(day, datetime.min.time())
+    pattern = rng.choices(["single", "lunch", "split", "overnight"], weights=[20, 60, 12, 8 if overnight else 0])[0]
+    if punches_per_day:
+        pattern = "fixed"
+    if pattern == "overnight":
+        start = midnight + timedelta(hours=rng.randint(19, 22), minutes=rng.choice([0, 30]))
+        return [(start, start + timedelta(hours=rng.randint(8, 11), minutes=rng.choice([0, 15, 30])))]
+    start = midnight + timedelta(hours=rng.randint(6, 9), minutes=rng.choice([0, 15, 30, 45]))
+    if pattern == "single":
+        return [(start, start + timedelta(hours=rng.randint(4, 9), minutes=rng.choice([0, 15, 30, 45])))]
+    count = {"lunch": 2, "split": 3, "fixed": punches_per_day}[pattern]
+    punches = []
+    for _ in range(count):
+        end = start + timedelta(minutes=rng.randint(90, 300) if count > 2 else rng.randint(180, 330))
+        punches.append((start, end))
+        start = end + timedelta(minutes=rng.choice([30, 45, 60]))
+    return punches
+
+
+def generate_period(period_start, seed=DEFAULT_SEED, discrepancy_rate=0.0, punches_per_day=None):
+    """
+    DataList records of the pay period starting at `period_start`. With `discrepancy_rate`, that
+    fraction of work days gets a wrong Daily Hours or a punch with no Out, for the checker to find.
+    """
+    rng = random.Random(f"{seed}:{period_start:%Y-%m-%d}")
+    _, period_end = pay_period_for(period_start)
+    assignment = {number: random.Random(f"{seed}:{number}").randrange(len(pool)) for number, pool in GROUP_POOLS.items()}
+    records = []
+    week_regular = week_total = 0.0
+    not_before = datetime.min  # End of the previous shift plus a rest, so shifts never overlap
+    day = period_start
+    while day <= period_end:
+        weekend = day.weekday() >= 5
+        kind = rng.choices(["work", "off", "pto", "holiday"],
+                           weights=[10, 88, 1, 1] if weekend else [85, 7, 6, 2])[0]
+        if kind == "off":
+            day += timedelta(days=1)
+            continue
+        if kind == "work":
+            # No overnight shift on the last day: it would run into the next period, generated separately
+            shift = _shift(rng, day, punches_per_day, overnight=day < period_end)
+            pay_code = "REG"
+        else:
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+            shift = [(start, start + timedelta(hours=8))]
+            pay_code = "PTO" if kind == "pto" else "HOL"
+        if shift[0][0] < not_before:
+            # Still resting after an overnight shift: a day off
+            day += timedelta(days=1)
+            continue
+        punches = [(start, end, pay_code) for start, end in shift]
+        not_before = punches[-1][1] + timedelta(hours=8)
+
+        day_total = round(sum((end - start).total_seconds() for start, end, _ in punches) / 3600, 2)
+        day_worked = 0.0
+        day_records = []
+        for start, end, pay_code in punches:
+            hours = round((end - start).total_seconds() / 3600, 2)
+            # Hours beyond the daily and weekly thresholds are overtime, in punch order
+            ot2 = max(0.0, min(hours, day_worked + hours - DAILY_OT2_AFTER))
+            ot1 = max(0.0, min(hours - ot2, day_worked + hours - ot2 - DAILY_OT_AFTER))
+            regular = hours - ot1 - ot2
+            if pay_code == "REG" and week_regular + regular > WEEKLY_OT_AFTER:
+                shifted = week_regular + regular - WEEKLY_OT_AFTER
+                regular -= shifted
+                ot1 += shifted
+            if pay_code == "REG":
+                week_regular += regular
+            day_worked += hours
+            week_total += hours
+            regular, ot1, ot2 = round(regular, 2), round(ot1, 2), round(ot2, 2)
+            day_records.append({
+                "dWorkDate": day.strftime("%m/%d/%Y 00:00:00"),
+                "DateKey": day.strftime("%m/%d/%Y"),
+                "dPayPeriodStart": period_start.strftime("%m/%d/%Y 00:00:00"),
+                "dPayPeriodEnd": period_end.strftime("%m/%d/%Y 00:00:00"),
+                "dIn": _stamp(start),
+                "dOut": _stamp(end),
+                "cPayCodeDescription": "OT" if pay_code == "REG" and ot1 + ot2 >= hours else pay_code,
+                "nWorkHours": regular, "nOT1Hours": ot1, "nOT2Hours": ot2,
+                "nOT1Pay": ot1, "nOT2Pay": ot2, "nTotalHours": hours,
+                "nDailyHours": day_total, "nDailyTotalHours": day_total,
+                "nWeeklyHours": round(week_total, 2),
+                "cShiftExpression": "", "cExpCode": "",
+                "cSchedule": "22:00-06:30" if start.hour >= 19 else "08:00-16:30",
+                "GroupingList": [],
+                "GroupValueList": _groups(rng, assignment),
+            })
+        if kind == "work" and rng.random() < discrepancy_rate:
+            broken = rng.choice(day_records)
+            if rng.random() < 0.5:
+                broken["dOut"] = None
+            else:
+                for rec in day_records:
+                    rec["nDailyHours"] = round(day_total + rng.choice([-1.5, -0.5, 0.5, 1.0]), 2)
+        records.extend(day_records)
+        day += timedelta(days=1)
+    return records
+
+
+def generate_datalist(start, end, seed=DEFAULT_SEED, discrepancy_rate=0.0, punches_per_day=None):
+    """Records for every day from `start` to `end` inclusive, as timesheetdetail would return them."""
+    records = []
+    period_start = pay_period_for(start)[0]
+    while period_start <= end:
+        for rec in generate_period(period_start, seed, discrepancy_rate, punches_per_day):
+            if start <= datetime.strptime(rec["DateKey"], "%m/%d/%Y").date() <= end:
+                records.append(rec)
+        period_start = pay_period_for(period_start)[1] + timedelta(days=1)
+    return records
+
+
+def generate_history(size, end=None, seed=DEFAULT_SEED, discrepancy_rate=0.0):
+    """
+    Records for the `size` (days, or a SIZES name like "1y") ending at `end` (default: today),
+    widened to whole pay periods so every week's totals are complete.
+    """
+    days = SIZES[size] if isinstance(size, str) else int(size)
+    end = pay_period_for(end or date.today())[1]
+    start = pay_period_for(end - timedelta(days=days - 1))[0]
+    return generate_datalist(start, end, seed, discrepancy_rate)
+
+
+def generate_records(count, seed=DEFAULT_SEED, start=date(2022, 3, 1)):
+    """The first `count` records from `start` onwards, for benchmarks that want a record count."""
+    records = []
+    period_start = pay_period_for(start)[0]
+    while len(records) < count:
+        records.extend(generate_period(period_start, seed))
+        period_start = pay_period_for(period_start)[1] + timedelta(days=1)
+    return records[:count]
+
+
+def payload(records):
+    """timesheetdetail response body for `records`."""
+    return json.dumps({"DataList": records, "Message": None})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic timesheetdetail response to stdout or a file.")
+    parser.add_argument("--size", default="1y", help=f"days of history or one of {', '.join(SIZES)}")
+    parser.add_argument("--end", help="last day, MM/DD/YYYY (default: today)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--discrepancy-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    end = datetime.strptime(args.end, "%m/%d/%Y").date() if args.end else None
+    size = args.size if args.size in SIZES else int(args.size)
+    body = payload(generate_history(size, end, args.seed, args.discrepancy_rate))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(body)
+    else:
+        print(body)
@@ -0,0 +1,133 @@
+import os
+import time
+import queue
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+# Events for the same file within this window are coalesced into one check
+CHECKER_DEBOUNCE_SECONDS = float(os.getenv("CHECKER_DEBOUNCE_SECONDS", "1.0"))
+# Files waiting to be checked; when full, new work waits in the debounce table instead
+CHECKER_QUEUE_SIZE = int(os.getenv("CHECKER_QUEUE_SIZE", "256"))
+
+_STOP = object()
+
+
+def file_hash(path, chunk_bytes=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_stat(path):
+    """(size, mtime_ns) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class EventPipeline:
+    """
+    Sits between the watchdog observer and the checker: submit() only records the event, a
+    scheduler thread hands each file to a bounded queue once its events have been quiet for
+    `debounce` seconds, and a worker thread runs `process(path)` for files whose content changed.
+    `process` returns whether the check succeeded; a failed file (e.g. read mid-write) is not
+    remembered, so its next event checks it again even if the content is the same.
+    """
+
+    def __init__(self, process, debounce=CHECKER_DEBOUNCE_SECONDS, queue_size=CHECKER_QUEUE_SIZE, ignore=()):
+        self.process = process
+        self.debounce = debounce
+        self.ignore = {os.path.abspath(path) for path in ignore}
+        self.work = queue.Queue(maxsize=queue_size)
+        self.pending = {}  # path -> time of its latest event
+        self.seen = {}  # path -> (size, mtime_ns, sha256) when last checked
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._schedule, name="checker-debounce", daemon=True),
+            threading.Thread(target=self._work, name="checker-worker", daemon=True),
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.work.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def ignores(self, path):
+        """The checker's own outputs (and hidden/temp files) never trigger a check."""
+        path = os.path.abspath(path)
+        return path in self.ignore or os.path.basename(path).startswith((".", "~"))
+
+    def submit(self, path):
+        """Called from the observer thread; never blocks on checking."""
+        if self.ignores(path):
+            return
+        with self.lock:
+            self.pending[os.path.abspath(path)] = time.monotonic()
+
+    def remember(self, path, fingerprint):
+        """Records a file as already checked (e.g. by the initial scan)."""
+        with self.lock:
+            self.seen[os.path.abspath(path)] = fingerprint
+
+    def _schedule(self):
+        tick = min(self.debounce / 2, 0.25) or 0.05
+        while not self.stopping.is_set():
+            now = time.monotonic()
+            with self.lock:
+                quiet = [path for path, last in self.pending.items() if now - last >= self.debounce]
+            for path in quiet:
+                # Blocks while the queue is full; later events for the file keep coalescing meanwhile
+                while not self.stopping.is_set():
+                    try:
+                        self.work.put(path, timeout=tick)
+                        break
+                    except queue.Full:
+                        continue
+                with self.lock:
+                    # Only drop the entry if no newer event arrived while it was being queued
+                    if self.pending.get(path, now + 1) <= now:
+                        del self.pending[path]
+            self.stopping.wait(tick)
+
+    def _changed(self, path):
+        """Returns the new fingerprint if the file's size, mtime or content changed since its last check, else None."""
+        stat = file_stat(path)
+        if stat is None:
+            return None
+        previous = self.seen.get(path)
+        if previous and previous[:2] == stat:
+            return None
+        fingerprint = (*stat, file_hash(path))
+        if previous and previous[2] == fingerprint[2]:
+            self.remember(path, fingerprint)  # Touched but identical
+            return None
+        return fingerprint
+
+    def _work(self):
+        while True:
+            path = self.work.get()
+            if path is _STOP:
+                return
+            try:
+                fingerprint = self._changed(path)
+                if fingerprint is None:
+                    print(f"[Skip] {path} unchanged")
+                    continue
+                if self.process(path):
+                    self.remember(path, fingerprint)
+            except Exception as e:
+                print(f"[Error] Failed to process {path}: {e}")
@@ -0,0 +1,125 @@
+import os
+import json
+import hashlib
+from collections import Counter
+import pandas as pd
+from output_channel import atomic_write
+from discrepancy_rules import DISCREPANCY_COLUMNS, normalize_frame, check_normalized, week_start
+
+# Columns of the rows check_incremental() hands to the log
+CHANGE_COLUMNS = DISCREPANCY_COLUMNS + ["Status"]
+
+
+def row_index_path(index_dir, base, file_path):
+    """Per-file row index location; named by a hash of the file's path relative to `base`."""
+    key = os.path.relpath(os.path.abspath(file_path), base)
+    return os.path.join(index_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ".json")
+
+
+def load_row_index(path):
+    """
+    Reads a file's row index: {"ruleset", "rows": [[row_hash, work_date], ...], "last_punch_day",
+    "open": {discrepancy_id: finding}}, or None if there is none yet.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_row_index(path, index):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as f:
+        json.dump(index, f, separators=(",", ":"))
+
+
+def row_fingerprints(df):
+    """One hash per CSV row over all its values, computed column-wise."""
+    return pd.util.hash_pandas_object(df, index=False).map("{:016x}".format).tolist()
+
+
+def _finding_entries(findings, frame):
+    """Findings as JSON-ready dicts keyed by an id over rule, row and the numbers compared."""
+    values = findings.astype(object).where(findings.notna(), None)
+    dates = frame.loc[findings.index, "_date"]
+    weeks = week_start(dates)
+    entries = {}
+    for (idx, row), day, week in zip(values.iterrows(), dates, weeks):
+        entry = {column: row[column] for column in DISCREPANCY_COLUMNS}
+        identity = "|".join(str(entry[column]) for column in ("Rule", "Date", "In", "Out", "Expected", "Reported"))
+        entry["_day"] = "" if pd.isna(day) else day.strftime("%Y-%m-%d")
+        entry["_week"] = "" if pd.isna(week) else week.strftime("%Y-%m-%d")
+        entries[hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]] = entry
+    return entries
+
+
+def check_incremental(df, previous, ruleset):
+    """
+    Diffs `df` against the file's previous row index and reruns the rules only on the pay-period
+    weeks holding added, changed or removed rows (plus the day before each, for overnight overlaps).
+    Without a usable previous index every row is in scope.
+    Returns (changes, index, rows_checked): changes holds newly found discrepancies (Status "new") and
+    previously open ones in scope that no longer occur (Status "cleared").
+    """
+    frame = normalize_frame(df)
+    hashes = row_fingerprints(df)
+    days = frame["_date"].dt.strftime("%Y-%m-%d").fillna("")
+    last_day = frame.attrs["last_punch_day"]
+    last_day = "" if pd.isna(last_day) else last_day.strftime("%Y-%m-%d")
+    weeks = week_start(frame["_date"])
+
+    if previous is None or previous.get("ruleset") != ruleset:
+        affected = None
+        in_scope = pd.Series(True, index=frame.index)
+        context = in_scope
+        undated_changed = True
+    else:
+        # Multiset diff: a row is added once its hash occurs more often than before
+        remaining = Counter(row_hash for row_hash, _ in previous["rows"])
+        added = []
+        for row_hash in hashes:
+            added.append(remaining[row_hash] <= 0)
+            remaining[row_hash] -= 1
+        added = pd.Series(added, index=frame.index)
+        removed_days = {day for row_hash, day in previous["rows"] if remaining[row_hash] > 0}
+
+        changed_days = set(days[added]) | removed_days
+        # missing_out exempts the last punched day; once a later day is punched, that day's week is due again
+        if previous.get("last_punch_day") and previous["last_punch_day"] != last_day:
+            changed_days.add(previous["last_punch_day"])
+        undated_changed = "" in changed_days
+        affected = set(week_start(pd.Series(pd.to_datetime(sorted(changed_days - {""})))).dt.strftime("%Y-%m-%d"))
+        week_text = weeks.dt.strftime("%Y-%m-%d").fillna("")
+        in_scope = week_text.isin(affected) | (added & frame["_date"].isna())
+        day_before = {(pd.Timestamp(week) - pd.Timedelta(days=1)).strftime("%Y-%m-%d") for week in affected}
+        context = in_scope | days.isin(day_before)
+
+    subset = frame[context]
+    subset.attrs = frame.attrs
+    findings = check_normalized(subset)
+    findings = findings[findings.index.isin(in_scope[in_scope].index)]
+    current = _finding_entries(findings, frame)
+
+    def covered(entry):
+        if affected is None:
+            return True
+        return entry["_week"] in affected if entry["_week"] else undated_changed
+
+    previous_open = (previous or {}).get("open", {})
+    cleared = {key: entry for key, entry in previous_open.items() if covered(entry) and key not in current}
+    new = {key: entry for key, entry in current.items() if key not in previous_open}
+    still_open = {key: entry for key, entry in previous_open.items() if key not in cleared}
+    still_open.update(current)
+
+    changes = [dict(entry, Status="new") for entry in new.values()]
+    changes += [dict(entry, Status="cleared") for entry in cleared.values()]
+    index = {
+        "ruleset": ruleset,
+        "rows": [[row_hash, day] for row_hash, day in zip(hashes, days)],
+        "last_punch_day": last_day,
+        "open": still_open,
+    }
+    return pd.DataFrame(changes, columns=CHANGE_COLUMNS), index, int(context.sum())
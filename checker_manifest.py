@@ -0,0 +1,78 @@
+import os
+import json
+from collections import Counter
+from datetime import datetime
+from checker_events import file_stat, file_hash
+from output_channel import atomic_write
+
+
+def load_manifest(path):
+    """
+    Reads the processed-file manifest: {"files": {relative_path: entry}} where an entry holds the
+    file's size, mtime_ns and sha256 when it was checked, the rule-set version used and a summary.
+    """
+    if not os.path.exists(path):
+        return {"files": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ Ignoring unreadable checker manifest {path}; every file will be checked again.")
+        return {"files": {}}
+
+
+def save_manifest(manifest, path):
+    """Writes via a temp file + rename (atomic_write) so a crash never leaves a half-written manifest."""
+    with atomic_write(path) as f:
+        json.dump(manifest, f, indent=1)
+
+
+def _key(manifest_path, file_path):
+    return os.path.relpath(os.path.abspath(file_path), os.path.dirname(os.path.abspath(manifest_path)))
+
+
+def fingerprint_of(entry):
+    return entry["size"], entry["mtime_ns"], entry["sha256"]
+
+
+def unchanged_fingerprint(manifest, manifest_path, file_path, version):
+    """
+    The file's fingerprint if it was already checked with rule-set `version` and has not changed
+    since, else None. Only files whose size or mtime moved are hashed.
+    """
+    entry = manifest["files"].get(_key(manifest_path, file_path))
+    if not entry or entry.get("ruleset") != version:
+        return None
+    stat = file_stat(file_path)
+    if stat is None:
+        return None
+    if (entry["size"], entry["mtime_ns"]) == stat:
+        return fingerprint_of(entry)
+    if entry["sha256"] != file_hash(file_path):
+        return None
+    # Rewritten with identical content: keep the entry, refresh its stat
+    entry["size"], entry["mtime_ns"] = stat
+    return fingerprint_of(entry)
+
+
+def record_check(manifest, manifest_path, file_path, fingerprint, version, rows, open_findings):
+    """Stores the result of checking one file; `open_findings` are its discrepancies still open."""
+    by_rule = Counter(finding["Rule"] for finding in open_findings)
+    manifest["files"][_key(manifest_path, file_path)] = {
+        "size": fingerprint[0],
+        "mtime_ns": fingerprint[1],
+        "sha256": fingerprint[2],
+        "ruleset": version,
+        "checked_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "rows": rows,
+        "discrepancies": sum(by_rule.values()),
+        "by_rule": dict(by_rule),
+    }
+
+
+def known_fingerprints(manifest, manifest_path, version):
+    """(absolute path, fingerprint) of every file already checked with rule-set `version`."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    for key, entry in manifest["files"].items():
+        if entry.get("ruleset") == version:
+            yield os.path.join(base, key), fingerprint_of(entry)
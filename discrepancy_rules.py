@@ -0,0 +1,305 @@
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from novatime_api import PAY_PERIOD_ANCHOR, PAY_PERIOD_DAYS
+from record_transform import TIMECARD_PROFILE, HISTORICAL_PROFILE
+
+# --- Load environment variables from .env ---
+load_dotenv()
+# Hours may differ by this much before a rule fires (the historical export rounds daily totals to 0.1)
+CHECK_TOLERANCE_HOURS = float(os.getenv("CHECK_TOLERANCE_HOURS", "0.05"))
+# Comma-separated rule names to run; empty runs every registered rule
+CHECK_RULES = [name.strip() for name in os.getenv("CHECK_RULES", "").split(",") if name.strip()]
+
+# Bump when a rule's logic changes so files already checked are checked again
+RULES_VERSION = 2
+
+# Columns of the frame check_frame() returns
+DISCREPANCY_COLUMNS = ["Rule", "Date", "In", "Out", "Expected", "Reported", "Detail"]
+
+HOUR_COLUMNS = ("Reg", "OT-1", "OT-2", "Daily Hours *", "Total Hours *")
+
+
+def normalize_header(name):
+    """'Total Hours\\xa0*' and 'Total Hours *' are the same column."""
+    return " ".join(str(name).replace("\xa0", " ").split())
+
+
+def _layout_headers(profile):
+    return [normalize_header(column[0]) for column in profile["columns"]]
+
+
+# Both layouts share their named headers; the blank columns tell them apart.
+# In the timecard layout "Total Hours *" is the week's total, in the historical one it is the day's.
+LAYOUTS = {
+    "timecard": _layout_headers(TIMECARD_PROFILE),
+    "historical": _layout_headers(HISTORICAL_PROFILE),
+}
+
+
+def detect_layout(columns):
+    """Name of the record_transform layout the columns were written with, or None."""
+    # pandas names blank headers "Unnamed: <n>"
+    headers = ["" if column.startswith("Unnamed:") else column for column in columns if column != "SourceFile"]
+    for name, layout in LAYOUTS.items():
+        if headers == layout:
+            return name
+    return None
+
+
+def _text(frame, column):
+    if column not in frame:
+        return pd.Series("", index=frame.index, dtype=object)
+    return frame[column].fillna("").astype(str).str.strip()
+
+
+def _to_datetime(text, fmt):
+    """pd.to_datetime over the distinct values only; exports repeat the same dates and clock times."""
+    codes, uniques = pd.factorize(text)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=fmt, errors="coerce").to_numpy()
+    return pd.Series(parsed[codes], index=text.index)
+
+
+def _timestamps(frame, column, day):
+    """Parses a punch column written either as 'MM/DD/YYYY HH:MM:SS' or as '07:00 AM' on the row's work day."""
+    text = _text(frame, column)
+    full = _to_datetime(text, "%m/%d/%Y %H:%M:%S")
+    clock = day + (_to_datetime(text, "%I:%M %p") - pd.Timestamp(1900, 1, 1))
+    return full.fillna(clock), full.isna() & clock.notna()
+
+
+def _mark_last_punch_day(frame):
+    """Records the latest work day with an In punch as frame.attrs["last_punch_day"] (NaT if none)."""
+    frame.attrs["last_punch_day"] = frame.loc[_text(frame, "In") != "", "_date"].max()
+
+
+def normalize_frame(df):
+    """
+    Returns a copy of an exported timesheet CSV with canonical headers plus parsed helper columns:
+    numeric hour columns, _date (work day), _in/_out (punch timestamps) and _worked (Reg + OT-1 + OT-2).
+    Everything is parsed column-wise once so rules only combine masks.
+    """
+    frame = df.rename(columns=normalize_header)
+    frame.attrs["layout"] = detect_layout(frame.columns)
+    for column in HOUR_COLUMNS:
+        values = frame[column] if column in frame else pd.Series(np.nan, index=frame.index)
+        frame["_" + column] = pd.to_numeric(values, errors="coerce")
+
+    # "03/16/2022" (timecard) or "Wed 03/16/2022" (historical); extracted once per distinct value
+    codes, uniques = pd.factorize(_text(frame, "Date"))
+    day_text = pd.Series(uniques, dtype=object).str.extract(r"(\d{1,2}/\d{1,2}/\d{4})", expand=False)
+    day = _to_datetime(pd.Series(day_text.fillna("").to_numpy()[codes], index=frame.index), "%m/%d/%Y")
+
+    frame["_in"], _ = _timestamps(frame, "In", day)
+    frame["_out"], clock_only = _timestamps(frame, "Out", day)
+    # A clock-only Out before its In is an overnight shift ending the next day
+    overnight = clock_only & (frame["_out"] < frame["_in"])
+    frame.loc[overnight, "_out"] = frame.loc[overnight, "_out"] + pd.Timedelta(days=1)
+
+    frame["_date"] = day.fillna(frame["_in"].dt.normalize())
+    frame["_worked"] = frame[["_Reg", "_OT-1", "_OT-2"]].fillna(0.0).sum(axis=1)
+    _mark_last_punch_day(frame)
+    return frame
+
+
+# timesheet_archive columns normalize_archive() needs
+ARCHIVE_COLUMNS = ["work_date", "time_in", "time_out", "reg_hours", "ot1_hours", "ot2_hours", "daily_hours", "weekly_hours"]
+
+
+def _punch_text(stamps):
+    return stamps.dt.strftime("%m/%d/%Y %H:%M:%S").fillna("").astype(object)
+
+
+def normalize_archive(df):
+    """
+    normalize_frame() for records read from the Parquet archive (timesheet_archive.read_archive):
+    the columns are typed already, so nothing is parsed. The frame checks like the timecard layout.
+    """
+    frame = pd.DataFrame({
+        "Date": df["work_date"].dt.strftime("%m/%d/%Y").fillna("").astype(object),
+        "In": _punch_text(df["time_in"]),
+        "Out": _punch_text(df["time_out"]),
+        "_Reg": df["reg_hours"],
+        "_OT-1": df["ot1_hours"],
+        "_OT-2": df["ot2_hours"],
+        "_Daily Hours *": df["daily_hours"],
+        "_Total Hours *": df["weekly_hours"],
+        "_in": df["time_in"].astype("datetime64[ns]"),
+        "_out": df["time_out"].astype("datetime64[ns]"),
+    }, index=df.index)
+    frame.attrs["layout"] = "timecard"
+    frame["_date"] = df["work_date"].astype("datetime64[ns]").fillna(frame["_in"].dt.normalize())
+    frame["_worked"] = frame[["_Reg", "_OT-1", "_OT-2"]].fillna(0.0).sum(axis=1)
+    _mark_last_punch_day(frame)
+    return frame
+
+
+# Rules that only need per-day sums, so they can run on timesheet_store's daily_totals
+TOTALS_RULES = ("daily_hours", "weekly_total")
+
+
+def normalize_daily_totals(df):
+    """
+    normalize_frame() for timesheet_store.query_daily_totals() rows: one row per work day holding
+    the day's summed hours and its last reported Daily/Weekly Hours. Only TOTALS_RULES apply.
+    """
+    day = pd.to_datetime(df["work_date"], format="%Y-%m-%d", errors="coerce")
+    frame = pd.DataFrame({
+        "Date": day.dt.strftime("%m/%d/%Y").fillna("").astype(object),
+        "In": "",
+        "Out": "",
+        "_Reg": df["reg_hours"].astype(float),
+        "_OT-1": df["ot1_hours"].astype(float),
+        "_OT-2": df["ot2_hours"].astype(float),
+        "_Daily Hours *": pd.to_numeric(df["reported_daily"], errors="coerce"),
+        "_Total Hours *": pd.to_numeric(df["reported_weekly"], errors="coerce"),
+        "_in": pd.NaT,
+        "_out": pd.NaT,
+        "_date": day,
+    }, index=df.index)
+    frame.attrs["layout"] = "timecard"
+    frame["_worked"] = frame[["_Reg", "_OT-1", "_OT-2"]].sum(axis=1)
+    return frame
+
+
+def _result(rule, frame, mask, expected=np.nan, reported=np.nan, detail=""):
+    """
+    Discrepancy rows for the rows of `frame` selected by `mask`. `detail` is a string, or a
+    function building the detail strings from the selected (expected, reported) values.
+    """
+    hits = frame[mask]
+    expected = expected[mask] if isinstance(expected, pd.Series) else expected
+    reported = reported[mask] if isinstance(reported, pd.Series) else reported
+    result = pd.DataFrame({
+        "Rule": rule,
+        "Date": _text(hits, "Date"),
+        "In": _text(hits, "In"),
+        "Out": _text(hits, "Out"),
+        "Expected": expected,
+        "Reported": reported,
+        "Detail": detail(expected, reported) if callable(detail) else detail,
+    }, index=hits.index)
+    return result[DISCREPANCY_COLUMNS]
+
+
+def _hours(values):
+    return pd.Series([f"{value:.2f}" for value in values], index=values.index, dtype=object)
+
+
+def _last_valid(frame, column, by):
+    """Per group: the last non-empty value of `column`."""
+    return frame[column].where(frame[column].notna()).groupby(by).transform("last")
+
+
+def _is_last_of(frame, by):
+    return ~frame.duplicated(subset=by, keep="last")
+
+
+def week_start(dates):
+    """Start of the pay period (see novatime_api.pay_period_for) containing each date."""
+    anchor = pd.Timestamp(datetime.strptime(PAY_PERIOD_ANCHOR, "%m/%d/%Y"))
+    offset = (dates - anchor).dt.days % PAY_PERIOD_DAYS
+    return dates - pd.to_timedelta(offset, unit="D")
+
+
+# --- Rules --------------------------------------------------------------------
+# A rule takes the normalized frame and the tolerance and returns a DataFrame with
+# DISCREPANCY_COLUMNS. Add rules to RULES (or decorate them with @rule) to have them run.
+RULES = {}
+
+
+def rule(name):
+    def register(func):
+        RULES[name] = func
+        return func
+    return register
+
+
+@rule("daily_hours")
+def daily_hours_rule(frame, tolerance):
+    """Reg + OT-1 + OT-2 summed over the day vs the day's reported Daily Hours *."""
+    dated = frame["_date"].notna()
+    by = frame["_date"]
+    worked = frame["_worked"].groupby(by).transform("sum").round(2)
+    reported = _last_valid(frame, "_Daily Hours *", by)
+    # One finding per day, reported on its last row
+    mask = dated & _is_last_of(frame, "_date") & reported.notna() & ((worked - reported).abs() > tolerance + 1e-9)
+    return _result("daily_hours", frame, mask, worked, reported,
+                   lambda expected, reported: "punches add up to " + _hours(expected) + " h, Daily Hours * says " + _hours(reported))
+
+
+@rule("weekly_total")
+def weekly_total_rule(frame, tolerance):
+    """The week's Total Hours * vs the sum of its days' Daily Hours * (timecard layout only)."""
+    if frame.attrs.get("layout") != "timecard":
+        return _result("weekly_total", frame, pd.Series(False, index=frame.index))
+    week = week_start(frame["_date"])
+
+    day_reported = _last_valid(frame, "_Daily Hours *", frame["_date"])
+    first_of_day = ~frame.duplicated(subset="_date", keep="first")
+    dailies = day_reported.where(first_of_day, 0.0).fillna(0.0).groupby(week).transform("sum").round(2)
+    reported = _last_valid(frame, "_Total Hours *", week)
+    last_of_week = ~week.duplicated(keep="last")
+    mask = frame["_date"].notna() & last_of_week & reported.notna() & ((dailies - reported).abs() > tolerance + 1e-9)
+    return _result("weekly_total", frame, mask, dailies, reported,
+                   lambda expected, reported: "daily hours add up to " + _hours(expected) + " h, Total Hours * says " + _hours(reported))
+
+
+@rule("missing_out")
+def missing_out_rule(frame, tolerance):
+    """
+    Punched in but never out, except on the export's last punched day, whose open punch was still
+    in progress when it was exported. Only the file's content decides, never the day it is checked.
+    """
+    last_day = frame.attrs.get("last_punch_day", pd.NaT)
+    mask = (_text(frame, "In") != "") & (_text(frame, "Out") == "")
+    if not pd.isna(last_day):
+        mask &= frame["_date"] != last_day
+    return _result("missing_out", frame, mask, detail="In punch has no matching Out")
+
+
+@rule("overlapping_punches")
+def overlapping_punches_rule(frame, tolerance):
+    """A punch that starts before an earlier punch has ended."""
+    punches = frame[frame["_in"].notna() & frame["_out"].notna()].sort_values("_in", kind="stable")
+    previous_end = punches["_out"].cummax().shift()
+    overlaps = punches.index[(punches["_in"] < previous_end).to_numpy()]
+    mask = pd.Series(False, index=frame.index)
+    mask[overlaps] = True
+    ends = previous_end[overlaps].dt.strftime("%m/%d/%Y %I:%M %p")
+    return _result("overlapping_punches", frame, mask, detail="starts before the previous punch ends at " + ends)
+
+
+def selected_rules(rules=None):
+    names = rules or CHECK_RULES or list(RULES)
+    unknown = [name for name in names if name not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown discrepancy rule(s): {', '.join(unknown)} (known: {', '.join(RULES)})")
+    return names
+
+
+def ruleset_version(rules=None, tolerance=None):
+    """Identifies what a check means: rule logic version, selected rules and tolerance."""
+    tolerance = CHECK_TOLERANCE_HOURS if tolerance is None else tolerance
+    return f"{RULES_VERSION}:{','.join(sorted(selected_rules(rules)))}:{tolerance:g}"
+
+
+def check_frame(df, rules=None, tolerance=None):
+    """Runs the selected rules (default CHECK_RULES, else all) over an exported timesheet CSV frame."""
+    return check_normalized(normalize_frame(df), rules, tolerance).reset_index(drop=True)
+
+
+def check_normalized(frame, rules=None, tolerance=None):
+    """
+    Like check_frame() for an already normalized frame (or a slice of one); the findings keep the
+    index of the row they were reported on.
+    """
+    names = selected_rules(rules)
+    tolerance = CHECK_TOLERANCE_HOURS if tolerance is None else tolerance
+    results = [RULES[name](frame, tolerance) for name in names]
+    results = [result for result in results if not result.empty]
+    if not results:
+        return pd.DataFrame(columns=DISCREPANCY_COLUMNS)
+    return pd.concat(results).sort_index(kind="stable")
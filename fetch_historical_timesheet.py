@@ -5,7 +5,19 @@ from datetime import datetime
 from playwright.sync_api import sync_playwright
 import json
 import re
+import argparse
+import itertools
 from dotenv import load_dotenv
+from session_cache import open_authenticated_context
+from historical_backfill import run_backfill, BACKFILL_WINDOW, BACKFILL_CONCURRENCY
+from historical_sync import run_sync
+from stream_export import open_stream, iter_datalist, external_sort
+from record_transform import compile_profile
+from novatime_time import annotate_timestamps, timestamps_of
+from resource_filter import resource_filter_for
+from output_channel import atomic_write
+from timesheet_store import EXPORT_FILES, store_records, open_store, iter_upsert, query_records
+from timesheet_archive import archive_enabled, archive_records, archive_from_store
 
 # --- Load environment variables from .env ---
 load_dotenv()
@@ -15,8 +27,8 @@ LOGIN_URL = os.getenv("LOGIN_URL")
 # TIMESHEET_SELECTOR is no longer needed as screenshot functionality is removed
 # API_PREFIX is no longer needed as we are directly calling the URL
 
-# Define the new URL to fetch timesheet details
-NEW_TIMESHEET_API_URL = "https://online7.timeanywhere.com/novatimeservicesV2/api/16c135d5-ca06-4522-b863-569e1c67c565/timesheetdetail?AccessSeq=1142&EmployeeSeq=26462&StartDate=Tue%20Mar%2001%202022&EndDate=Fri%20Jul%2004%202025&UserSeq=0&CustomDateRange=true&ShowOneMoreDay=false&EmployeeSeqList=&DailyDate=Sun%20Mar%2013%202022&ForceAbsent=false&PolicyGroup="
+# Define the new URL to fetch timesheet details (HISTORICAL_API_URL overrides it, e.g. for the mock server)
+NEW_TIMESHEET_API_URL = os.getenv("HISTORICAL_API_URL") or "https://online7.timeanywhere.com/novatimeservicesV2/api/16c135d5-ca06-4522-b863-569e1c67c565/timesheetdetail?AccessSeq=1142&EmployeeSeq=26462&StartDate=Tue%20Mar%2001%202022&EndDate=Fri%20Jul%2004%202025&UserSeq=0&CustomDateRange=true&ShowOneMoreDay=false&EmployeeSeqList=&DailyDate=Sun%20Mar%2013%202022&ForceAbsent=false&PolicyGroup="
 
 def sanitize_folder_name(name):
     """Sanitizes a string to be a valid folder name."""
@@ -26,38 +38,179 @@ def sanitize_folder_name(name):
     name = name.replace(' ', '_')
     return name
 
-def login_and_grab_timesheet():
+# Column layout (including the empty columns) lives in record_transform.HISTORICAL_PROFILE
+HISTORICAL_COLUMNS, build_historical_row = compile_profile("historical")
+
+def historical_sort_key(rec):
+    """
+    Sort records by dWorkDate and then by dOut (or dIn if dOut is often None)
+    This helps identify the 'last' entry for a given day for Daily Hours calculation
+    """
+    parsed = timestamps_of(rec)
+    work_date_obj = parsed["dWorkDate"]
+    if work_date_obj is None or (rec.get('dOut') and parsed["dOut"] is None):
+        return (datetime.min, datetime.min) # Fallback for unparseable dates/times
+    # Use a placeholder time if dOut is None to ensure consistent sorting
+    return (work_date_obj, parsed["dOut"] or datetime.min)
+
+def iter_historical_rows(sorted_records):
+    """
+    Yields CSV rows for records already in historical_sort_key order.
+    Records of one work date are adjacent, so only a single day is buffered at a time.
+    """
+    work_date = lambda rec: (rec.get('dWorkDate') or '').split(' ')[0] # e.g., "03/16/2022"
+    for date_key, day_records in itertools.groupby(sorted_records, key=work_date):
+        day_records = list(day_records)
+        daily_total = None
+        if date_key:
+            daily_total = sum(float(rec.get('nTotalHours', 0.0)) for rec in day_records)
+        last_record = day_records[-1]
+        for rec in day_records:
+            yield build_historical_row(rec, daily_total if rec == last_record else None)
+
+def write_historical_csv(sorted_records, csv_path):
+    """Writes historical_timesheet.csv (atomically) from sorted records (a list or any iterator). Returns the row count."""
+    count = 0
+    with atomic_write(csv_path, newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(HISTORICAL_COLUMNS)
+        for row_data in iter_historical_rows(sorted_records):
+            writer.writerow(row_data)
+            count += 1
+    if not count:
+        print("⚠️ No 'DataList' records found in the JSON data to write to CSV. The CSV will only contain headers.")
+    print(f"✅ Timesheet CSV file saved at {csv_path}")
+    return count
+
+def save_historical(captured_json_data, changed_records=None):
+    """
+    Upserts a timesheetdetail payload into the timesheet database and saves it as
+    historical_timesheet.json and historical_timesheet.csv in the current directory
+    (unless EXPORT_FILES is off). With `changed_records` (the complete records of the pay periods
+    an incremental sync found changed) only those periods are stored and archived, replacing what
+    was there; the files are still written from the whole payload.
+    """
+    if changed_records is None:
+        to_store, replace_periods = captured_json_data.get('DataList', []), False
+    else:
+        to_store, replace_periods = changed_records, True
+    try:
+        try:
+            store_records(to_store, replace_periods=replace_periods)
+        except Exception as e:
+            print(f"⚠️ Could not store records in the timesheet database: {e}")
+        if archive_enabled():
+            try:
+                archived = archive_records(to_store, replace_periods=replace_periods)
+                print(f"📦 Archived {archived} records as Parquet")
+            except Exception as e:
+                print(f"⚠️ Could not archive records as Parquet: {e}")
+        if not EXPORT_FILES:
+            print("⏭️ JSON/CSV export skipped (EXPORT_FILES=false).")
+            return
+
+        # Files will be saved directly in the current directory
+        json_path = os.path.join(os.getcwd(), "historical_timesheet.json")
+        csv_path = os.path.join(os.getcwd(), "historical_timesheet.csv")
+
+        # 4) Save the captured JSON data to a file
+        with atomic_write(json_path) as f:
+            json.dump(captured_json_data, f, indent=4)
+        print(f"✅ JSON data saved at {json_path}")
+
+        # 5) Process JSON data and save to CSV with new format
+        records_to_process = captured_json_data.get('DataList', [])
+        # Parse every timestamp column once up front; sort and CSV reuse the parsed values
+        annotate_timestamps(records_to_process)
+        records_to_process.sort(key=historical_sort_key)
+        write_historical_csv(records_to_process, csv_path)
+
+        print("✅ Script completed successfully with JSON and CSV saved.")
+
+    except Exception as e:
+        print(f"❌ Failed to process captured JSON data and save files: {e}")
+
+def archive_stored(store):
+    """Archives the database's pay periods as Parquet one at a time, so memory stays bounded here too."""
+    if not archive_enabled():
+        return
+    try:
+        archived = archive_from_store(store)
+        print(f"📦 Archived {archived} records as Parquet")
+    except Exception as e:
+        print(f"⚠️ Could not archive records as Parquet: {e}")
+
+def stream_historical(context, url):
+    """
+    Streams the timesheetdetail response straight to historical_timesheet.json while its DataList
+    records are upserted into the timesheet database in batches and flow through an external sort
+    into the CSV writer, so memory stays bounded by SORT_CHUNK_RECORDS no matter how long the date range is.
+    Both files replace the previous export only once the whole response has been read.
+    """
+    json_path = os.path.join(os.getcwd(), "historical_timesheet.json")
+    csv_path = os.path.join(os.getcwd(), "historical_timesheet.csv")
+    store = open_store()
+    try:
+        with open_stream(url, context.cookies(), timeout=60) as response:
+            if not EXPORT_FILES:
+                count = sum(1 for _ in iter_upsert(store, iter_datalist(response)))
+                print(f"🗄️ Stored {count} records; JSON/CSV export skipped (EXPORT_FILES=false).")
+                archive_stored(store)
+                return count
+            with atomic_write(json_path, binary=True) as raw_json:
+                # The raw body is written to the JSON file's temp copy as it is read
+                records = iter_upsert(store, iter_datalist(response, tee=raw_json))
+                count = write_historical_csv(external_sort(records, historical_sort_key), csv_path)
+        archive_stored(store)
+    finally:
+        store.close()
+    print(f"✅ JSON data saved at {json_path}")
+    print(f"Number of 'DataList' records found: {count}")
+    return count
+
+def login_and_grab_timesheet(stream=False):
     """
     Logs into the Novatime system, then directly fetches timesheet data
     from a specified API URL, saves it as JSON and CSV in the current directory.
     Screenshot functionality has been removed.
+    With stream=True the response is parsed incrementally instead of being held in memory.
     """
     with sync_playwright() as p:
         # Launch a Chromium browser instance in headless mode
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        # Set a large viewport size for consistency
-        page = context.new_page()
-        page.set_viewport_size({"width": 2560, "height": 1440})
 
         # Files will be saved directly in the current working directory
         print(f"Files will be saved in the current working directory: {os.getcwd()}")
 
-        # 1) Navigate to login page and perform login
+        # 1) Log in, reusing the cached session from a previous run when still valid
         print(f"Navigating to login page: {LOGIN_URL}")
+        # Only the login form and the API response matter here; nothing is rendered for a screenshot
+        resource_filter = resource_filter_for()
         try:
-            page.goto(LOGIN_URL, wait_until="networkidle")
-            page.fill("#txtUserName", NOVATIME_USERNAME)
-            page.fill("#txtPassword", NOVATIME_PASSWORD)
-            page.click("input[value='Employee Web']")
-            # Wait for the page to load after login, allowing redirects
-            page.wait_for_load_state("networkidle")
+            # Set a large viewport size for consistency
+            context, page, warm = open_authenticated_context(
+                browser, NOVATIME_USERNAME, NOVATIME_PASSWORD, LOGIN_URL,
+                resource_filter=resource_filter,
+                viewport={"width": 2560, "height": 1440},
+            )
             print("✅ Successfully logged in.")
         except Exception as e:
             print(f"❌ Failed to log in: {e}")
             browser.close()
             return
 
+        if stream:
+            try:
+                print(f"Streaming timesheet data from: {NEW_TIMESHEET_API_URL}")
+                stream_historical(context, NEW_TIMESHEET_API_URL)
+                print("✅ Script completed successfully with JSON and CSV saved.")
+            except Exception as e:
+                print(f"❌ Failed to stream timesheet data: {e}")
+            if resource_filter:
+                print(resource_filter.report())
+            browser.close()
+            return warm
+
         # --- New Step: Directly fetch JSON data from the specified API URL ---
         captured_json_data = None
         try:
@@ -85,200 +238,91 @@ def login_and_grab_timesheet():
                 print(f"❌ Failed to fetch data from {NEW_TIMESHEET_API_URL}. "
                       f"Status: {response.status if response else 'No response'}")
                 browser.close()
-                return # Exit if data fetching failed
+                return warm # Exit if data fetching failed
 
         except json.JSONDecodeError as e:
             print(f"❌ Failed to decode JSON from the URL response: {e}")
             # Print only a snippet of the response text to avoid excessively long output
             print(f"Response text that caused error (first 500 chars): {json_data_str[:500] if 'json_data_str' in locals() else 'Not available'}")
             browser.close()
-            return
+            return warm
         except Exception as e:
             print(f"❌ An error occurred while fetching data from the URL: {e}")
             browser.close()
-            return
+            return warm
 
         if captured_json_data:
-            try:
-                # Files will be saved directly in the current directory
-                json_path = os.path.join(os.getcwd(), "historical_timesheet.json")
-                csv_path = os.path.join(os.getcwd(), "historical_timesheet.csv")
-
-                # 4) Save the captured JSON data to a file
-                with open(json_path, 'w') as f:
-                    json.dump(captured_json_data, f, indent=4)
-                print(f"✅ JSON data saved at {json_path}")
-
-                # 5) Process JSON data and save to CSV with new format
-                # Defined the exact column headers as per your request, including empty columns
-                # Re-added \xa0 (non-breaking space) to match the other program's expectation
-                column_headers = [
-                    "Date", "Pay Code", "In", "", "Out", "", "Reg", "OT-1", "OT-2",
-                    "Daily Hours\xa0*", "Shift Exp", "Schedule", "Total Hours\xa0*",
-                    "Account", "ActShortCode", "Facility", "", "", "", ""
-                ]
-
-                # Mapping for direct fields from the JSON record
-                column_field_map = {
-                    "Pay Code": "cPayCodeDescription",
-                    "Schedule": "cSchedule",
-                    "Shift Exp": "cExpCode", # Using cExpCode for this field
-                }
-
-                records_to_process = captured_json_data.get('DataList', [])
-
-                # Sort records by dWorkDate and then by dOut (or dIn if dOut is often None)
-                # This helps identify the 'last' entry for a given day for Daily Hours calculation
-                def sort_key(rec):
-                    work_date_str = rec.get('dWorkDate', '').split(' ')[0]
-                    out_time_str = rec.get('dOut', '')
-                    try:
-                        work_date_obj = datetime.strptime(work_date_str, '%m/%d/%Y')
-                        # Use a placeholder time if dOut is None or invalid to ensure consistent sorting
-                        out_time_obj = datetime.strptime(out_time_str, '%m/%d/%Y %H:%M:%S') if out_time_str else datetime.min
-                        return (work_date_obj, out_time_obj)
-                    except ValueError:
-                        return (datetime.min, datetime.min) # Fallback for unparseable dates/times
-
-                records_to_process.sort(key=sort_key)
-
-                daily_hours_totals = {}
-                last_record_on_date = {} # Stores the last record object for each date
-
-                # First pass to calculate daily totals and identify last record per day
-                for rec in records_to_process:
-                    date_str = rec.get('dWorkDate')
-                    total_hours_for_punch = rec.get('nTotalHours', 0.0)
-                    if date_str:
-                        date_key = date_str.split(' ')[0] # e.g., "03/16/2022"
-                        daily_hours_totals[date_key] = daily_hours_totals.get(date_key, 0.0) + float(total_hours_for_punch)
-                        last_record_on_date[date_key] = rec # Update with the current record (last one encountered so far for this date)
-
-                with open(csv_path, 'w', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(column_headers)
-
-                    if not records_to_process:
-                        print("⚠️ No 'DataList' records found in the JSON data to write to CSV. The CSV will only contain headers.")
-
-                    for rec in records_to_process:
-                        row_data = []
-                        current_date_key = rec.get('dWorkDate', '').split(' ')[0]
-
-                        for col in column_headers:
-                            if col == "Date":
-                                date_value = rec.get('dWorkDate')
-                                if date_value is not None:
-                                    try:
-                                        # Parse "MM/DD/YYYY HH:MM:SS" and format to "DayOfWeek MM/DD/YYYY"
-                                        date_obj = datetime.strptime(date_value.split(' ')[0], '%m/%d/%Y')
-                                        row_data.append(date_obj.strftime('%a %m/%d/%Y'))
-                                    except ValueError:
-                                        row_data.append(str(date_value)) # Fallback if parsing fails
-                                else:
-                                    row_data.append("") # Append empty string if None
-                            elif col == "In":
-                                in_time_value = rec.get('dIn')
-                                if in_time_value is not None:
-                                    try:
-                                        # Parse "MM/DD/YYYY HH:MM:SS" and format to "HH:MM AM/PM"
-                                        time_obj = datetime.strptime(in_time_value, '%m/%d/%Y %H:%M:%S')
-                                        row_data.append(time_obj.strftime('%I:%M %p'))
-                                    except ValueError:
-                                        row_data.append(str(in_time_value)) # Fallback if parsing fails
-                                else:
-                                    row_data.append("") # Append empty string if None
-                            elif col == "": # Handle the empty columns after "In" and "Out" and at the end
-                                row_data.append("")
-                            elif col == "Out":
-                                out_time_value = rec.get('dOut')
-                                if out_time_value is not None:
-                                    try:
-                                        # Parse "MM/DD/YYYY HH:MM:SS" and format to "HH:MM AM/PM"
-                                        time_obj = datetime.strptime(out_time_value, '%m/%d/%Y %H:%M:%S')
-                                        row_data.append(time_obj.strftime('%I:%M %p'))
-                                    except ValueError:
-                                        row_data.append(str(out_time_value)) # Fallback if parsing fails
-                                else:
-                                    row_data.append("") # Append empty string if None
-                            elif col == "Reg":
-                                reg_pay = rec.get('nWorkHours', 0.0)
-                                row_data.append(f"{float(reg_pay):.2f}") # Format to 2 decimal places
-                            elif col == "OT-1":
-                                ot1_pay = rec.get('nOT1Pay', 0.0)
-                                row_data.append(f"{float(ot1_pay):.2f}") # Format to 2 decimal places
-                            elif col == "OT-2":
-                                ot2_pay = rec.get('nOT2Pay', 0.0)
-                                row_data.append(f"{float(ot2_pay):.2f}") # Format to 2 decimal places
-                            elif col == "Daily Hours\xa0*": # Re-added non-breaking space
-                                # Populate Daily Hours only if this is the last record for the day
-                                if rec == last_record_on_date.get(current_date_key):
-                                    row_data.append(f"{daily_hours_totals.get(current_date_key, 0.0):.1f}") # Format to 1 decimal place
-                                else:
-                                    row_data.append("") # Leave empty for other entries on the same day
-                            elif col == "Total Hours\xa0*": # Re-added non-breaking space
-                                # This is the nDailyTotalHours for the individual punch, formatted to 1 decimal place
-                                total_hours_punch = rec.get('nDailyTotalHours', 0.0)
-                                row_data.append(f"{float(total_hours_punch):.1f}")
-                            elif col == "Account":
-                                account_value = ""
-                                # Iterate through GroupValueList to find Account (iGroupNumber 12)
-                                for group_val in rec.get('GroupValueList', []):
-                                    if group_val.get('iGroupNumber') == 12:
-                                        c_group_value = group_val.get('cGroupValue', '')
-                                        c_group_value_description = group_val.get('cGroupValueDescription', '')
-                                        account_value = f"{c_group_value} [{c_group_value_description}]"
-                                        break
-                                row_data.append(account_value)
-                            elif col == "ActShortCode":
-                                act_short_code_value = ""
-                                # Iterate through GroupValueList to find Activity ShortCode (iGroupNumber 3)
-                                for group_val in rec.get('GroupValueList', []):
-                                    if group_val.get('iGroupNumber') == 3:
-                                        c_group_value = group_val.get('cGroupValue', '')
-                                        c_group_value_description = group_val.get('cGroupValueDescription', '')
-                                        act_short_code_value = f"{c_group_value} [{c_group_value_description}]"
-                                        break
-                                row_data.append(act_short_code_value)
-                            elif col == "Facility":
-                                facility_value = ""
-                                # Iterate through GroupValueList to find FacilityName (iGroupNumber 1)
-                                for group_val in rec.get('GroupValueList', []):
-                                    if group_val.get('iGroupNumber') == 1:
-                                        c_group_value = group_val.get('cGroupValue', '')
-                                        c_group_value_description = group_val.get('cGroupValueDescription', '')
-                                        facility_value = f"{c_group_value} [{c_group_value_description}]"
-                                        break
-                                row_data.append(facility_value)
-                            elif col == "Shift Exp":
-                                value = rec.get(column_field_map.get(col, col), "")
-                                row_data.append(str(value))
-                            else:
-                                # For other columns, use the direct field map
-                                value = rec.get(column_field_map.get(col, col), "")
-                                # Ensure numeric values are formatted to two decimal places if they are floats
-                                if isinstance(value, (int, float)):
-                                    row_data.append(f"{value:.2f}") # Default to 2 for non-hour numbers
-                                else:
-                                    row_data.append(str(value))
-
-                        writer.writerow(row_data)
-                print(f"✅ Timesheet CSV file saved at {csv_path}")
-
-                print("✅ Script completed successfully with JSON and CSV saved.")
-
-            except Exception as e:
-                print(f"❌ Failed to process captured JSON data and save files: {e}")
+            save_historical(captured_json_data)
         else:
             print("❌ No JSON data was captured from the API URL. No files saved.")
 
+        if resource_filter:
+            print(resource_filter.report())
         browser.close()
+        return warm
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export NovaTime timesheet history to JSON and CSV.")
+    parser.add_argument("--start", help="backfill start date (MM/DD/YYYY); fetched in concurrent windows")
+    parser.add_argument("--end", help="backfill end date (MM/DD/YYYY), default today")
+    parser.add_argument("--window", choices=["month", "payperiod"], default=BACKFILL_WINDOW,
+                        help="size of each backfill window")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY,
+                        help="backfill windows fetched at once")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fetch open or changed pay periods and merge them into the existing export")
+    parser.add_argument("--stream", action="store_true",
+                        default=os.getenv("HISTORICAL_STREAMING", "false").lower() == "true",
+                        help="parse the full-history response incrementally with bounded memory")
+    args = parser.parse_args()
+
     # Check if necessary environment variables are set
     if not NOVATIME_USERNAME or not NOVATIME_PASSWORD:
         print("❌ Missing NOVATIME_USERNAME or NOVATIME_PASSWORD in your .env file.")
     elif not LOGIN_URL:
         print("❌ Missing LOGIN_URL in your .env file.")
+    elif (args.incremental or args.start) and not (os.getenv("NOVATIME_ACCESS_SEQ") and os.getenv("NOVATIME_EMPLOYEE_SEQ")):
+        print("❌ Backfill and incremental sync need NOVATIME_ACCESS_SEQ and NOVATIME_EMPLOYEE_SEQ in your .env file.")
+    elif args.incremental:
+        run_start = time.monotonic()
+        existing_path = os.path.join(os.getcwd(), "historical_timesheet.json")
+        existing_records, full_sync = None, False
+        if os.path.exists(existing_path):
+            try:
+                with open(existing_path, "r", encoding="utf-8") as f:
+                    existing_records = json.load(f).get("DataList", [])
+            except (json.JSONDecodeError, OSError) as e:
+                # Nothing trustworthy to compare against: every pay period is fetched again
+                print(f"⚠️ Could not read {existing_path} ({e}); running a full sync.")
+                existing_records, full_sync = [], True
+        if existing_records is None:
+            # Without a JSON export the database holds the previous sync's records
+            store = open_store()
+            existing_records = query_records(store)
+            store.close()
+        start_date = datetime.strptime(args.start, "%m/%d/%Y").date() if args.start else None
+        try:
+            records, changed = run_sync(NOVATIME_USERNAME, NOVATIME_PASSWORD, LOGIN_URL, existing_records,
+                                        start=start_date, concurrency=max(1, args.concurrency), full=full_sync)
+        except ValueError as e:
+            print(f"❌ {e}: pass --start MM/DD/YYYY")
+            records, changed = None, {}
+        if records is not None and changed:
+            save_historical({"DataList": records},
+                            changed_records=[rec for period in changed.values() for rec in period])
+        elif records is not None:
+            print("✅ Nothing changed since the last sync; existing files kept.")
+        print(f"⏱️ Incremental sync finished in {time.monotonic() - run_start:.2f}s")
+    elif args.start:
+        run_start = time.monotonic()
+        start_date = datetime.strptime(args.start, "%m/%d/%Y").date()
+        end_date = datetime.strptime(args.end, "%m/%d/%Y").date() if args.end else datetime.now().date()
+        records = run_backfill(NOVATIME_USERNAME, NOVATIME_PASSWORD, LOGIN_URL, start_date, end_date,
+                               window=args.window, concurrency=max(1, args.concurrency))
+        if records is not None:
+            save_historical({"DataList": records})
+        print(f"⏱️ Backfill finished in {time.monotonic() - run_start:.2f}s")
     else:
-        login_and_grab_timesheet()
+        run_start = time.monotonic()
+        warm = login_and_grab_timesheet(stream=args.stream)
+        print(f"⏱️ Run finished in {time.monotonic() - run_start:.2f}s ({'warm' if warm else 'cold'} session)")
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import calendar
+import hashlib
+from datetime import timedelta
+from playwright.async_api import async_playwright
+from dotenv import load_dotenv
+from session_cache import open_authenticated_context_async
+from resource_filter import resource_filter_for
+from output_channel import atomic_write
+from novatime_api import pay_period_for, build_timesheet_url, fetch_timesheet_json_async
+from novatime_time import parse_date
+
+# --- Load environment variables from .env ---
+load_dotenv()
+BACKFILL_WINDOW = os.getenv("BACKFILL_WINDOW", "month")  # "month" or "payperiod"
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "4"))
+BACKFILL_RETRIES = int(os.getenv("BACKFILL_RETRIES", "3"))
+BACKFILL_TIMEOUT_MS = int(os.getenv("BACKFILL_TIMEOUT_MS", "60000"))
+
+# Completed windows are checkpointed here so a failed backfill resumes where it stopped
+CHECKPOINT_ROOT = os.path.join(os.getcwd(), ".backfill")
+
+
+def split_windows(start, end, window=BACKFILL_WINDOW):
+    """Splits [start, end] into (window_start, window_end) date pairs by pay period or calendar month."""
+    windows = []
+    current = start
+    while current <= end:
+        if window == "payperiod":
+            window_end = pay_period_for(current)[1]
+        elif window == "month":
+            window_end = current.replace(day=calendar.monthrange(current.year, current.month)[1])
+        else:
+            raise ValueError(f"Unknown backfill window {window!r} (use 'month' or 'payperiod')")
+        window_end = min(window_end, end)
+        windows.append((current, window_end))
+        current = window_end + timedelta(days=1)
+    return windows
+
+
+def checkpoint_dir(start, window):
+    """
+    Checkpoint folder for backfills from `start` in `window`s. The end date is left out so a rerun
+    on a later day (end defaults to today) still resumes; every window has its own file in it.
+    """
+    key = hashlib.sha256(f"{start}|{window}".encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CHECKPOINT_ROOT, key)
+
+
+def window_path(folder, window_start, window_end):
+    return os.path.join(folder, f"{window_start:%Y%m%d}_{window_end:%Y%m%d}.json")
+
+
+def write_json_atomic(path, data):
+    """Writes JSON via a temp file + rename (atomic_write) so a crash never leaves a half-written checkpoint."""
+    with atomic_write(path) as f:
+        json.dump(data, f)
+
+
+async def fetch_window(context, window_start, window_end, folder, semaphore):
+    """Fetches one window (retrying it on its own) and checkpoints its DataList. Returns the record count or None."""
+    path = window_path(folder, window_start, window_end)
+    label = f"{window_start:%m/%d/%Y} - {window_end:%m/%d/%Y}"
+    if os.path.exists(path):
+        print(f"⏭️ Window {label} already fetched, skipping")
+        return 0
+
+    url = build_timesheet_url(window_start, window_end, custom_range=True)
+    async with semaphore:
+        for attempt in range(1, BACKFILL_RETRIES + 1):
+            try:
+                body = await fetch_timesheet_json_async(context.request, url, timeout=BACKFILL_TIMEOUT_MS)
+                records = json.loads(body).get("DataList", [])
+                write_json_atomic(path, records)
+                print(f"✅ Window {label}: {len(records)} records")
+                return len(records)
+            except Exception as e:
+                if attempt == BACKFILL_RETRIES:
+                    print(f"❌ Window {label} failed after {attempt} attempts: {e}")
+                    return None
+                print(f"⚠️ Window {label} attempt {attempt} failed ({e}), retrying...")
+                await asyncio.sleep(2 ** attempt)
+
+
+def in_window(rec, window_start, window_end):
+    """Whether the record's work date falls in [window_start, window_end]; undated records always do."""
+    parsed = parse_date(rec["dWorkDate"]) if rec.get("dWorkDate") else None
+    return parsed is None or window_start <= parsed.date() <= window_end
+
+
+def merge_windows(folder, windows):
+    """
+    Merges checkpointed windows in date order. The windows are disjoint, so a record the server
+    returns outside its window's dates (e.g. a shift spilling over the edge) is dropped there and
+    kept by its own window; identical lines within one window (two PTO lines) are all kept.
+    """
+    merged = []
+    for window_start, window_end in windows:
+        with open(window_path(folder, window_start, window_end), "r", encoding="utf-8") as f:
+            merged.extend(rec for rec in json.load(f) if in_window(rec, window_start, window_end))
+    return merged
+
+
+async def fetch_windows(username, password, login_url, windows, folder, concurrency):
+    """Logs in once and fetches every window into `folder` concurrently. Returns the per-window results."""
+    os.makedirs(folder, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            context, _ = await open_authenticated_context_async(
+                browser, username, password, login_url, resource_filter=resource_filter_for())
+            return await asyncio.gather(*(
+                fetch_window(context, window_start, window_end, folder, semaphore)
+                for window_start, window_end in windows
+            ))
+        finally:
+            await browser.close()
+
+
+async def backfill(username, password, login_url, start, end, window=BACKFILL_WINDOW,
+                   concurrency=BACKFILL_CONCURRENCY):
+    """
+    Fetches [start, end] as concurrent date windows and returns the merged DataList, or None if some windows still failed (rerun to resume from the checkpoints).
+    """
+    windows = split_windows(start, end, window)
+    folder = checkpoint_dir(start, window)
+    print(f"📆 Backfilling {start:%m/%d/%Y} - {end:%m/%d/%Y} as {len(windows)} {window} windows "
+          f"(concurrency {concurrency})")
+
+    run_start = time.monotonic()
+    results = await fetch_windows(username, password, login_url, windows, folder, concurrency)
+
+    failed = sum(1 for result in results if result is None)
+    print(f"⏱️ Fetched {len(windows) - failed}/{len(windows)} windows in {time.monotonic() - run_start:.2f}s")
+    if failed:
+        print(f"❌ {failed} windows failed; rerun the same command to resume from {folder}")
+        return None
+
+    records = merge_windows(folder, windows)
+    shutil.rmtree(folder, ignore_errors=True)
+    print(f"✅ Merged {len(records)} records")
+    return records
+
+
+def run_backfill(username, password, login_url, start, end, window=BACKFILL_WINDOW,
+                 concurrency=BACKFILL_CONCURRENCY):
+    """Synchronous entry point for backfill()."""
+    return asyncio.run(backfill(username, password, login_url, start, end, window, concurrency))
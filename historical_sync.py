@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+from novatime_api import pay_period_for, datalist_hash
+from novatime_time import parse_date
+from historical_backfill import (
+    fetch_windows, window_path, write_json_atomic, CHECKPOINT_ROOT, BACKFILL_CONCURRENCY,
+)
+
+# --- Load environment variables from .env ---
+load_dotenv()
+# A pay period counts as closed (never refetched once hashed) this many days after it ends
+SYNC_CLOSE_AFTER_DAYS = int(os.getenv("SYNC_CLOSE_AFTER_DAYS", "14"))
+
+# Watermark: last synced work date plus a content hash per pay period
+SYNC_STATE_PATH = os.path.join(os.getcwd(), "historical_sync_state.json")
+
+
+def period_id(period_start, period_end):
+    return f"{period_start:%Y%m%d}_{period_end:%Y%m%d}"
+
+
+def work_date_of(rec):
+    """The record's work date as a date, or None."""
+    value = rec.get("dWorkDate")
+    if not value:
+        return None
+    parsed = parse_date(value)
+    return parsed.date() if parsed else None
+
+
+def load_sync_state(path=SYNC_STATE_PATH):
+    if not os.path.exists(path):
+        return {"start": None, "last_work_date": None, "periods": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_sync_state(state, path=SYNC_STATE_PATH):
+    write_json_atomic(path, state)
+
+
+def periods_to_fetch(state, start, today=None):
+    """
+    Pay periods from `start` to today that are new, still open, or closed but never hashed after
+    closing, as (period_start, period_end, fetch_end, closed). Periods are always identified by
+    their full pay_period_for() bounds; only the fetch of the current one stops at today.
+    """
+    today = today or date.today()
+    close_before = today - timedelta(days=SYNC_CLOSE_AFTER_DAYS)
+    pending = []
+    period_start = pay_period_for(start)[0]
+    while period_start <= today:
+        period_end = pay_period_for(period_start)[1]
+        known = state["periods"].get(period_id(period_start, period_end))
+        if not (known and known.get("closed")):
+            pending.append((period_start, period_end, min(period_end, today), period_end < close_before))
+        period_start = period_end + timedelta(days=1)
+    return pending
+
+
+def drop_partial_periods(state):
+    """Removes state entries keyed by a pay period cut short at the sync day (written by older versions)."""
+    for key in list(state["periods"]):
+        try:
+            period_start, period_end = (datetime.strptime(part, "%Y%m%d").date() for part in key.split("_"))
+        except ValueError:
+            continue
+        if (period_start, period_end) != pay_period_for(period_start):
+            del state["periods"][key]
+
+
+def merge_period(records_by_period, period_start, period_end, records):
+    """Replaces everything stored for one pay period with its freshly fetched records."""
+    records_by_period[period_id(period_start, period_end)] = [
+        rec for rec in records
+        if work_date_of(rec) is None or period_start <= work_date_of(rec) <= period_end
+    ]
+
+
+def group_by_period(records):
+    """Buckets stored records by the pay period of their work date."""
+    grouped = {}
+    for rec in records:
+        work_date = work_date_of(rec)
+        key = period_id(*pay_period_for(work_date)) if work_date else "undated"
+        grouped.setdefault(key, []).append(rec)
+    return grouped
+
+
+async def sync_incremental(username, password, login_url, existing_records, start=None,
+                           concurrency=BACKFILL_CONCURRENCY, state_path=SYNC_STATE_PATH, full=False):
+    """
+    Fetches only open, new or not-yet-finalized pay periods and merges changed ones into
+    `existing_records`. Returns (records, changed) where changed maps each changed period's id to
+    its fetched records (empty when nothing changed); records is None if some periods failed.
+    With full=True every pay period since the start is fetched again, closed ones included.
+    """
+    state = load_sync_state(state_path)
+    if full:
+        state["periods"] = {}
+    if start is None:
+        if not state["start"]:
+            raise ValueError("First incremental sync needs a start date")
+        start = datetime.strptime(state["start"], "%m/%d/%Y").date()
+    state["start"] = state["start"] or start.strftime("%m/%d/%Y")
+    drop_partial_periods(state)
+
+    pending = periods_to_fetch(state, start)
+    windows = [(period_start, fetch_end) for period_start, _, fetch_end, _ in pending]
+    skipped = sum(1 for period in state["periods"].values() if period.get("closed"))
+    print(f"🔄 Incremental sync: {len(windows)} open/new pay periods to fetch, {skipped} closed periods skipped")
+    if not windows:
+        return existing_records, {}
+
+    folder = os.path.join(CHECKPOINT_ROOT, "sync")
+    shutil.rmtree(folder, ignore_errors=True)  # Open periods must always be fetched fresh
+    run_start = time.monotonic()
+    results = await fetch_windows(username, password, login_url, windows, folder, concurrency)
+    print(f"⏱️ Fetched {len(windows)} pay periods in {time.monotonic() - run_start:.2f}s")
+    if any(result is None for result in results):
+        print("❌ Some pay periods failed; the watermark was not advanced.")
+        return None, {}
+
+    records_by_period = group_by_period(existing_records)
+    changed = {}
+    for period_start, period_end, fetch_end, closed in pending:
+        key = period_id(period_start, period_end)
+        with open(window_path(folder, period_start, fetch_end), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        digest = datalist_hash(records)
+        previous = state["periods"].get(key)
+        if not previous or previous["hash"] != digest or (records and key not in records_by_period):
+            merge_period(records_by_period, period_start, period_end, records)
+            changed[key] = records_by_period[key]
+        state["periods"][key] = {"hash": digest, "closed": closed, "count": len(records)}
+    shutil.rmtree(folder, ignore_errors=True)
+
+    merged = [rec for key in sorted(records_by_period) for rec in records_by_period[key]]
+    work_dates = [work_date_of(rec) for rec in merged]
+    work_dates = [d for d in work_dates if d]
+    if work_dates:
+        state["last_work_date"] = max(work_dates).strftime("%m/%d/%Y")
+    save_sync_state(state, state_path)
+    print(f"✅ {len(changed)} pay periods changed, watermark at {state['last_work_date']}")
+    return merged, changed
+
+
+def run_sync(username, password, login_url, existing_records, start=None, concurrency=BACKFILL_CONCURRENCY,
+             full=False):
+    """Synchronous entry point for sync_incremental()."""
+    return asyncio.run(sync_incremental(username, password, login_url, existing_records, start, concurrency,
+                                        full=full))
@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode, quote
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+API_PREFIX = os.getenv("API_PREFIX")
+NOVATIME_ACCESS_SEQ = os.getenv("NOVATIME_ACCESS_SEQ", "")
+NOVATIME_EMPLOYEE_SEQ = os.getenv("NOVATIME_EMPLOYEE_SEQ", "")
+# Any date that starts a pay period; periods repeat every PAY_PERIOD_DAYS from it
+PAY_PERIOD_ANCHOR = os.getenv("PAY_PERIOD_ANCHOR", "07/13/2025")
+PAY_PERIOD_DAYS = int(os.getenv("PAY_PERIOD_DAYS", "7"))
+API_TIMEOUT_MS = int(os.getenv("API_TIMEOUT_MS", "60000"))
+
+# NovaTime's Angular client sends dates as e.g. "Tue Mar 01 2022"
+API_DATE_FORMAT = "%a %b %d %Y"
+
+
+def pay_period_for(day=None, anchor=None, length=None):
+    """Returns (start, end) dates of the pay period containing `day` (default: today)."""
+    day = day or date.today()
+    anchor = anchor or datetime.strptime(PAY_PERIOD_ANCHOR, "%m/%d/%Y").date()
+    length = length or PAY_PERIOD_DAYS
+    offset = (day - anchor).days % length
+    start = day - timedelta(days=offset)
+    return start, start + timedelta(days=length - 1)
+
+
+# Fields that together identify one punch/pay-code line in DataList
+RECORD_KEY_FIELDS = ("dWorkDate", "dIn", "dOut", "cPayCodeDescription", "nTotalHours")
+
+
+def record_key(rec):
+    """Identity of a DataList record, used to deduplicate overlapping fetches."""
+    return tuple(rec.get(field) for field in RECORD_KEY_FIELDS)
+
+
+# Fields of a record that stay the same for its whole life: an open punch gets its Out and
+# hours later, so those are left out (record_key() matches exact repeats instead)
+RECORD_IDENTITY_FIELDS = ("dWorkDate", "dIn", "cPayCodeDescription")
+
+
+def record_identity(rec):
+    """Identity of a DataList record across fetches, used as the timesheet database's key."""
+    return tuple(rec.get(field) for field in RECORD_IDENTITY_FIELDS)
+
+
+def datalist_hash(records):
+    """
+    Order-independent content hash of a DataList: each record in canonical JSON (sorted keys, no
+    whitespace), sorted. Neither formatting nor the server reordering records counts as a change.
+    """
+    canonical = sorted(json.dumps(rec, sort_keys=True, separators=(",", ":")) for rec in records)
+    return hashlib.sha256("\n".join(canonical).encode("utf-8")).hexdigest()
+
+
+def build_timesheet_url(start, end, custom_range=False, api_url=None,
+                        access_seq=None, employee_seq=None):
+    """Builds a timesheetdetail URL with the same query the NovaTime UI sends."""
+    params = {
+        "AccessSeq": access_seq or NOVATIME_ACCESS_SEQ,
+        "EmployeeSeq": employee_seq or NOVATIME_EMPLOYEE_SEQ,
+        "StartDate": start.strftime(API_DATE_FORMAT),
+        "EndDate": end.strftime(API_DATE_FORMAT),
+        "UserSeq": 0,
+        "CustomDateRange": "true" if custom_range else "false",
+        "ShowOneMoreDay": "false",
+        "EmployeeSeqList": "",
+        "DailyDate": start.strftime(API_DATE_FORMAT),
+        "ForceAbsent": "false",
+        "PolicyGroup": "",
+    }
+    return f"{api_url or API_PREFIX}?{urlencode(params, quote_via=quote)}"
+
+
+def fetch_timesheet_json(request_context, url, timeout=None):
+    """
+    Calls timesheetdetail through a Playwright APIRequestContext (browser or context .request)
+    and returns the raw JSON text. The request carries the session's cookies, no page is rendered.
+    """
+    response = request_context.get(url, timeout=timeout or API_TIMEOUT_MS)
+    if not response.ok:
+        raise RuntimeError(f"timesheetdetail returned HTTP {response.status}")
+    body = response.text()
+    # An expired session gets the login form back instead of JSON
+    if not body.lstrip().startswith(("{", "[")):
+        raise RuntimeError("timesheetdetail did not return JSON (session expired?)")
+    return body
+
+
+async def fetch_timesheet_json_async(request_context, url, timeout=None):
+    """Async version of fetch_timesheet_json for async_playwright request contexts."""
+    response = await request_context.get(url, timeout=timeout or API_TIMEOUT_MS)
+    if not response.ok:
+        raise RuntimeError(f"timesheetdetail returned HTTP {response.status}")
+    body = await response.text()
+    if not body.lstrip().startswith(("{", "[")):
+        raise RuntimeError("timesheetdetail did not return JSON (session expired?)")
+    return body
+
+
+def fetch_pay_period(request_context, day=None, timeout=None):
+    """Fetches the raw timesheetdetail JSON for the pay period containing `day`."""
+    start, end = pay_period_for(day)
+    url = build_timesheet_url(start, end)
+    print(f"🌐 Fetching timesheetdetail directly for {start:%m/%d/%Y} - {end:%m/%d/%Y}")
+    return fetch_timesheet_json(request_context, url, timeout)
@@ -0,0 +1,99 @@
+import os
+from datetime import datetime
+from functools import lru_cache
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+# Distinct timestamp strings remembered; work dates repeat for every punch of the day
+TIMESTAMP_CACHE_SIZE = int(os.getenv("TIMESTAMP_CACHE_SIZE", "65536"))
+
+NOVATIME_DATETIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+NOVATIME_DATE_FORMAT = "%m/%d/%Y"
+
+# Parsed timestamps are attached to each record under this key (see annotate_timestamps)
+TIMESTAMPS_KEY = "_timestamps"
+TIMESTAMP_FIELDS = ("dWorkDate", "dIn", "dOut")
+
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_datetime(value):
+    """
+    Parses NovaTime's fixed "MM/DD/YYYY HH:MM:SS" by slicing, falling back to strptime for
+    anything irregular (e.g. single-digit months). Returns None when it doesn't parse.
+    """
+    try:
+        if len(value) == 19 and value[2] == "/" and value[5] == "/" and value[10] == " ":
+            return datetime(int(value[6:10]), int(value[0:2]), int(value[3:5]),
+                            int(value[11:13]), int(value[14:16]), int(value[17:19]))
+        return datetime.strptime(value, NOVATIME_DATETIME_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_date(value):
+    """Parses the date part of a NovaTime timestamp ("MM/DD/YYYY[ ...]") as midnight, or None."""
+    try:
+        value = value.split(" ")[0]
+        if len(value) == 10 and value[2] == "/" and value[5] == "/":
+            return datetime(int(value[6:10]), int(value[0:2]), int(value[3:5]))
+        return datetime.strptime(value, NOVATIME_DATE_FORMAT)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def parse_column(values, parser=parse_datetime):
+    """
+    Parses a whole column at once: every distinct string is parsed a single time and the
+    results are mapped back, which is what makes repeated work dates nearly free.
+    """
+    unique = {value: parser(value) for value in set(values) if value}
+    return [unique.get(value) if value else None for value in values]
+
+
+def annotate_timestamps(records):
+    """
+    Parses dWorkDate (date part), dIn and dOut for a list of records column by column and stores
+    them on each record under TIMESTAMPS_KEY, so sorting and formatting never parse again.
+    """
+    columns = {
+        field: parse_column([rec.get(field) for rec in records], parse_date if field == "dWorkDate" else parse_datetime)
+        for field in TIMESTAMP_FIELDS
+    }
+    for index, rec in enumerate(records):
+        rec[TIMESTAMPS_KEY] = {field: columns[field][index] for field in TIMESTAMP_FIELDS}
+    return records
+
+
+def timestamps_of(rec):
+    """Returns the record's parsed timestamps, parsing (through the cache) and attaching them if needed."""
+    parsed = rec.get(TIMESTAMPS_KEY)
+    if parsed is None:
+        parsed = {
+            "dWorkDate": parse_date(rec.get("dWorkDate")),
+            "dIn": parse_datetime(rec.get("dIn")),
+            "dOut": parse_datetime(rec.get("dOut")),
+        }
+        rec[TIMESTAMPS_KEY] = parsed
+    return parsed
+
+
+def strip_timestamps(rec):
+    """A copy of the record without the attached timestamps, for serializing."""
+    if TIMESTAMPS_KEY not in rec:
+        return rec
+    return {key: value for key, value in rec.items() if key != TIMESTAMPS_KEY}
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def format_work_date(parsed):
+    """Same as strftime("%a %m/%d/%Y") in the C locale, cached per work date."""
+    return f"{_WEEKDAYS[parsed.weekday()]} {parsed.month:02d}/{parsed.day:02d}/{parsed.year}"
+
+
+def format_clock(parsed):
+    """Same as strftime("%I:%M %p") in the C locale."""
+    return f"{parsed.hour % 12 or 12:02d}:{parsed.minute:02d} {'AM' if parsed.hour < 12 else 'PM'}"
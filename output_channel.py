@@ -0,0 +1,133 @@
+import os
+import re
+import sys
+import csv
+import json
+import socket
+import threading
+from contextlib import contextmanager, nullcontext
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+# Where timesheet rows are streamed besides timesheet.csv: "stdout", "none", "pipe:/path/to/fifo" or "unix:/path/to/socket"
+TIMESHEET_OUTPUT = os.getenv("TIMESHEET_OUTPUT", "stdout")
+# "csv" or "ndjson" (one JSON object per row, keyed by column name)
+TIMESHEET_OUTPUT_FORMAT = os.getenv("TIMESHEET_OUTPUT_FORMAT", "csv").lower()
+
+# Held while one export writes its rows to the channel, so concurrent exports (team runs) take turns
+_CHANNEL_LOCK = threading.Lock()
+
+
+@contextmanager
+def atomic_write(path, newline=None, binary=False):
+    """
+    Opens a hidden temp file next to `path` and renames it over `path` once the block finishes,
+    so watchers only ever see the complete file. The temp file is removed if the block fails.
+    With binary=True the file is opened in "wb" mode.
+    """
+    folder, name = os.path.split(os.path.abspath(path))
+    tmp_path = os.path.join(folder, f".{name}.{os.getpid()}.tmp")
+    try:
+        with (open(tmp_path, "wb") if binary else open(tmp_path, "w", newline=newline, encoding="utf-8")) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def open_channel(target=None):
+    """
+    Yields a text stream for TIMESHEET_OUTPUT, or None when it is off or cannot be opened.
+    Opening a pipe blocks until a reader opens the other end.
+    """
+    target = target if target is not None else TIMESHEET_OUTPUT
+    if target in ("", "none"):
+        yield None
+        return
+    if target == "stdout":
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    kind, _, path = target.partition(":")
+    try:
+        if kind == "pipe":
+            stream = open(path, "w", newline="", encoding="utf-8")
+        elif kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(path)
+            stream = sock.makefile("w", newline="", encoding="utf-8")
+            sock.close()  # The file object keeps the connection open until it is closed
+        else:
+            raise ValueError(f"unknown TIMESHEET_OUTPUT {target!r}")
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Timesheet output channel unavailable ({e}); rows go to the CSV file only.")
+        yield None
+        return
+    with stream:
+        yield stream
+
+
+class RowTee:
+    """
+    csv.writer-like sink: every row goes to the CSV file (if any) and, as CSV or NDJSON, to the
+    output channel (if any) in the same pass, so nothing is read back from disk.
+    """
+
+    def __init__(self, columns, file=None, channel=None, fmt=None):
+        self.columns = list(columns)
+        self.fmt = fmt or TIMESHEET_OUTPUT_FORMAT
+        self.file_writer = csv.writer(file) if file is not None else None
+        self.channel = channel
+        self.channel_writer = None
+        if channel is not None and self.fmt == "csv":
+            self.channel_writer = csv.writer(channel, lineterminator="\n")
+
+    def writeheader(self):
+        if self.file_writer:
+            self.file_writer.writerow(self.columns)
+        if self.channel_writer:
+            self.channel_writer.writerow(self.columns)
+
+    def writerow(self, row):
+        if self.file_writer:
+            self.file_writer.writerow(row)
+        if self.channel_writer:
+            self.channel_writer.writerow(row)
+        elif self.channel is not None:
+            self.channel.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n")
+
+    def writerows(self, rows):
+        count = 0
+        for row in rows:
+            self.writerow(row)
+            count += 1
+        return count
+
+
+def timesheet_markers(employee=None):
+    """Stdout frame name: TIMESHEET, or TIMESHEET_<EMPLOYEE> for one employee of a team run."""
+    if not employee:
+        return "TIMESHEET"
+    return "TIMESHEET_" + (re.sub(r"[^A-Z0-9]+", "_", str(employee).upper()).strip("_") or "EMPLOYEE")
+
+
+@contextmanager
+def tee_rows(columns, file=None, target=None, fmt=None, markers="TIMESHEET"):
+    """
+    Yields a RowTee writing to `file` and the output channel. On stdout the rows are framed by
+    -----BEGIN_<markers>_<FORMAT>----- / -----END_<markers>_<FORMAT>----- lines for scrapers.
+    Blocks written from several threads never interleave.
+    """
+    fmt = fmt or TIMESHEET_OUTPUT_FORMAT
+    with open_channel(target) as channel, (_CHANNEL_LOCK if channel is not None else nullcontext()):
+        framed = channel is sys.stdout and markers
+        if framed:
+            print(f"-----BEGIN_{markers}_{fmt.upper()}-----", flush=True)
+        try:
+            yield RowTee(columns, file=file, channel=channel, fmt=fmt)
+        finally:
+            if framed:
+                print(f"-----END_{markers}_{fmt.upper()}-----", flush=True)
@@ -0,0 +1,68 @@
+import os
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+API_PREFIX = os.getenv("API_PREFIX")
+# How long to wait for the timesheetdetail response / timesheet frame
+WAIT_TIMEOUT_MS = int(os.getenv("WAIT_TIMEOUT_MS", "120000"))
+# How long to wait for the timesheet table to render (only needed for the screenshot)
+RENDER_TIMEOUT_MS = int(os.getenv("RENDER_TIMEOUT_MS", "15000"))
+
+TIMESHEET_FRAME_MARKER = "TimesheetSection"
+
+
+def is_timesheet_response(response):
+    """Matches the timesheetdetail API response the timesheet page loads its data from."""
+    return API_PREFIX in response.url and response.request.method != "OPTIONS"
+
+
+def wait_for_timesheet_response(page, action, timeout=None):
+    """
+    Runs `action()` (a click, goto, select...) and returns the first timesheetdetail
+    response it triggers, as soon as it arrives. Raises a Playwright TimeoutError otherwise.
+    """
+    with page.expect_response(is_timesheet_response, timeout=timeout or WAIT_TIMEOUT_MS) as info:
+        action()
+    response = info.value
+    print(f"✅ Found matching JSON API request: {response.url}")
+    return response
+
+
+def find_timesheet_frame(page, response=None, timeout=None):
+    """
+    Returns the frame showing the timesheet without ever serializing frame content.
+    Prefers the frame that issued the timesheetdetail request, then a one-shot check of
+    the current frames, then waits for a frame to navigate to a TimesheetSection URL.
+    """
+    if response is not None:
+        try:
+            frame = response.frame
+            if frame is not None and frame is not page.main_frame:
+                return frame
+        except Exception:
+            pass  # Service worker responses have no frame
+
+    for frame in page.frames:
+        try:
+            if TIMESHEET_FRAME_MARKER in frame.url or frame.locator(f"#{TIMESHEET_FRAME_MARKER}").count():
+                return frame
+        except Exception:
+            pass  # Detached frames can't be queried
+
+    try:
+        return page.wait_for_event(
+            "framenavigated",
+            predicate=lambda frame: TIMESHEET_FRAME_MARKER in frame.url,
+            timeout=timeout or WAIT_TIMEOUT_MS,
+        )
+    except Exception:
+        return None
+
+
+def wait_for_render(page, selector, timeout=None):
+    """Waits for `selector` to become visible. Returns the element handle or None on timeout."""
+    try:
+        return page.wait_for_selector(selector, state="visible", timeout=timeout or RENDER_TIMEOUT_MS)
+    except Exception:
+        return None
@@ -0,0 +1,217 @@
+from operator import itemgetter
+from novatime_time import TIMESTAMPS_KEY, parse_date, parse_datetime, format_work_date, format_clock
+
+# --- Column specs -------------------------------------------------------------
+# Each column is (header, kind, *args):
+#   ("field", key)                  raw value, "" when missing
+#   ("text", key)                   str(value)
+#   ("text2", key)                  numbers as "0.00", everything else str(value)
+#   ("number", key, decimals)       float(value) with fixed decimals, 0 when missing
+#   ("date", key)                   work date as "Wed 03/16/2022"
+#   ("time", key)                   timestamp as "07:00 AM"
+#   ("daily_total", decimals)       the day's total passed in by the caller, "" when None
+#   ("group", picks, format)        picks = ((iGroupNumber, "first" | "last" | "fill"), ...), applied to the
+#                                   group entries in list order: "first" keeps the first match, "last" the
+#                                   latest one, "fill" only fills a still-empty cell;
+#                                   format = "desc" | "value" | "value [desc]"
+#   ("blank",)                      always ""
+
+# Layout written by timecard.py for the current pay period
+TIMECARD_PROFILE = {
+    "name": "timecard",
+    "group_sources": ("GroupingList", "GroupValueList"),
+    "columns": [
+        ("Date", "field", "DateKey"),
+        ("Pay Code", "field", "cPayCodeDescription"),
+        ("In", "field", "dIn"),
+        ("Out", "field", "dOut"),
+        ("Reg", "field", "nWorkHours"),
+        ("OT-1", "field", "nOT1Hours"),
+        ("OT-2", "field", "nOT2Hours"),
+        ("Daily Hours *", "field", "nDailyHours"),
+        ("Shift Exp", "field", "cShiftExpression"),
+        ("Schedule", "field", "cSchedule"),
+        ("Total Hours\xa0*", "field", "nWeeklyHours"),
+        ("Account", "group", ((3, "last"),), "desc"),
+        ("ActShortCode", "group", ((3, "last"),), "value"),
+        # Facility comes from group 17; a group 16 fills it in while it is still empty
+        ("Facility", "group", ((17, "last"), (16, "fill")), "desc"),
+    ],
+}
+
+# Layout written by fetch_historical_timesheet.py (blank columns mirror the NovaTime UI export)
+HISTORICAL_PROFILE = {
+    "name": "historical",
+    "group_sources": ("GroupValueList",),
+    "columns": [
+        ("Date", "date", "dWorkDate"),
+        ("Pay Code", "text2", "cPayCodeDescription"),
+        ("In", "time", "dIn"),
+        ("", "blank"),
+        ("Out", "time", "dOut"),
+        ("", "blank"),
+        ("Reg", "number", "nWorkHours", 2),
+        ("OT-1", "number", "nOT1Pay", 2),
+        ("OT-2", "number", "nOT2Pay", 2),
+        ("Daily Hours\xa0*", "daily_total", 1),
+        ("Shift Exp", "text", "cExpCode"),
+        ("Schedule", "text2", "cSchedule"),
+        ("Total Hours\xa0*", "number", "nDailyTotalHours", 1),
+        ("Account", "group", ((12, "first"),), "value [desc]"),
+        ("ActShortCode", "group", ((3, "first"),), "value [desc]"),
+        ("Facility", "group", ((1, "first"),), "value [desc]"),
+        ("", "blank"),
+        ("", "blank"),
+        ("", "blank"),
+        ("", "blank"),
+    ],
+}
+
+PROFILES = {
+    "timecard": TIMECARD_PROFILE,
+    "historical": HISTORICAL_PROFILE,
+}
+
+
+# Group formats: the entry key to copy, or a function building the cell from the entry
+_GROUP_FORMATS = {
+    "desc": "cGroupValueDescription",
+    "value": "cGroupValue",
+    "value [desc]": lambda grp: f"{grp.get('cGroupValue', '')} [{grp.get('cGroupValueDescription', '')}]",
+}
+
+_GROUP_PICKS = ("first", "last", "fill")
+
+
+def _text2(value):
+    return f"{value:.2f}" if isinstance(value, (int, float)) else str(value)
+
+
+def _date_cell(value, parsed=None):
+    if value is None:
+        return ""
+    parsed = parsed or parse_date(value)
+    return format_work_date(parsed) if parsed else str(value)
+
+
+def _time_cell(value, parsed=None):
+    if value is None:
+        return ""
+    parsed = parsed or parse_datetime(value)
+    return format_clock(parsed) if parsed else str(value)
+
+
+def _blank(rec, ts, daily_total):
+    return ""
+
+
+def _column_cell(kind, args):
+    """Function (rec, ts, daily_total) -> cell for one formatted column."""
+    if kind == "text":
+        key = args[0]
+        return lambda rec, ts, daily_total: str(rec.get(key, ""))
+    if kind == "text2":
+        key = args[0]
+        return lambda rec, ts, daily_total: _text2(rec.get(key, ""))
+    if kind == "number":
+        key, spec = args[0], f".{int(args[1])}f"
+        return lambda rec, ts, daily_total: format(float(rec.get(key, 0.0)), spec)
+    if kind == "daily_total":
+        spec = f".{int(args[0])}f"
+        return lambda rec, ts, daily_total: "" if daily_total is None else format(daily_total, spec)
+    # Reuse timestamps attached by novatime_time.annotate_timestamps when the record carries them
+    if kind == "date":
+        key = args[0]
+        if key == "dWorkDate":
+            return lambda rec, ts, daily_total: _date_cell(rec.get(key), ts.get(key))
+        return lambda rec, ts, daily_total: _date_cell(rec.get(key))
+    if kind == "time":
+        key = args[0]
+        if key in ("dIn", "dOut"):
+            return lambda rec, ts, daily_total: _time_cell(rec.get(key), ts.get(key))
+        return lambda rec, ts, daily_total: _time_cell(rec.get(key))
+    if kind == "blank":
+        return _blank
+    raise ValueError(f"Unknown column kind {kind!r}")
+
+
+def compile_profile(profile):
+    """
+    Compiles a column spec once into (headers, transform) where transform(rec, daily_total=None)
+    returns the CSV row. Plain fields are read with one itemgetter, formatted columns go through
+    their cell functions, and group columns are filled in one pass over the record's group
+    entries, with no per-record dispatch on column kinds.
+    """
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    columns = profile["columns"]
+    headers = [column[0] for column in columns]
+
+    # Cells are computed as fields + formatted + groups, then put back in column order
+    field_keys, field_at, cells, cell_at, group_at = [], [], [], [], []
+    rules = {}
+    for index, column in enumerate(columns):
+        kind, args = column[1], column[2:]
+        if kind == "field":
+            field_keys.append(args[0])
+            field_at.append(index)
+        elif kind == "group":
+            picks, fmt_name = args
+            fmt = _GROUP_FORMATS[fmt_name]
+            # (slot among the group columns, pick, entry key to copy, or None and a format function)
+            key, fmt = (fmt, None) if isinstance(fmt, str) else (None, fmt)
+            for number, pick in picks:
+                if pick not in _GROUP_PICKS:
+                    raise ValueError(f"Unknown group pick {pick!r}")
+                rules.setdefault(number, []).append((len(group_at), pick, key, fmt))
+            group_at.append(index)
+        else:
+            cells.append(_column_cell(kind, args))
+            cell_at.append(index)
+
+    positions = field_at + cell_at + group_at
+    order = None
+    if positions != sorted(positions):
+        order = itemgetter(*sorted(range(len(positions)), key=positions.__getitem__))
+    field_keys = tuple(field_keys)
+    get_fields = itemgetter(*field_keys) if len(field_keys) > 1 else lambda rec: tuple([rec[key] for key in field_keys])
+    rules = {number: tuple(entries) for number, entries in rules.items()}
+    sources = tuple(profile.get("group_sources", ())) if rules else ()
+    track_first = any(pick == "first" for entries in rules.values() for _, pick, _, _ in entries)
+    no_groups = ("",) * len(group_at)
+
+    def transform(rec, daily_total=None):
+        values = ()
+        if field_keys:
+            try:
+                values = get_fields(rec)
+            except KeyError:
+                values = tuple(rec.get(key, "") for key in field_keys)
+        if cells:
+            ts = rec.get(TIMESTAMPS_KEY) or {}
+            values = (*values, *[cell(rec, ts, daily_total) for cell in cells])
+        found = list(no_groups)
+        taken = set() if track_first else None
+        for source in sources:
+            entries = rec.get(source)
+            if not entries:
+                continue
+            for grp in entries:
+                number = grp.get("iGroupNumber")
+                if number not in rules:
+                    continue
+                for slot, pick, key, fmt in rules[number]:
+                    if pick != "last":
+                        if pick == "fill":
+                            if found[slot]:
+                                continue
+                        elif slot in taken:
+                            continue
+                        else:
+                            taken.add(slot)
+                    found[slot] = grp.get(key, "") if fmt is None else fmt(grp)
+        if order is None:
+            return [*values, *found]
+        return list(order((*values, *found)))
+
+    return headers, transform
@@ -0,0 +1,99 @@
+import os
+from collections import Counter
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+ENABLE_RESOURCE_BLOCKING = os.getenv("BLOCK_RESOURCES", "true").lower() == "true"
+
+
+def _env_list(name, default):
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+# Playwright resource types that are never needed to log in or to read timesheetdetail
+BLOCK_RESOURCE_TYPES = _env_list("BLOCK_RESOURCE_TYPES", "image,media,font,stylesheet")
+# Types allowed back when a screenshot of the rendered timesheet is wanted
+SCREENSHOT_RESOURCE_TYPES = _env_list("SCREENSHOT_RESOURCE_TYPES", "image,font,stylesheet")
+# URL substrings that are always blocked (analytics, tag managers, session recorders)
+BLOCK_URL_PATTERNS = _env_list(
+    "BLOCK_URL_PATTERNS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,hotjar.com,clarity.ms,"
+    "nr-data.net,newrelic.com,segment.io,facebook.net,fullstory.com",
+)
+# URL substrings that are never blocked, whatever their type
+ALLOW_URL_PATTERNS = _env_list("ALLOW_URL_PATTERNS", "")
+
+
+class ResourceFilter:
+    """
+    Request interception for a BrowserContext: aborts denylisted resource types and URL patterns
+    and counts what was blocked and what was loaded. The timesheetdetail API (xhr/fetch),
+    documents and scripts always go through unless a URL pattern says otherwise.
+    """
+
+    def __init__(self, for_screenshot=False, block_types=None, block_patterns=None, allow_patterns=None):
+        block_types = set(BLOCK_RESOURCE_TYPES if block_types is None else block_types)
+        if for_screenshot:
+            block_types -= set(SCREENSHOT_RESOURCE_TYPES)
+        self.block_types = block_types
+        self.block_patterns = list(BLOCK_URL_PATTERNS if block_patterns is None else block_patterns)
+        self.allow_patterns = list(ALLOW_URL_PATTERNS if allow_patterns is None else allow_patterns)
+        self.blocked = Counter()  # resource type -> aborted requests
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+
+    def should_block(self, resource_type, url):
+        if any(pattern in url for pattern in self.allow_patterns):
+            return False
+        return resource_type in self.block_types or any(pattern in url for pattern in self.block_patterns)
+
+    def _on_response(self, response):
+        self.loaded_requests += 1
+        try:
+            self.loaded_bytes += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    def _handle(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked[request.resource_type] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _handle_async(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked[request.resource_type] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def install(self, context):
+        """Routes every request of a sync-API context through the filter."""
+        context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+        return context
+
+    async def install_async(self, context):
+        """install() for async_playwright contexts."""
+        await context.route("**/*", self._handle_async)
+        context.on("response", self._on_response)
+        return context
+
+    def report(self):
+        """
+        One-line summary of the run. An aborted request never gets a response, so the bytes it
+        would have cost are unknown: blocked requests are only counted, and the KiB are what loaded.
+        """
+        blocked = sum(self.blocked.values())
+        by_type = ", ".join(f"{kind} {count}" for kind, count in self.blocked.most_common())
+        return (f"🚫 Blocked {blocked} requests ({by_type or 'none'}, size not measurable); "
+                f"loaded {self.loaded_requests} requests, {self.loaded_bytes / 1024:.0f} KiB by Content-Length")
+
+
+def resource_filter_for(for_screenshot=False):
+    """A ResourceFilter configured from .env, or None when BLOCK_RESOURCES is off."""
+    return ResourceFilter(for_screenshot=for_screenshot) if ENABLE_RESOURCE_BLOCKING else None
@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from dotenv import load_dotenv
+from output_channel import atomic_write
+
+# --- Load environment variables from .env ---
+load_dotenv()
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# One JSON report per run is appended to <RUN_REPORT_DIR>/<run>.jsonl; "" turns reports off
+RUN_REPORT_DIR = os.getenv("RUN_REPORT_DIR", os.path.join(SCRIPT_DIR, "runs"))
+# When set, <PROMETHEUS_TEXTFILE_DIR>/novatime_<run>.prom is rewritten after every run for
+# node-exporter's textfile collector
+PROMETHEUS_TEXTFILE_DIR = os.getenv("PROMETHEUS_TEXTFILE_DIR", "")
+
+
+class RunMetrics:
+    """
+    Timing spans, counters and labels for one run of a script. Stages are timed with
+    time.monotonic(); a stage that raises is recorded as failed and the exception propagates.
+    """
+
+    def __init__(self, run, **labels):
+        self.run = run
+        self.labels = dict(labels)
+        self.started_at = datetime.now()
+        self.start = time.monotonic()
+        self.stages = []  # [{"name", "seconds", "ok"}] in the order they finished
+        self.counters = {}
+        self.ok = True
+        self.finished = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.monotonic()
+        ok = True
+        try:
+            yield self
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.stages.append({"name": name, "seconds": round(time.monotonic() - start, 6), "ok": ok})
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def label(self, **labels):
+        self.labels.update(labels)
+
+    def fail(self):
+        self.ok = False
+
+    def report(self):
+        duration = (self.finished or time.monotonic()) - self.start
+        return {
+            "run": self.run,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "ok": self.ok,
+            "duration_seconds": round(duration, 6),
+            "labels": self.labels,
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+
+    def summary(self):
+        stages = ", ".join(f"{stage['name']} {stage['seconds']:.2f}s" for stage in self.stages)
+        return f"📊 {self.run} {'ok' if self.ok else 'FAILED'} in {self.report()['duration_seconds']:.2f}s ({stages or 'no stages'})"
+
+    def finish(self, report_dir=None, textfile_dir=None):
+        """Ends the run and writes its JSON report and Prometheus textfile. Never raises."""
+        self.finished = time.monotonic()
+        report = self.report()
+        report_dir = RUN_REPORT_DIR if report_dir is None else report_dir
+        textfile_dir = PROMETHEUS_TEXTFILE_DIR if textfile_dir is None else textfile_dir
+        try:
+            if report_dir:
+                os.makedirs(report_dir, exist_ok=True)
+                with open(os.path.join(report_dir, f"{self.run}.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(report) + "\n")
+            if textfile_dir:
+                write_textfile(report, textfile_dir)
+        except OSError as e:
+            print(f"⚠️ Could not write run metrics: {e}")
+        return report
+
+
+def span(metrics, name):
+    """metrics.span(name), or a no-op for code paths called without a RunMetrics."""
+    return metrics.span(name) if metrics is not None else nullcontext()
+
+
+def count(metrics, name, amount=1):
+    if metrics is not None:
+        metrics.count(name, amount)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text(report):
+    """The run as Prometheus text exposition format (gauges of the last run)."""
+    run = report["run"]
+    base = {"run": run, **{_metric_name(key): value for key, value in report["labels"].items()}}
+    lines = [
+        "# HELP novatime_run_duration_seconds Wall time of the last run.",
+        "# TYPE novatime_run_duration_seconds gauge",
+        f"novatime_run_duration_seconds{_labels(**base)} {report['duration_seconds']}",
+        "# HELP novatime_run_success 1 if the last run succeeded, else 0.",
+        "# TYPE novatime_run_success gauge",
+        f"novatime_run_success{_labels(**base)} {int(report['ok'])}",
+        "# HELP novatime_run_last_timestamp_seconds Unix time the last run started.",
+        "# TYPE novatime_run_last_timestamp_seconds gauge",
+        f"novatime_run_last_timestamp_seconds{_labels(**base)} "
+        f"{datetime.fromisoformat(report['started_at']).timestamp():.0f}",
+        "# HELP novatime_run_stage_duration_seconds Wall time of each stage of the last run.",
+        "# TYPE novatime_run_stage_duration_seconds gauge",
+    ]
+    totals = {}
+    for stage in report["stages"]:
+        totals[stage["name"]] = totals.get(stage["name"], 0.0) + stage["seconds"]
+    for name, seconds in totals.items():
+        lines.append(f"novatime_run_stage_duration_seconds{_labels(run=run, stage=name)} {seconds:.6f}")
+    for name, value in sorted(report["counters"].items()):
+        metric = f"novatime_run_{_metric_name(name)}"
+        lines += [f"# TYPE {metric} gauge", f"{metric}{_labels(run=run)} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(report, textfile_dir):
+    """Writes via a temp file + rename (atomic_write), as the textfile collector expects."""
+    os.makedirs(textfile_dir, exist_ok=True)
+    path = os.path.join(textfile_dir, f"novatime_{_metric_name(report['run'])}.prom")
+    with atomic_write(path) as f:
+        f.write(prometheus_text(report))
@@ -0,0 +1,150 @@
+import io
+import os
+import re
+import time
+import argparse
+from playwright.sync_api import sync_playwright
+from dotenv import load_dotenv
+from page_waits import wait_for_render
+
+# --- Load environment variables from .env ---
+load_dotenv()
+TIMESHEET_SELECTOR = os.getenv("TIMESHEET_SELECTOR")
+# "never", "changed" (only when the DataList changed) or "always" (also for unchanged runs)
+SCREENSHOT_MODE = os.getenv("SCREENSHOT_MODE", "changed").lower()
+# "png" (lossless), "jpeg" or "webp"; webp is encoded with Pillow and falls back to jpeg without it
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "png").lower()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+# Device pixels per CSS pixel for the rendered page, never more than MAX_DEVICE_SCALE
+MAX_DEVICE_SCALE = 2.0
+SCREENSHOT_DEVICE_SCALE = min(float(os.getenv("SCREENSHOT_DEVICE_SCALE", "1")), MAX_DEVICE_SCALE)
+# Save the rendered timesheet HTML and rasterize it later with `python screenshots.py`
+SCREENSHOT_DEFERRED = os.getenv("SCREENSHOT_DEFERRED", "false").lower() == "true"
+
+HTML_FILENAME = "timesheet.html"
+_EXTENSIONS = {"png": "png", "jpeg": "jpg", "jpg": "jpg", "webp": "webp"}
+
+
+def wants_screenshot(changed, mode=None):
+    """Whether this run should capture (or defer) a screenshot, given whether the data changed."""
+    mode = mode or SCREENSHOT_MODE
+    return mode == "always" or (mode == "changed" and changed)
+
+
+def screenshot_path(folder, fmt=None):
+    return os.path.join(folder, f"timesheet.{_EXTENSIONS.get(fmt or SCREENSHOT_FORMAT, 'png')}")
+
+
+def _webp_encoder():
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+def capture(element, folder, fmt=None, quality=None):
+    """Screenshots `element` into the folder in the configured format. Returns the image path."""
+    fmt = fmt or SCREENSHOT_FORMAT
+    quality = quality or SCREENSHOT_QUALITY
+    if fmt == "webp":
+        image = _webp_encoder()
+        if image is None:
+            print("⚠️ SCREENSHOT_FORMAT=webp needs Pillow (pip install pillow); saving JPEG instead.")
+            fmt = "jpeg"
+        else:
+            path = screenshot_path(folder, "webp")
+            png = element.screenshot(type="png")
+            image.open(io.BytesIO(png)).save(path, "WEBP", quality=quality)
+            return path
+    path = screenshot_path(folder, fmt)
+    if fmt in ("jpeg", "jpg"):
+        element.screenshot(path=path, type="jpeg", quality=quality)
+    else:
+        element.screenshot(path=path, type="png")
+    return path
+
+
+def save_rendered_html(page, folder, selector=None):
+    """
+    Keeps the rendered timesheet page for a later screenshot: waits for the table, then writes the
+    DOM without scripts and with a <base> tag so its stylesheets and images resolve when it is reopened. Returns the path or None.
+    """
+    if not wait_for_render(page, selector or TIMESHEET_SELECTOR):
+        return None
+    # Scripts would re-run against the snapshot (and need the session), so only the rendered DOM is kept
+    html = re.sub(r"<script\b[^>]*>.*?</script>", "", page.content(), flags=re.IGNORECASE | re.DOTALL)
+    base = f'<base href="{page.url}">'
+    html, found = re.subn(r"<head([^>]*)>", lambda m: f"<head{m.group(1)}>{base}", html, count=1, flags=re.IGNORECASE)
+    if not found:
+        html = base + html
+    path = os.path.join(folder, HTML_FILENAME)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return path
+
+
+def take_screenshot(page, folder, selector=None):
+    """Screenshots the timesheet table now, or saves its HTML for later when SCREENSHOT_DEFERRED is on."""
+    if SCREENSHOT_DEFERRED:
+        path = save_rendered_html(page, folder, selector)
+        if path:
+            print(f"🗂️ Timesheet HTML saved for a deferred screenshot at {path}")
+        else:
+            print("❌ Could not find timesheet element on iframe page to save.")
+        return path
+    # Data is already captured; only wait as long as the table takes to render
+    element = wait_for_render(page, selector or TIMESHEET_SELECTOR)
+    if not element:
+        print("❌ Could not find timesheet element on iframe page for screenshot.")
+        return None
+    path = capture(element, folder)
+    print(f"📸 Screenshot saved at {path}")
+    return path
+
+
+def pending_html(base_dir, fmt=None):
+    """Saved timesheet.html files whose screenshot is missing or older than the HTML."""
+    for folder, _, files in os.walk(base_dir):
+        if HTML_FILENAME not in files:
+            continue
+        html_path = os.path.join(folder, HTML_FILENAME)
+        image_path = screenshot_path(folder, fmt)
+        if not os.path.exists(image_path) or os.path.getmtime(image_path) < os.path.getmtime(html_path):
+            yield html_path
+
+
+def render_pending(base_dir, selector=None, keep_html=False):
+    """Rasterizes every pending saved timesheet in one browser. Returns the number of screenshots taken."""
+    paths = sorted(pending_html(base_dir))
+    if not paths:
+        print("✅ No deferred screenshots pending.")
+        return 0
+    done = 0
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page(viewport={"width": 2560, "height": 1440}, device_scale_factor=SCREENSHOT_DEVICE_SCALE)
+        for html_path in paths:
+            start = time.monotonic()
+            with open(html_path, "r", encoding="utf-8") as f:
+                page.set_content(f.read(), wait_until="load")
+            element = wait_for_render(page, selector or TIMESHEET_SELECTOR)
+            if not element:
+                print(f"❌ Timesheet element not found in {html_path}")
+                continue
+            image_path = capture(element, os.path.dirname(html_path))
+            done += 1
+            print(f"📸 {image_path} ({time.monotonic() - start:.2f}s)")
+            if not keep_html:
+                os.remove(html_path)
+        browser.close()
+    return done
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Render the timesheet screenshots deferred by SCREENSHOT_DEFERRED=true.")
+    parser.add_argument("base_dir", nargs="?", default=os.path.join(script_dir, "timeCard"))
+    parser.add_argument("--keep-html", action="store_true", help="keep timesheet.html after rendering it")
+    args = parser.parse_args()
+    render_pending(args.base_dir, keep_html=args.keep_html)
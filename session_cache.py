@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hashlib
+from dotenv import load_dotenv
+
+# --- Load environment variables from .env ---
+load_dotenv()
+
+# Persisted Playwright storage state lives next to the scripts, one file per login
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSION_DIR = os.getenv("SESSION_DIR", os.path.join(SCRIPT_DIR, ".session"))
+# Sessions older than this are not even tried (NovaTime expires them server-side anyway)
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", "28800"))  # seconds
+ENABLE_SESSION_CACHE = os.getenv("SESSION_CACHE", "true").lower() == "true"
+
+
+def session_paths(username, login_url):
+    """Returns (storage_state_path, metadata_path) for a username/tenant pair."""
+    # Hash the identity so usernames never end up in file names
+    key = hashlib.sha256(f"{username}|{login_url}".encode("utf-8")).hexdigest()[:16]
+    state_path = os.path.join(SESSION_DIR, f"{key}.state.json")
+    meta_path = os.path.join(SESSION_DIR, f"{key}.meta.json")
+    return state_path, meta_path
+
+
+def load_session_meta(username, login_url):
+    """Returns the saved metadata for a session, or None if missing/too old."""
+    state_path, meta_path = session_paths(username, login_url)
+    if not (os.path.exists(state_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - meta.get("saved_at", 0) > SESSION_MAX_AGE:
+        return None
+    meta["state_path"] = state_path
+    return meta
+
+
+def save_session(context, username, login_url, home_url):
+    """Persists the authenticated context's storage state and landing URL."""
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    state_path, meta_path = session_paths(username, login_url)
+    context.storage_state(path=state_path)
+    write_session_meta(state_path, meta_path, home_url)
+    print(f"💾 Session saved for reuse: {state_path}")
+
+
+def write_session_meta(state_path, meta_path, home_url):
+    """Locks down a freshly written storage state and records where the session landed."""
+    # Storage state holds live session cookies; keep it private to the user
+    os.chmod(state_path, 0o600)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"home_url": home_url, "saved_at": time.time()}, f)
+
+
+def clear_session(username, login_url):
+    """Deletes a cached session so the next run performs a full login."""
+    for path in session_paths(username, login_url):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def is_logged_out(url, body):
+    """True if a response looks like the login form rather than an app page."""
+    return "txtUserName" in body or "ewsfunctionkey" in url.lower()
+
+
+def is_session_valid(context, home_url):
+    """
+    Cheap validity check: one HTTP request with the cached cookies, no page render.
+    An expired session redirects back to (or serves) the login form.
+    """
+    try:
+        response = context.request.get(home_url, timeout=15000)
+    except Exception as e:
+        print(f"⚠️ Session check failed: {e}")
+        return False
+    if not response.ok:
+        return False
+    return not is_logged_out(response.url, response.text())
+
+
+def perform_login(page, username, password, login_url):
+    """Fills the NovaTime login form and waits for the Employee Web landing page."""
+    page.goto(login_url)
+    page.wait_for_selector("#txtUserName")
+    page.fill("#txtUserName", username)
+    page.fill("#txtPassword", password)
+    page.click("input[value='Employee Web']")
+    page.wait_for_load_state("networkidle")
+
+
+def open_authenticated_context(browser, username, password, login_url, open_page=True,
+                               resource_filter=None, **context_options):
+    """
+    Returns (context, page, warm) where page sits on the post-login landing page.
+    Reuses a cached storage state when it is still valid and falls back to a full login.
+    With open_page=False a warm session returns page=None so nothing is rendered at all.
+    A resource_filter.ResourceFilter, if given, is installed on the context before any page loads.
+    """
+    start = time.monotonic()
+    meta = load_session_meta(username, login_url) if ENABLE_SESSION_CACHE else None
+
+    if meta:
+        context = browser.new_context(storage_state=meta["state_path"], **context_options)
+        if resource_filter:
+            resource_filter.install(context)
+        if is_session_valid(context, meta["home_url"]):
+            if not open_page:
+                print(f"✅ Reused cached session (warm login in {time.monotonic() - start:.2f}s)")
+                return context, None, True
+            page = context.new_page()
+            page.goto(meta["home_url"])
+            page.wait_for_load_state("networkidle")
+            print(f"✅ Reused cached session (warm login in {time.monotonic() - start:.2f}s)")
+            return context, page, True
+        print("⌛ Cached session expired, performing full login...")
+        context.close()
+        clear_session(username, login_url)
+
+    context = browser.new_context(**context_options)
+    if resource_filter:
+        resource_filter.install(context)
+    page = context.new_page()
+    perform_login(page, username, password, login_url)
+    print(f"✅ Logged in! (cold login in {time.monotonic() - start:.2f}s)")
+    if ENABLE_SESSION_CACHE:
+        save_session(context, username, login_url, page.url)
+    return context, page, False
+
+
+# --- async_playwright counterparts (used by the multi-employee runner) ---
+
+async def is_session_valid_async(context, home_url):
+    """Async version of is_session_valid."""
+    try:
+        response = await context.request.get(home_url, timeout=15000)
+    except Exception as e:
+        print(f"⚠️ Session check failed: {e}")
+        return False
+    if not response.ok:
+        return False
+    return not is_logged_out(response.url, await response.text())
+
+
+async def perform_login_async(page, username, password, login_url):
+    """Async version of perform_login."""
+    await page.goto(login_url)
+    await page.wait_for_selector("#txtUserName")
+    await page.fill("#txtUserName", username)
+    await page.fill("#txtPassword", password)
+    await page.click("input[value='Employee Web']")
+    await page.wait_for_load_state("networkidle")
+
+
+async def open_authenticated_context_async(browser, username, password, login_url, resource_filter=None,
+                                           **context_options):
+    """
+    Async version of open_authenticated_context for API-only use: returns (context, warm)
+    and closes the login page once the session cookies are in place.
+    """
+    meta = load_session_meta(username, login_url) if ENABLE_SESSION_CACHE else None
+
+    if meta:
+        context = await browser.new_context(storage_state=meta["state_path"], **context_options)
+        if await is_session_valid_async(context, meta["home_url"]):
+            return context, True
+        await context.close()
+        clear_session(username, login_url)
+
+    context = await browser.new_context(**context_options)
+    if resource_filter:
+        await resource_filter.install_async(context)
+    page = await context.new_page()
+    await perform_login_async(page, username, password, login_url)
+    if ENABLE_SESSION_CACHE:
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        state_path, meta_path = session_paths(username, login_url)
+        await context.storage_state(path=state_path)
+        write_session_meta(state_path, meta_path, page.url)
+    await page.close()
+    return context, False
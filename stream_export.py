@@ -0,0 +1,160 @@
+import os
+import json
+import heapq
+import codecs
+import tempfile
+import urllib.request
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from novatime_time import strip_timestamps
+
+# --- Load environment variables from .env ---
+load_dotenv()
+# Bytes read from the response per step, and records held in memory per sort run
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", "65536"))
+SORT_CHUNK_RECORDS = int(os.getenv("SORT_CHUNK_RECORDS", "20000"))
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+def open_stream(url, cookies, timeout=60):
+    """
+    Opens `url` as a streaming HTTP response carrying the browser session's cookies
+    (as returned by context.cookies()). Playwright itself only hands out whole bodies.
+    """
+    host = urlparse(url).hostname or ""
+    cookie_header = "; ".join(
+        f"{cookie['name']}={cookie['value']}" for cookie in cookies
+        if host.endswith(cookie.get("domain", "").lstrip("."))
+    )
+    request = urllib.request.Request(url, headers={"Cookie": cookie_header, "Accept": "application/json"})
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+class _StreamReader:
+    """Decoded text buffer over a binary stream, refilled on demand and optionally teed to a file."""
+
+    def __init__(self, stream, tee=None, chunk_bytes=STREAM_CHUNK_BYTES):
+        self.stream = stream
+        self.tee = tee
+        self.chunk_bytes = chunk_bytes
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Reads one more chunk; returns False at end of stream."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_bytes)
+        if self.tee is not None and chunk:
+            self.tee.write(chunk)
+        self.eof = not chunk
+        # Drop consumed text so the buffer only ever holds the unparsed tail
+        self.buf = self.buf[self.pos:] + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (without consuming it), or "" at end of stream."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more input until it is whole."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut off by the chunk boundary ("2." of "2.5") is only whole once a delimiter follows
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_datalist(stream, tee=None, chunk_bytes=STREAM_CHUNK_BYTES):
+    """
+    Yields the records of a timesheetdetail payload's top-level "DataList" one at a time,
+    holding only the current record plus one read chunk in memory. Raw bytes go to `tee` as read.
+    """
+    reader = _StreamReader(stream, tee, chunk_bytes)
+    reader.expect("{")
+    while reader.peek() != "}":
+        key = reader.value()
+        reader.expect(":")
+        if key == "DataList" and reader.peek() == "[":
+            reader.expect("[")
+            while reader.peek() != "]":
+                yield reader.value()
+                if reader.peek() == ",":
+                    reader.pos += 1
+            reader.expect("]")
+        else:
+            reader.value()  # Other top-level fields are small; parse and discard
+        if reader.peek() == ",":
+            reader.pos += 1
+    reader.expect("}")
+    # Drain whatever follows so the tee receives the complete body
+    while reader.fill():
+        pass
+
+
+def _spill(records, key):
+    """Sorts one run of records and writes it to a temp NDJSON file."""
+    records.sort(key=key)
+    spill = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+    for rec in records:
+        # Parsed timestamps are not JSON; they are re-attached (from cache) when the run is merged
+        spill.write(json.dumps(strip_timestamps(rec), separators=(",", ":")))
+        spill.write("\n")
+    spill.seek(0)
+    return spill
+
+
+def _read_spill(spill):
+    for line in spill:
+        yield json.loads(line)
+
+
+def external_sort(records, key, chunk_records=SORT_CHUNK_RECORDS):
+    """
+    Sorts an iterator of records with bounded memory: runs of `chunk_records` are sorted and
+    spilled to disk, then k-way merged. Small inputs never touch disk.
+    """
+    runs = []
+    current = []
+    for rec in records:
+        current.append(rec)
+        if len(current) >= chunk_records:
+            runs.append(_spill(current, key))
+            current = []
+
+    if not runs:
+        current.sort(key=key)
+        yield from current
+        return
+
+    if current:
+        runs.append(_spill(current, key))
+    try:
+        yield from heapq.merge(*(_read_spill(run) for run in runs), key=key)
+    finally:
+        for run in runs:
+            run.close()
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from playwright.async_api import async_playwright
+from dotenv import load_dotenv
+from session_cache import open_authenticated_context_async
+from novatime_api import pay_period_for, build_timesheet_url, fetch_timesheet_json_async, NOVATIME_ACCESS_SEQ
+from timecard import sanitize_folder_name, save_timesheet
+from resource_filter import resource_filter_for
+
+# --- Load environment variables from .env ---
+load_dotenv()
+LOGIN_URL = os.getenv("LOGIN_URL")
+TEAM_MANIFEST = os.getenv("TEAM_MANIFEST", "team.json")
+TEAM_CONCURRENCY = int(os.getenv("TEAM_CONCURRENCY", "4"))
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_OUTPUT_DIR = os.path.join(SCRIPT_DIR, "timeCard")
+
+
+def load_manifest(path):
+    """
+    Reads the team credentials manifest: a JSON list of
+    {"employee", "username", "password" | "password_env", "employee_seq", "access_seq"?}.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        accounts = json.load(f)
+    for account in accounts:
+        # Keep passwords out of the manifest by pointing at an environment variable instead
+        if "password_env" in account:
+            account["password"] = os.getenv(account["password_env"], "")
+        missing = [key for key in ("employee", "username", "password", "employee_seq") if not account.get(key)]
+        if missing:
+            raise ValueError(f"Manifest entry {account.get('employee', '?')!r} is missing {', '.join(missing)}")
+        # The name becomes the employee's output folder under timeCard/
+        name = str(account["employee"])
+        if not name.strip() or name.strip() in (".", "..") or "/" in name or "\\" in name:
+            raise ValueError(f"Manifest entry {name!r} needs an employee name without path separators, '.' or '..'")
+    return accounts
+
+
+async def grab_account(browser, account, semaphore, day=None, resource_filter=None):
+    """Logs one employee in (in its own BrowserContext) and saves their current pay period."""
+    employee = account["employee"]
+    async with semaphore:
+        start = time.monotonic()
+        context = None
+        try:
+            context, warm = await open_authenticated_context_async(
+                browser, account["username"], account["password"], LOGIN_URL, resource_filter=resource_filter)
+            period_start, period_end = pay_period_for(day)
+            url = build_timesheet_url(
+                period_start, period_end,
+                access_seq=account.get("access_seq") or NOVATIME_ACCESS_SEQ,
+                employee_seq=account["employee_seq"],
+            )
+            json_data = await fetch_timesheet_json_async(context.request, url)
+            employee_dir = os.path.join(BASE_OUTPUT_DIR, sanitize_folder_name(employee))
+            # File writes are blocking; keep them off the event loop
+            folder = await asyncio.to_thread(save_timesheet, json_data, employee_dir, employee=account["username"])
+            elapsed = time.monotonic() - start
+            print(f"✅ [{employee}] done in {elapsed:.2f}s ({'warm' if warm else 'cold'} session)")
+            return {"employee": employee, "ok": folder is not None, "seconds": elapsed}
+        except Exception as e:
+            print(f"❌ [{employee}] failed: {e}")
+            return {"employee": employee, "ok": False, "seconds": time.monotonic() - start}
+        finally:
+            if context is not None:
+                await context.close()
+
+
+async def run_team(accounts, concurrency=TEAM_CONCURRENCY, headless=True):
+    """Runs every account against one shared Chromium process, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    # One filter shared by every login page, so the report covers the whole team run
+    resource_filter = resource_filter_for()
+    run_start = time.monotonic()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            results = await asyncio.gather(*(
+                grab_account(browser, account, semaphore, resource_filter=resource_filter) for account in accounts
+            ))
+        finally:
+            await browser.close()
+    if resource_filter:
+        print(resource_filter.report())
+
+    elapsed = time.monotonic() - run_start
+    succeeded = sum(1 for result in results if result["ok"])
+    rate = len(accounts) / elapsed * 60 if elapsed else 0.0
+    print(f"⏱️ {succeeded}/{len(accounts)} accounts in {elapsed:.2f}s "
+          f"({rate:.1f} accounts/min, concurrency {concurrency})")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the current pay period for every employee in a manifest.")
+    parser.add_argument("manifest", nargs="?", default=TEAM_MANIFEST, help="credentials manifest (JSON)")
+    parser.add_argument("--concurrency", type=int, default=TEAM_CONCURRENCY, help="accounts fetched at once")
+    args = parser.parse_args()
+
+    if not LOGIN_URL:
+        print("❌ Missing LOGIN_URL in your .env file.")
+        sys.exit(1)
+    try:
+        team = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load team manifest: {e}")
+        sys.exit(1)
+    results = asyncio.run(run_team(team, concurrency=max(1, args.concurrency)))
+    sys.exit(0 if all(result["ok"] for result in results) else 1)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The scripts are plain top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests use the default weekly pay periods whatever a local .env says (load_dotenv never overrides)
+os.environ["PAY_PERIOD_ANCHOR"] = "07/13/2025"
+os.environ["PAY_PERIOD_DAYS"] = "7"
@@ -0,0 +1,18 @@
+"""DataList records for the tests."""
+
+
+def punch(day="07/14/2025", time_in="08:00:00", time_out="16:00:00", hours=8.0, pay_code="REG"):
+    return {
+        "dWorkDate": f"{day} 00:00:00",
+        "dPayPeriodStart": "07/13/2025 00:00:00",
+        "dPayPeriodEnd": "07/19/2025 00:00:00",
+        "dIn": f"{day} {time_in}",
+        "dOut": f"{day} {time_out}" if time_out else None,
+        "cPayCodeDescription": pay_code,
+        "nWorkHours": hours,
+        "nOT1Hours": 0.0,
+        "nOT2Hours": 0.0,
+        "nTotalHours": hours,
+        "nDailyHours": hours,
+        "nWeeklyHours": hours,
+    }
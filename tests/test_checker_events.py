@@ -0,0 +1,33 @@
+import time
+
+from checker_events import EventPipeline
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_failed_check_is_retried_on_the_next_event(tmp_path):
+    path = tmp_path / "timesheet.csv"
+    path.write_text("Date,In,Out\n")
+    attempts = []
+
+    def process(file_path):
+        attempts.append(file_path)
+        return len(attempts) > 1  # The first read fails, e.g. the file was still being written
+
+    pipeline = EventPipeline(process, debounce=0.01).start()
+    try:
+        pipeline.submit(str(path))
+        assert wait_for(lambda: len(attempts) == 1)
+        assert str(path) not in pipeline.seen
+
+        # Same content, but the failed check was not remembered
+        pipeline.submit(str(path))
+        assert wait_for(lambda: str(path) in pipeline.seen)
+        assert len(attempts) == 2
+    finally:
+        pipeline.stop()
@@ -0,0 +1,37 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from checker_index import check_incremental
+from discrepancy_rules import check_frame, ruleset_version
+
+
+def export(*rows):
+    return pd.DataFrame([{"Date": day, "In": time_in, "Out": time_out} for day, time_in, time_out in rows])
+
+
+def test_open_punch_is_only_exempt_on_the_last_punched_day():
+    df = export(
+        ("07/14/2025", "07/14/2025 08:00:00", ""),
+        ("07/15/2025", "07/15/2025 08:00:00", "07/15/2025 16:00:00"),
+        ("07/16/2025", "07/16/2025 08:00:00", ""),
+    )
+    findings = check_frame(df, rules=["missing_out"])
+
+    assert findings["Date"].tolist() == ["07/14/2025"]
+
+
+def test_open_punch_is_flagged_once_a_later_week_is_punched():
+    ruleset = ruleset_version(["missing_out"])
+    before = export(
+        ("07/14/2025", "07/14/2025 08:00:00", "07/14/2025 16:00:00"),
+        ("07/18/2025", "07/18/2025 08:00:00", ""),
+    )
+    changes, index, _ = check_incremental(before, None, ruleset)
+    assert changes.empty
+
+    # The next week's punch leaves the 07/18 row untouched, but it is no longer the open one
+    after = pd.concat([before, export(("07/21/2025", "07/21/2025 08:00:00", "07/21/2025 16:00:00"))],
+                      ignore_index=True)
+    changes, _, _ = check_incremental(after, index, ruleset)
+    assert changes[["Rule", "Date", "Status"]].values.tolist() == [["missing_out", "07/18/2025", "new"]]
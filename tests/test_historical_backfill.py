@@ -0,0 +1,27 @@
+from datetime import date
+
+from historical_backfill import checkpoint_dir, merge_windows, split_windows, window_path, write_json_atomic
+
+
+def test_rerun_on_a_later_day_resumes_from_the_same_checkpoints():
+    folder = checkpoint_dir(date(2025, 3, 1), "month")
+    assert folder == checkpoint_dir(date(2025, 3, 1), "month")
+    assert folder != checkpoint_dir(date(2025, 3, 1), "payperiod")
+
+    # Completed windows keep their file names; only the window cut short at the old end changes
+    yesterday = {window_path(folder, *w) for w in split_windows(date(2025, 3, 1), date(2025, 5, 14), "month")}
+    today = {window_path(folder, *w) for w in split_windows(date(2025, 3, 1), date(2025, 5, 15), "month")}
+    assert len(yesterday & today) == 2
+
+
+def test_merge_keeps_identical_lines_of_one_window(tmp_path):
+    pto = {"dWorkDate": "03/14/2025 00:00:00", "dIn": None, "cPayCodeDescription": "PTO", "nTotalHours": 4.0}
+    spill = {"dWorkDate": "04/01/2025 00:00:00", "dIn": "04/01/2025 08:00:00", "nTotalHours": 8.0}
+    windows = [(date(2025, 3, 1), date(2025, 3, 31)), (date(2025, 4, 1), date(2025, 4, 30))]
+    write_json_atomic(window_path(str(tmp_path), *windows[0]), [pto, dict(pto), spill])
+    write_json_atomic(window_path(str(tmp_path), *windows[1]), [spill])
+
+    merged = merge_windows(str(tmp_path), windows)
+
+    assert merged == [pto, pto, spill]
+    assert sum(rec["nTotalHours"] for rec in merged) == 16.0
@@ -0,0 +1,78 @@
+from datetime import date
+
+from novatime_api import pay_period_for
+from historical_sync import periods_to_fetch, merge_period, group_by_period, drop_partial_periods, period_id
+
+
+def record(day):
+    return {"dWorkDate": f"{day} 00:00:00", "dIn": f"{day} 08:00:00", "nTotalHours": 8.0}
+
+
+def test_current_period_keeps_its_full_id_mid_period():
+    state = {"start": None, "last_work_date": None, "periods": {}}
+    pending = periods_to_fetch(state, date(2025, 7, 13), today=date(2025, 7, 16))
+
+    assert pending == [(date(2025, 7, 13), date(2025, 7, 19), date(2025, 7, 16), False)]
+
+
+def test_mid_period_sync_does_not_duplicate_the_current_period():
+    existing = [record("07/14/2025")]
+    records_by_period = group_by_period(existing)
+    period_start, period_end, _, _ = periods_to_fetch({"periods": {}}, date(2025, 7, 13), today=date(2025, 7, 16))[0]
+    merge_period(records_by_period, period_start, period_end, [record("07/14/2025"), record("07/16/2025")])
+
+    assert {key: len(records) for key, records in records_by_period.items()} == {"20250713_20250719": 2}
+
+
+def test_partial_period_ids_are_dropped_from_the_state():
+    state = {"periods": {
+        period_id(date(2025, 7, 13), date(2025, 7, 16)): {"hash": "a", "closed": False, "count": 1},
+        period_id(date(2025, 7, 13), date(2025, 7, 19)): {"hash": "b", "closed": False, "count": 2},
+    }}
+    drop_partial_periods(state)
+
+    assert list(state["periods"]) == ["20250713_20250719"]
+
+
+def test_sync_returns_only_the_changed_periods(tmp_path, monkeypatch):
+    import asyncio
+    import os
+    from datetime import timedelta
+
+    import historical_sync
+    from historical_backfill import window_path, write_json_atomic
+
+    yesterday = date.today() - timedelta(days=1)
+    server = [record(f"{yesterday:%m/%d/%Y}"), dict(record(f"{yesterday:%m/%d/%Y}"), dIn=None)]
+
+    async def fetch_windows(username, password, login_url, windows, folder, concurrency):
+        os.makedirs(folder, exist_ok=True)
+        for window_start, window_end in windows:
+            write_json_atomic(window_path(folder, window_start, window_end),
+                              [rec for rec in server if window_start <= yesterday <= window_end])
+        return [0] * len(windows)
+
+    monkeypatch.setattr(historical_sync, "fetch_windows", fetch_windows)
+    monkeypatch.setattr(historical_sync, "CHECKPOINT_ROOT", str(tmp_path))
+    state_path = str(tmp_path / "state.json")
+
+    def sync(existing, start=None):
+        return asyncio.run(historical_sync.sync_incremental("u", "p", "url", existing, start=start, state_path=state_path))
+
+    records, changed = sync([], start=yesterday - timedelta(days=7))
+    assert len(records) == 2 and changed[period_id(*pay_period_for(yesterday))] == server
+
+    assert sync(records) == (records, {})
+
+    # A line removed upstream: the changed period comes back with what is left of it
+    server.pop()
+    records, changed = sync(records)
+    assert records == server and changed == {period_id(*pay_period_for(yesterday)): server}
+
+
+def test_datalist_hash_ignores_record_order_and_key_order():
+    from novatime_api import datalist_hash
+
+    first, second = record("07/14/2025"), record("07/15/2025")
+    assert datalist_hash([first, second]) == datalist_hash([dict(reversed(list(second.items()))), first])
+    assert datalist_hash([first, second]) != datalist_hash([first])
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from output_channel import atomic_write, tee_rows, timesheet_markers
+
+
+def test_concurrent_stdout_blocks_do_not_interleave(capsys):
+    def export(employee):
+        with tee_rows(["Date", "Hours"], target="stdout", fmt="csv", markers=timesheet_markers(employee)) as writer:
+            writer.writeheader()
+            for day in range(200):
+                writer.writerow([f"07/{day % 28 + 1:02d}/2025", employee])
+
+    threads = [threading.Thread(target=export, args=(name,)) for name in ("alice", "bob", "carol")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    block = None
+    for line in capsys.readouterr().out.splitlines():
+        if line.startswith("-----BEGIN_"):
+            assert block is None
+            block = line[len("-----BEGIN_TIMESHEET_"):-len("_CSV-----")].lower()
+        elif line.startswith("-----END_"):
+            block = None
+        elif block and line != "Date,Hours":
+            assert line.endswith("," + block)
+
+
+def test_markers():
+    assert timesheet_markers() == "TIMESHEET"
+    assert timesheet_markers("jane.doe@example.com") == "TIMESHEET_JANE_DOE_EXAMPLE_COM"
+
+
+def test_failed_binary_write_keeps_the_previous_file(tmp_path):
+    path = tmp_path / "historical_timesheet.json"
+    path.write_bytes(b'{"DataList": []}')
+
+    with pytest.raises(ValueError):
+        with atomic_write(str(path), binary=True) as f:
+            f.write(b'{"DataList": [{"dWorkDate"')
+            raise ValueError("connection reset")
+
+    assert path.read_bytes() == b'{"DataList": []}'
+    assert [p.name for p in tmp_path.iterdir()] == ["historical_timesheet.json"]
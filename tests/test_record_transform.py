@@ -0,0 +1,44 @@
+import pytest
+
+from record_transform import compile_profile
+
+TIMECARD_COLUMNS, build_timecard_row = compile_profile("timecard")
+FACILITY = TIMECARD_COLUMNS.index("Facility")
+
+
+def group(number, desc, value=""):
+    return {"iGroupNumber": number, "cGroupValue": value, "cGroupValueDescription": desc}
+
+
+@pytest.mark.parametrize("groups, facility", [
+    ([group(17, "North")], "North"),
+    ([group(16, "South")], "South"),
+    ([group(17, "North"), group(16, "South")], "North"),
+    ([group(16, "South"), group(17, "North")], "North"),
+    # An empty group 17 description is filled in by a group 16 that follows it...
+    ([group(17, ""), group(16, "South")], "South"),
+    # ...but clears a group 16 seen before it
+    ([group(16, "South"), group(17, "")], ""),
+    ([group(16, "South"), group(16, "East")], "South"),
+    ([group(16, "South"), group(17, ""), group(16, "East")], "East"),
+])
+def test_facility_matches_the_original_export(groups, facility):
+    assert build_timecard_row({"GroupingList": groups})[FACILITY] == facility
+
+
+def test_account_comes_from_the_last_group_3():
+    row = build_timecard_row({
+        "GroupingList": [group(3, "Old", "OLD")],
+        "GroupValueList": [group(3, "Ward", "W1")],
+    })
+    assert row[TIMECARD_COLUMNS.index("Account")] == "Ward"
+    assert row[TIMECARD_COLUMNS.index("ActShortCode")] == "W1"
+
+
+def test_historical_groups_use_the_first_match():
+    columns, build_row = compile_profile("historical")
+    row = build_row({"GroupValueList": [group(12, "Ward", "W1"), group(12, "Other", "W2")]}, daily_total=7.5)
+
+    assert row[columns.index("Account")] == "W1 [Ward]"
+    assert row[columns.index("Facility")] == ""
+    assert row[columns.index("Daily Hours\xa0*")] == "7.5"
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from team_runner import load_manifest
+
+
+@pytest.mark.parametrize("name", ["", " ", ".", "..", "../alice", "team/alice", "team\\alice"])
+def test_manifest_rejects_names_that_are_not_plain_folders(tmp_path, name):
+    path = tmp_path / "team.json"
+    path.write_text(json.dumps([{"employee": name, "username": "u", "password": "p", "employee_seq": "1"}]))
+
+    with pytest.raises(ValueError):
+        load_manifest(str(path))
+
+
+def test_manifest_accepts_plain_names(tmp_path):
+    path = tmp_path / "team.json"
+    path.write_text(json.dumps([{"employee": "Alice Smith", "username": "u", "password": "p", "employee_seq": "1"}]))
+
+    assert load_manifest(str(path))[0]["employee"] == "Alice Smith"
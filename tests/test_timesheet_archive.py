@@ -0,0 +1,37 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from timesheet_archive import archive_records, archive_files, read_archive
+from sample_records import punch
+
+
+def test_open_punch_is_replaced_when_it_closes(tmp_path):
+    archive_records([punch(time_out=None, hours=0.0)], employee="alice", archive_dir=str(tmp_path))
+    archive_records([punch()], employee="alice", archive_dir=str(tmp_path))
+
+    frame = read_archive(employee="alice", archive_dir=str(tmp_path))
+    assert len(frame) == 1
+    assert frame["total_hours"].sum() == 8.0
+
+
+def test_complete_period_fetch_rewrites_the_period(tmp_path):
+    archive_records([punch(), punch(day="07/15/2025")], employee="alice", archive_dir=str(tmp_path))
+    archive_records([punch(day="07/15/2025")], employee="alice", archive_dir=str(tmp_path), replace_periods=True)
+
+    frame = read_archive(employee="alice", archive_dir=str(tmp_path), columns=["work_date"])
+    assert list(frame["work_date"].dt.date) == [date(2025, 7, 15)]
+
+
+def test_reader_prunes_pay_periods_and_dates(tmp_path):
+    later = punch(day="07/21/2025")
+    later["dPayPeriodStart"], later["dPayPeriodEnd"] = "07/20/2025 00:00:00", "07/26/2025 00:00:00"
+    archive_records([punch(), punch(day="07/15/2025"), later], employee="alice", archive_dir=str(tmp_path))
+
+    assert len(archive_files(date(2025, 7, 20), None, "alice", str(tmp_path))) == 1
+    frame = read_archive(date(2025, 7, 15), date(2025, 7, 19), columns=["work_date", "total_hours"],
+                         employee="alice", archive_dir=str(tmp_path))
+    assert list(frame.columns) == ["work_date", "total_hours"]
+    assert list(frame["work_date"].dt.date) == [date(2025, 7, 15)]
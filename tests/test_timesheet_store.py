@@ -0,0 +1,113 @@
+import json
+import hashlib
+
+from sample_records import punch
+from timesheet_store import (
+    open_store, iter_upsert, query_records, store_records, query_daily_totals, query_period_totals, rebuild_totals,
+)
+
+
+def store(conn, records, replace_periods=False):
+    return sum(1 for _ in iter_upsert(conn, records, employee="alice", replace_periods=replace_periods))
+
+
+def test_open_punch_is_replaced_when_it_closes(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(time_out=None, hours=0.0)])
+    store(conn, [punch()])
+
+    records = query_records(conn, employee="alice")
+    assert len(records) == 1
+    assert records[0]["dOut"] == "07/14/2025 16:00:00"
+
+
+def test_complete_period_fetch_removes_records_deleted_upstream(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(), punch(day="07/15/2025")], replace_periods=True)
+    store(conn, [punch(day="07/15/2025")], replace_periods=True)
+
+    assert [rec["dWorkDate"] for rec in query_records(conn, employee="alice")] == ["07/15/2025 00:00:00"]
+
+
+def test_partial_fetch_keeps_other_records(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(), punch(day="07/15/2025")])
+    store(conn, [punch(day="07/15/2025", hours=7.5)])
+
+    assert len(query_records(conn, employee="alice")) == 2
+
+
+def test_repeated_lines_of_one_fetch_are_kept_apart(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    pto = punch(time_in=None, pay_code="PTO")
+    pto["dIn"] = None
+    store(conn, [pto, dict(pto)])
+    store(conn, [pto, dict(pto)])
+
+    assert len(query_records(conn, employee="alice")) == 2
+
+
+def test_records_stored_under_the_old_key_are_merged(tmp_path):
+    path = str(tmp_path / "t.db")
+    conn = open_store(path)
+    # As an older version stored them: keyed by the full record, open and closed versions side by side
+    for fetched_at, rec in (("2025-07-14T12:00:00", punch(time_out=None, hours=0.0)), ("2025-07-15T09:00:00", punch())):
+        old_id = hashlib.sha1(repr(("alice", rec["dWorkDate"], rec["dIn"], rec["dOut"],
+                                    rec["cPayCodeDescription"], rec["nTotalHours"])).encode("utf-8")).hexdigest()
+        conn.execute("INSERT INTO records (record_id, employee, work_date, pay_period_start, pay_period_end, "
+                     "time_out, data, fetched_at) VALUES (?, 'alice', '2025-07-14', '2025-07-13', '2025-07-19', ?, ?, ?)",
+                     (old_id, rec["dOut"], json.dumps(rec), fetched_at))
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    conn = open_store(path)
+    records = query_records(conn, employee="alice")
+    assert len(records) == 1
+    assert records[0]["dOut"] == "07/14/2025 16:00:00"
+
+
+def test_store_records_counts(tmp_path):
+    assert store_records([punch(), punch(day="07/15/2025")], employee="alice", path=str(tmp_path / "t.db")) == 2
+
+
+def totals(conn):
+    return ([(day["work_date"], day["punches"], day["open_punches"], day["total_hours"]) for day in query_daily_totals(conn, employee="alice")],
+            [(period["pay_period_start"], period["punches"], period["total_hours"]) for period in query_period_totals(conn, employee="alice")])
+
+
+def test_totals_follow_changed_hours(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(hours=8.0), punch(day="07/15/2025")])
+    store(conn, [punch(hours=7.5)])
+
+    days, periods = totals(conn)
+    assert days == [("2025-07-14", 1, 0, 7.5), ("2025-07-15", 1, 0, 8.0)]
+    assert periods == [("2025-07-13", 2, 15.5)]
+
+
+def test_totals_follow_a_punch_that_closes(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(time_out=None, hours=0.0)])
+    assert totals(conn)[0] == [("2025-07-14", 1, 1, 0.0)]
+
+    store(conn, [punch()])
+    assert totals(conn) == ([("2025-07-14", 1, 0, 8.0)], [("2025-07-13", 1, 8.0)])
+
+
+def test_totals_drop_days_removed_upstream(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(), punch(day="07/15/2025")], replace_periods=True)
+    store(conn, [punch(day="07/15/2025")], replace_periods=True)
+
+    assert totals(conn) == ([("2025-07-15", 1, 0, 8.0)], [("2025-07-13", 1, 8.0)])
+
+
+def test_incremental_totals_match_a_rebuild(tmp_path):
+    conn = open_store(str(tmp_path / "t.db"))
+    store(conn, [punch(), punch(day="07/15/2025"), punch(day="07/21/2025")])
+    store(conn, [punch(hours=6.0), punch(day="07/15/2025", time_out=None, hours=0.0)], replace_periods=True)
+    incremental = totals(conn)
+
+    rebuild_totals(conn)
+    assert totals(conn) == incremental
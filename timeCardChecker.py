@@ -1,10 +1,25 @@
 import os
 import time
+import argparse
+import itertools
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from dotenv import load_dotenv
+from discrepancy_rules import (
+    ARCHIVE_COLUMNS, DISCREPANCY_COLUMNS, TOTALS_RULES, check_frame, check_normalized, normalize_archive,
+    normalize_daily_totals, ruleset_version, selected_rules,
+)
+from checker_events import EventPipeline, file_stat, file_hash
+from checker_manifest import (
+    load_manifest, save_manifest, unchanged_fingerprint, record_check, known_fingerprints,
+)
+from checker_index import row_index_path, load_row_index, save_row_index, check_incremental
+from run_metrics import RunMetrics
+from timesheet_archive import read_archive
+from timesheet_store import open_store, query_daily_totals
 
 # --- Load environment variables ---
 load_dotenv()
@@ -15,6 +30,10 @@ WATCH_FOLDER = os.path.join(SCRIPT_DIR, "timeCard")
 
 # Log file inside timeCard folder
 LOG_FILE = os.path.join(WATCH_FOLDER, "discrepancy_log.csv")
+# What has been checked already (hash, mtime, rule-set version, summary) so restarts skip unchanged weeks
+MANIFEST_FILE = os.path.join(WATCH_FOLDER, ".checker_manifest.json")
+# Per-file row fingerprints and open discrepancies, so a rewritten CSV is only checked where it changed
+CHECKER_INDEX_DIR = os.path.join(WATCH_FOLDER, ".checker_index")
 
 # Output options
 ENABLE_CSV = True  # Always save CSV
@@ -22,111 +41,303 @@ ENABLE_EMAIL = os.getenv("EMAIL_SMTP_SERVER") is not None
 ENABLE_SLACK = os.getenv("SLACK_WEBHOOK_URL") is not None
 ENABLE_DISCORD = os.getenv("DISCORD_WEBHOOK_URL") is not None
 ENABLE_INITIAL_SCAN = os.getenv("INITIAL_SCAN", "false").lower() == "true"
+# Initial scan: worker processes (1 = serial) and files per batch (bounds results held in memory)
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", str(os.cpu_count() or 1)))
+SCAN_CHUNK_FILES = int(os.getenv("SCAN_CHUNK_FILES", "32"))
 
 
 def check_discrepancies(df):
     """
-    Very simple example:
-    Compare 'Daily Hours *' vs 'Total Hours *' and flag mismatches.
+    Runs the discrepancy rules in discrepancy_rules.py (daily hours, weekly total,
+    missing Out punch, overlapping punches) column-wise over an exported CSV.
     """
-    discrepancies = []
+    return check_frame(df)
 
-    for idx, row in df.iterrows():
-        daily = str(row.get("Daily Hours *", "")).strip()
-        total = str(row.get("Total Hours *", row.get("Total Hours *", ""))).strip()
 
-        if daily and total and daily != total:
-            discrepancies.append({
-                "Date": row.get("Date", ""),
-                "In": row.get("In", ""),
-                "Out": row.get("Out", ""),
-                "Daily Hours": daily,
-                "Total Hours": total,
-                "File": row.get("SourceFile", "")
-            })
+def _row_index_path(file_path):
+    return row_index_path(CHECKER_INDEX_DIR, WATCH_FOLDER, file_path)
 
-    return pd.DataFrame(discrepancies)
 
+def check_file(file_path):
+    """
+    Reads one exported CSV and diffs it against its row index, checking only the weeks that changed.
+    Runs in scan worker processes too, so it only returns data:
+    (file_path, changes, rows, fingerprint, index, rows_checked); changes (new and cleared
+    discrepancies) is None if the file failed. The caller saves `index` once the changes are logged.
+    """
+    try:
+        # Fingerprint first: if the file changes while being read the watcher checks it again
+        fingerprint = (*file_stat(file_path), file_hash(file_path))
+        df = pd.read_csv(file_path)
+        previous = load_row_index(_row_index_path(file_path))
+        changes, index, rows_checked = check_incremental(df, previous, ruleset_version())
+        return file_path, changes, len(df), fingerprint, index, rows_checked
+    except Exception as e:
+        print(f"[Error] Failed to process {file_path}: {e}")
+        return file_path, None, 0, None, None, 0
 
-def log_discrepancies(discrepancies, source_file):
-    """Append discrepancies to central log file inside timeCard."""
-    if discrepancies.empty:
-        print(f"[OK] No discrepancies in {source_file}")
-        return
 
-    discrepancies["ProcessedAt"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def _with_source(discrepancies, source_file, processed_at):
+    discrepancies["ProcessedAt"] = processed_at
     discrepancies["SourceFile"] = os.path.basename(source_file)
+    return discrepancies
 
+
+def _append_log(frame):
+    if os.path.exists(LOG_FILE):
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\r\n").split(",")
+        if header != list(frame.columns):
+            # Written by an older checker with other columns; start a fresh log next to it
+            old_log = f"{LOG_FILE}.{datetime.now():%Y%m%d%H%M%S}.old"
+            os.replace(LOG_FILE, old_log)
+            print(f"[Log] Log columns changed; previous log kept as {old_log}")
     if not os.path.exists(LOG_FILE):
-        discrepancies.to_csv(LOG_FILE, index=False)
+        frame.to_csv(LOG_FILE, index=False)
     else:
-        discrepancies.to_csv(LOG_FILE, mode="a", index=False, header=False)
+        frame.to_csv(LOG_FILE, mode="a", index=False, header=False)
+
+
+def log_discrepancies(discrepancies, source_file):
+    """Append new and cleared discrepancies to central log file inside timeCard."""
+    if discrepancies.empty:
+        print(f"[OK] No new or cleared discrepancies in {source_file}")
+        return
+
+    _append_log(_with_source(discrepancies, source_file, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    counts = discrepancies["Status"].value_counts()
+    print(f"[!] Logged {counts.get('new', 0)} new, {counts.get('cleared', 0)} cleared discrepancies from {source_file}")
+
+
+def log_discrepancy_batch(results):
+    """Appends the discrepancies of many checked files to the log in a single write. Returns the count."""
+    processed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    frames = [
+        _with_source(discrepancies, file_path, processed_at)
+        for file_path, discrepancies, *_ in results
+        if discrepancies is not None and not discrepancies.empty
+    ]
+    if not frames:
+        return 0
+    batch = pd.concat(frames, ignore_index=True)
+    _append_log(batch)
+    return len(batch)
+
+
+def check_archive(start=None, end=None, employee=None):
+    """
+    Runs the rules over the Parquet archive instead of the exported CSVs: only the pay periods
+    from `start` to `end` and the typed columns the rules use are read. Returns the findings.
+    """
+    frame = read_archive(start, end, columns=ARCHIVE_COLUMNS, employee=employee)
+    if frame.empty:
+        return pd.DataFrame(columns=DISCREPANCY_COLUMNS)
+    return check_normalized(normalize_archive(frame)).reset_index(drop=True)
+
+
+def check_totals(start=None, end=None, employee=None):
+    """
+    Runs the rules that only need per-day sums (TOTALS_RULES) over the timesheet database's
+    daily_totals, one precomputed row per day, instead of over the punches. Returns the findings.
+    """
+    rules = [name for name in selected_rules() if name in TOTALS_RULES]
+    store = open_store()
+    try:
+        days = pd.DataFrame(query_daily_totals(store, start, end, employee))
+    finally:
+        store.close()
+    if days.empty or not rules:
+        return pd.DataFrame(columns=DISCREPANCY_COLUMNS)
+    return check_normalized(normalize_daily_totals(days), rules).reset_index(drop=True)
+
 
-    print(f"[!] Logged {len(discrepancies)} discrepancies from {source_file}")
+def notify():
+    # Notifications only if .env values exist
+    if ENABLE_EMAIL:
+        print("📧 Email notification would be sent here.")
+    if ENABLE_SLACK:
+        print("💬 Slack notification would be sent here.")
+    if ENABLE_DISCORD:
+        print("🎮 Discord notification would be sent here.")
 
 
 class TimeCardHandler(FileSystemEventHandler):
+    def __init__(self):
+        super().__init__()
+        # Debounces events and checks files off the observer thread; our own log is never rechecked
+        self.pipeline = EventPipeline(self.process, ignore=[LOG_FILE, MANIFEST_FILE])
+        self.ruleset = ruleset_version()
+        self.manifest = load_manifest(MANIFEST_FILE)
+        for file_path, fingerprint in known_fingerprints(self.manifest, MANIFEST_FILE, self.ruleset):
+            self.pipeline.remember(file_path, fingerprint)
+
+    def record(self, file_path, fingerprint, rows, index):
+        """Saves a checked file's row index and adds it to the manifest (saved by the caller)."""
+        save_row_index(_row_index_path(file_path), index)
+        record_check(self.manifest, MANIFEST_FILE, file_path, fingerprint, self.ruleset, rows, index["open"].values())
+
     def on_created(self, event):
         if not event.is_directory and event.src_path.endswith(".csv"):
-            self.process(event.src_path)
+            self.pipeline.submit(event.src_path)
 
     def on_modified(self, event):
         if not event.is_directory and event.src_path.endswith(".csv"):
-            self.process(event.src_path)
+            self.pipeline.submit(event.src_path)
+
+    def on_moved(self, event):
+        # Exporters write to a hidden temp file and rename it into place
+        if not event.is_directory and event.dest_path.endswith(".csv"):
+            self.pipeline.submit(event.dest_path)
 
     def process(self, file_path):
+        """Checks one changed file and logs its findings. Returns False if the check failed."""
+        metrics = RunMetrics("checker", file=os.path.basename(file_path))
         try:
             print(f"[Processing] {file_path}")
-            df = pd.read_csv(file_path)
-
-            # Keep track of which file rows came from
-            df["SourceFile"] = os.path.basename(file_path)
-
-            # Run discrepancy check
-            discrepancies = check_discrepancies(df)
+            with metrics.span("check"):
+                _, discrepancies, rows, fingerprint, index, rows_checked = check_file(file_path)
+            if discrepancies is None:
+                metrics.fail()
+                return False
+            metrics.count("rows", rows)
+            metrics.count("rows_checked", rows_checked)
+            if not discrepancies.empty:
+                for status, found in discrepancies["Status"].value_counts().items():
+                    metrics.count(f"discrepancies_{status}", int(found))
+            print(f"[Checked] {rows_checked} of {rows} rows in {metrics.stages[-1]['seconds'] * 1000:.1f} ms")
 
             # Log results
             if ENABLE_CSV:
-                log_discrepancies(discrepancies, file_path)
+                with metrics.span("log"):
+                    log_discrepancies(discrepancies, file_path)
+            with metrics.span("manifest"):
+                self.record(file_path, fingerprint, rows, index)
+                save_manifest(self.manifest, MANIFEST_FILE)
 
-            # Notifications only if .env values exist
-            if ENABLE_EMAIL:
-                print("📧 Email notification would be sent here.")
-            if ENABLE_SLACK:
-                print("💬 Slack notification would be sent here.")
-            if ENABLE_DISCORD:
-                print("🎮 Discord notification would be sent here.")
+            notify()
+            return True
 
         except Exception as e:
+            metrics.fail()
             print(f"[Error] Failed to process {file_path}: {e}")
+            return False
+        finally:
+            metrics.finish()
 
 
 # --- Initial scan of existing files ---
-def initial_scan(handler, folder):
-    print("[Startup] Scanning existing CSV files...")
+def scan_files(handler, folder):
+    """Every exported CSV under `folder`, minus the checker's own outputs."""
     for root, _, files in os.walk(folder):
-        for f in files:
-            if f.endswith(".csv"):
-                file_path = os.path.join(root, f)
-                handler.process(file_path)
-    print("[Startup] Scan complete.")
-
+        for f in sorted(files):
+            file_path = os.path.join(root, f)
+            if f.endswith(".csv") and not handler.pipeline.ignores(file_path):
+                yield file_path
 
-if __name__ == "__main__":
-    print(f"Monitoring folder: {WATCH_FOLDER}")
-    event_handler = TimeCardHandler()
 
-    # 🔹 Run initial scan only if enabled in .env
-    if ENABLE_INITIAL_SCAN:
-        initial_scan(event_handler, WATCH_FOLDER)
+def files_to_check(handler, folder, skipped):
+    """Files that are new, changed, or were checked with a different rule set; the rest are counted in `skipped`."""
+    for file_path in scan_files(handler, folder):
+        fingerprint = unchanged_fingerprint(handler.manifest, MANIFEST_FILE, file_path, handler.ruleset)
+        if fingerprint is None:
+            yield file_path
+        else:
+            handler.pipeline.remember(file_path, fingerprint)
+            skipped[0] += 1
 
-    observer = Observer()
-    observer.schedule(event_handler, WATCH_FOLDER, recursive=True)
-    observer.start()
 
+def initial_scan(handler, folder, workers=SCAN_WORKERS, chunk_files=SCAN_CHUNK_FILES):
+    """
+    Checks the existing CSVs that the manifest does not already cover, in `workers` processes when
+    more than one. Files go out in chunks of `chunk_files`; each chunk's discrepancies are appended
+    to the log in one write and the manifest is saved after it.
+    """
+    print(f"[Startup] Scanning existing CSV files ({workers} workers, rule set {handler.ruleset})...")
+    scan_start = time.monotonic()
+    files = rows = logged = 0
+    skipped = [0]
+    # Forget files that no longer exist
+    base = os.path.dirname(os.path.abspath(MANIFEST_FILE))
+    for key in list(handler.manifest["files"]):
+        file_path = os.path.join(base, key)
+        if not os.path.exists(file_path):
+            del handler.manifest["files"][key]
+            if os.path.exists(_row_index_path(file_path)):
+                os.remove(_row_index_path(file_path))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
     try:
+        paths = files_to_check(handler, folder, skipped)
         while True:
-            time.sleep(5)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
\ No newline at end of file
+            chunk = list(itertools.islice(paths, chunk_files))
+            if not chunk:
+                break
+            results = list(pool.map(check_file, chunk) if pool else map(check_file, chunk))
+            if ENABLE_CSV:
+                logged += log_discrepancy_batch(results)
+            for file_path, discrepancies, file_rows, fingerprint, index, _ in results:
+                if fingerprint is not None:
+                    # The watcher will not recheck these unless they change
+                    handler.pipeline.remember(file_path, fingerprint)
+                    handler.record(file_path, fingerprint, file_rows, index)
+                rows += file_rows
+            save_manifest(handler.manifest, MANIFEST_FILE)
+            files += len(chunk)
+            elapsed = time.monotonic() - scan_start
+            print(f"[Startup] {files} files, {rows} rows checked ({files / elapsed:.1f} files/s)")
+    finally:
+        if pool:
+            pool.shutdown()
+    save_manifest(handler.manifest, MANIFEST_FILE)
+    if logged:
+        notify()
+    print(f"[Startup] Scan complete: {files} files checked, {skipped[0]} unchanged skipped, "
+          f"{logged} discrepancies logged in {time.monotonic() - scan_start:.2f}s.")
+
+
+def _parse_day(value):
+    return datetime.strptime(value, "%m/%d/%Y").date() if value else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch exported timesheets for discrepancies.")
+    parser.add_argument("--archive", action="store_true",
+                        help="check the Parquet archive once instead of watching the CSV folder")
+    parser.add_argument("--totals", action="store_true",
+                        help=f"check the database's daily totals once ({', '.join(TOTALS_RULES)} only)")
+    parser.add_argument("--start", help="first work date to check with --archive/--totals (MM/DD/YYYY)")
+    parser.add_argument("--end", help="last work date to check with --archive/--totals (MM/DD/YYYY)")
+    parser.add_argument("--employee", help="NovaTime username the records were fetched with")
+    parser.add_argument("--output", help="CSV file to write the --archive/--totals findings to")
+    args = parser.parse_args()
+
+    if args.archive or args.totals:
+        source = "Archive" if args.archive else "Totals"
+        check_once = check_archive if args.archive else check_totals
+        check_start = time.perf_counter()
+        findings = check_once(_parse_day(args.start), _parse_day(args.end), args.employee)
+        print(f"[{source}] {len(findings)} discrepancies in {time.perf_counter() - check_start:.2f}s")
+        for rule_name, found in findings["Rule"].value_counts().items():
+            print(f"  {rule_name}: {found}")
+        if args.output:
+            findings.to_csv(args.output, index=False)
+            print(f"[{source}] Findings saved to {args.output}")
+    else:
+        print(f"Monitoring folder: {WATCH_FOLDER}")
+        event_handler = TimeCardHandler()
+
+        # 🔹 Run initial scan only if enabled in .env
+        if ENABLE_INITIAL_SCAN:
+            initial_scan(event_handler, WATCH_FOLDER)
+
+        event_handler.pipeline.start()
+        observer = Observer()
+        observer.schedule(event_handler, WATCH_FOLDER, recursive=True)
+        observer.start()
+
+        try:
+            while True:
+                time.sleep(5)
+        except KeyboardInterrupt:
+            observer.stop()
+        observer.join()
+        event_handler.pipeline.stop()
\ No newline at end of file
@@ -1,19 +1,36 @@
 import os
 import time
-import csv
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import json
 import re # Import regex for sanitizing folder names
 from dotenv import load_dotenv
+from session_cache import open_authenticated_context
+from novatime_api import fetch_pay_period, datalist_hash
+from page_waits import WAIT_TIMEOUT_MS, wait_for_timesheet_response, find_timesheet_frame
+from record_transform import compile_profile
+from timesheet_store import EXPORT_FILES, store_records
+from timesheet_archive import archive_enabled, archive_records
+from resource_filter import resource_filter_for
+from output_channel import atomic_write, tee_rows, timesheet_markers
+from run_metrics import RunMetrics, span, count
+from screenshots import SCREENSHOT_MODE, SCREENSHOT_DEVICE_SCALE, wants_screenshot, take_screenshot
 
 # --- Load environment variables from .env ---
 load_dotenv()
 NOVATIME_USERNAME = os.getenv("NOVATIME_USERNAME")
 NOVATIME_PASSWORD = os.getenv("NOVATIME_PASSWORD")
 LOGIN_URL = os.getenv("LOGIN_URL")
-TIMESHEET_SELECTOR = os.getenv("TIMESHEET_SELECTOR")
 API_PREFIX = os.getenv("API_PREFIX")
+# "ui" drives the Timesheet page and sniffs the API response, "direct" calls timesheetdetail itself
+FETCH_MODE = os.getenv("FETCH_MODE", "ui").lower()
+# Skip writing, screenshotting and printing a pay period whose DataList hash matches the last saved one
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "true").lower() == "true"
+# Per pay-period folder; hidden so the checker never picks it up
+DATALIST_HASH_FILE = ".datalist.sha256"
+
+# Column layout and group mapping live in record_transform.TIMECARD_PROFILE
+TIMECARD_COLUMNS, build_timecard_row = compile_profile("timecard")
 
 def sanitize_folder_name(name):
     """Sanitizes a string to be a valid folder name."""
@@ -23,237 +40,240 @@ def sanitize_folder_name(name):
     name = name.replace(' ', '_')
     return name
 
-def login_and_grab_timesheet():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-        page.set_viewport_size({"width": 2560, "height": 1440})
-
-        # Use a fixed "timeCard" folder inside the script's directory
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        base_output_dir = os.path.join(script_dir, "timeCard")
-        os.makedirs(base_output_dir, exist_ok=True)
-        print(f"📁 Base output directory: {base_output_dir}")
-        now_str = datetime.now().strftime("%Y%m%d")
-
-        # Prepare for data capture
-        captured_json_data = {"data": None, "found": False}
-
-        def handle_response(response):
-            url = response.url
-            if API_PREFIX in url:
-                print(f"✅ Found matching JSON API request: {url}")
-                try:
-                    # Capture the latest JSON data, don't process immediately
-                    captured_json_data["data"] = response.body().decode("utf-8")
-                    captured_json_data["found"] = True
-                except Exception as e:
-                    print(f"❌ Failed to capture JSON response body: {e}")
-
-        page.on("response", handle_response)
-
-        # 1) Go to login page
-        page.goto(LOGIN_URL)
-        page.wait_for_selector("#txtUserName")
-
-        # 2) Login
-        page.fill("#txtUserName", NOVATIME_USERNAME)
-        page.fill("#txtPassword", NOVATIME_PASSWORD)
-        page.click("input[value='Employee Web']")
-        page.wait_for_load_state("networkidle")
-        print("✅ Logged in!")
-
-        # 3) Go to Timesheet
-        page.wait_for_selector("h4:has-text('Timesheet')")
-        page.click("h4:has-text('Timesheet')")
-        page.wait_for_load_state("networkidle")
+def grab_via_ui(page, metrics=None):
+    """Drives the Timesheet UI and captures the timesheetdetail response. Returns the JSON text or None."""
+    try:
+        # 3) Go to Timesheet; resolves as soon as the timesheet iframe's API call returns
+        with span(metrics, "timesheet_open"):
+            page.wait_for_selector("h4:has-text('Timesheet')", timeout=WAIT_TIMEOUT_MS)
+            print("🔎 Opening Timesheet and waiting for its API response...")
+            response = wait_for_timesheet_response(page, lambda: page.click("h4:has-text('Timesheet')"))
         print(f"Page URL after Timesheet click: {page.url}")
 
         # 4) Find the iframe containing the timesheet
-        max_wait_time = 120  # seconds
-        start_time = time.time()
-        timesheet_frame = None
-
-        print("🔎 Searching for timesheet iframe...")
-
-        while time.time() - start_time < max_wait_time:
-            for frame in page.frames:
-                try:
-                    # Check if "TimesheetSection" is in the frame's URL or content
-                    if "TimesheetSection" in frame.url or "TimesheetSection" in frame.content():
-                        print(f"✅ Found timesheet in frame: {frame.url}")
-                        timesheet_frame = frame
-                        break
-                except Exception as e:
-                    pass # Silently ignore frames that can't be accessed
-            if timesheet_frame:
-                break
-            time.sleep(1)
-
+        with span(metrics, "iframe_search"):
+            timesheet_frame = find_timesheet_frame(page, response)
         if not timesheet_frame:
             print("❌ Could not find timesheet iframe after waiting.")
-            browser.close()
-            return
+            return None
+        print(f"✅ Found timesheet in frame: {timesheet_frame.url}")
 
-        # 5) Navigate directly to the iframe URL
+        # 5) Navigate directly to the iframe URL; the page reloads the data, capture the fresh response
         iframe_url = timesheet_frame.url
         print(f"🌐 Navigating directly to timesheet iframe URL: {iframe_url}")
-        page.goto(iframe_url)
-        page.wait_for_load_state("networkidle")
-
-        # Wait additional time for data and network requests
-        print("⏳ Waiting 10 seconds for data and API request to finalize...")
-        time.sleep(10) # Increased wait time to ensure all data is loaded and captured
-
-        # --- Process and save JSON/CSV data only once here ---
-        if captured_json_data["found"] and captured_json_data["data"]:
+        with span(metrics, "api_response"):
+            response = wait_for_timesheet_response(page, lambda: page.goto(iframe_url))
+            body = response.body()
+        count(metrics, "bytes_received", len(body))
+        return body.decode("utf-8")
+    except PlaywrightTimeoutError:
+        print("❌ Did not detect any JSON API requests matching the prefix. No files saved.")
+        return None
+    except Exception as e:
+        print(f"❌ Failed to capture JSON response body: {e}")
+        return None
+
+def grab_direct(context, metrics=None):
+    """Calls timesheetdetail for the current pay period with the session's cookies, no page render."""
+    try:
+        with span(metrics, "api_response"):
+            json_data = fetch_pay_period(context.request)
+        count(metrics, "bytes_received", len(json_data.encode("utf-8")))
+        print("✅ Fetched timesheet JSON directly from the API.")
+        return json_data
+    except Exception as e:
+        print(f"❌ Direct timesheetdetail fetch failed: {e}")
+        return None
+
+def read_saved_hash(folder):
+    try:
+        with open(os.path.join(folder, DATALIST_HASH_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_saved_hash(folder, digest):
+    with open(os.path.join(folder, DATALIST_HASH_FILE), "w", encoding="utf-8") as f:
+        f.write(digest)
+
+def save_timesheet(json_data, base_output_dir, page=None, employee=None, metrics=None):
+    """
+    Upserts the timesheetdetail records into the timesheet database and saves them as
+    timesheet.json/.csv in their pay-period folder (unless EXPORT_FILES is off), plus a
+    screenshot per SCREENSHOT_MODE when a rendered timesheet page is available. A pay period whose DataList is
+    unchanged since the last save is skipped entirely (SKIP_UNCHANGED).
+    Returns the pay-period folder, or None if nothing was saved.
+    """
+    try:
+        # Parse JSON to extract WeekGroupString for folder naming
+        with span(metrics, "parse"):
+            timesheet_json = json.loads(json_data)
+            records = timesheet_json.get("DataList", [])
+        count(metrics, "records", len(records))
+
+        # --- Determine date range for folder name ---
+        pay_period_start = pay_period_end = None
+        for rec in records:
+            if rec.get("dPayPeriodStart") and rec.get("dPayPeriodEnd"):
+                pay_period_start = rec["dPayPeriodStart"]
+                pay_period_end = rec["dPayPeriodEnd"]
+                break
+        if not (pay_period_start and pay_period_end):
+            work_dates = [rec.get("dWorkDate") for rec in records if rec.get("dWorkDate")]
+            if work_dates:
+                pay_period_start = min(work_dates)
+                pay_period_end = max(work_dates)
+        # If no pay period or work dates found, skip processing
+        if not pay_period_start or not pay_period_end:
+            print("No timecard data available yet")
+            return None
+
+        def fmt(dtstr):
+            if not dtstr:
+                return "unknown"
             try:
-                json_data = captured_json_data["data"]
-
-                # Parse JSON to extract WeekGroupString for folder naming
-                timesheet_json = json.loads(json_data)
-                records = timesheet_json.get("DataList", [])
-
-                # --- Determine date range for folder name ---
-                pay_period_start = pay_period_end = None
-                for rec in records:
-                    if rec.get("dPayPeriodStart") and rec.get("dPayPeriodEnd"):
-                        pay_period_start = rec["dPayPeriodStart"]
-                        pay_period_end = rec["dPayPeriodEnd"]
-                        break
-                if not (pay_period_start and pay_period_end):
-                    work_dates = [rec.get("dWorkDate") for rec in records if rec.get("dWorkDate")]
-                    if work_dates:
-                        pay_period_start = min(work_dates)
-                        pay_period_end = max(work_dates)
-                # If no pay period or work dates found, skip processing
-                if not pay_period_start or not pay_period_end:
-                    print("No timecard data available yet")
-                    return
-                def fmt(dtstr):
-                    if not dtstr:
-                        return "unknown"
-                    try:
-                        dt = datetime.strptime(dtstr.split()[0], "%m/%d/%Y")
-                        return dt.strftime("%m-%d-%y")
-                    except Exception:
-                        return "unknown"
-                start_str = fmt(pay_period_start)
-                end_str = fmt(pay_period_end)
-                folder_name = f"{start_str}_to_{end_str}"
-                folder_name = sanitize_folder_name(folder_name)
-                # --- END date range for folder name ---
-
-                # Create the new weekly output directory
-                weekly_output_dir = os.path.join(base_output_dir, folder_name)
-                os.makedirs(weekly_output_dir, exist_ok=True)
-                print(f"📁 Output files will be saved in: {weekly_output_dir}")
-
-                # Define file paths using the new weekly_output_dir
-                json_filename = "timesheet.json"
-                json_path = os.path.join(weekly_output_dir, json_filename)
-                
-                csv_filename = "timesheet.csv"
-                csv_path = os.path.join(weekly_output_dir, csv_filename)
-
-                screenshot_filename = "timesheet.png"
-                screenshot_path = os.path.join(weekly_output_dir, screenshot_filename)
-
-                # Save JSON
-                with open(json_path, "w", encoding="utf-8") as f:
-                    f.write(json_data)
-                print(f"✅ Timesheet JSON data saved at {json_path}")
-
-                columns = [
-                    "Date",
-                    "Pay Code",
-                    "In",
-                    "Out",
-                    "Reg",
-                    "OT-1",
-                    "OT-2",
-                    "Daily Hours *",
-                    "Shift Exp",
-                    "Schedule",
-                    "Total Hours\xa0*",
-                    "Account",
-                    "ActShortCode",
-                    "Facility",
-                ]
-
-                column_field_map = {
-                    "Date": "DateKey",
-                    "Pay Code": "cPayCodeDescription",
-                    "In": "dIn",
-                    "Out": "dOut",
-                    "Reg": "nWorkHours",
-                    "OT-1": "nOT1Hours",
-                    "OT-2": "nOT2Hours",
-                    "Daily Hours *": "nDailyHours",
-                    "Shift Exp": "cShiftExpression",
-                    "Schedule": "cSchedule",
-                    "Total Hours\xa0*": "nWeeklyHours",
-                }
-
-                # Save CSV
-                with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(columns)
-                    for rec in records:
-                        row_data = []
-                        account_value = ""
-                        act_short_code_value = ""
-                        facility_value = ""
-
-                        for group in rec.get("GroupingList", []) + rec.get("GroupValueList", []):
-                            if group.get("iGroupNumber") == 3:
-                                account_value = group.get("cGroupValueDescription", "")
-                                act_short_code_value = group.get("cGroupValue", "")
-                            elif group.get("iGroupNumber") == 17:
-                                facility_value = group.get("cGroupValueDescription", "")
-                            elif group.get("iGroupNumber") == 16 and not facility_value:
-                                facility_value = group.get("cGroupValueDescription", "")
+                dt = datetime.strptime(dtstr.split()[0], "%m/%d/%Y")
+                return dt.strftime("%m-%d-%y")
+            except Exception:
+                return "unknown"
+        start_str = fmt(pay_period_start)
+        end_str = fmt(pay_period_end)
+        folder_name = f"{start_str}_to_{end_str}"
+        folder_name = sanitize_folder_name(folder_name)
+        # --- END date range for folder name ---
+
+        # Create the new weekly output directory
+        weekly_output_dir = os.path.join(base_output_dir, folder_name)
+        os.makedirs(weekly_output_dir, exist_ok=True)
+        print(f"📁 Output files will be saved in: {weekly_output_dir}")
+
+        # Define file paths using the new weekly_output_dir
+        json_filename = "timesheet.json"
+        json_path = os.path.join(weekly_output_dir, json_filename)
+
+        csv_filename = "timesheet.csv"
+        csv_path = os.path.join(weekly_output_dir, csv_filename)
+
+        # Nothing to do when this pay period's records are exactly what the last run saved
+        digest = datalist_hash(records)
+        outputs = [json_path, csv_path] if EXPORT_FILES else []
+        if SKIP_UNCHANGED and digest == read_saved_hash(weekly_output_dir) and all(map(os.path.exists, outputs)):
+            print(f"⏭️ Timesheet unchanged since the last run ({digest[:12]}); nothing written.")
+            count(metrics, "unchanged")
+            if page is not None and wants_screenshot(changed=False):
+                with span(metrics, "screenshot"):
+                    take_screenshot(page, weekly_output_dir)
+            return weekly_output_dir
+
+        try:
+            with span(metrics, "store"):
+                # The response is the whole current pay period, so it replaces what is stored for it
+                store_records(records, employee=employee, replace_periods=True)
+        except Exception as e:
+            print(f"⚠️ Could not store records in the timesheet database: {e}")
+        if archive_enabled():
+            try:
+                with span(metrics, "archive"):
+                    archive_records(records, employee=employee, replace_periods=True)
+            except Exception as e:
+                print(f"⚠️ Could not archive records as Parquet: {e}")
+
+        if EXPORT_FILES:
+            # Save JSON (temp file + rename, so watchers never see a partial file)
+            with span(metrics, "json_write"), atomic_write(json_path) as f:
+                f.write(json_data)
+            print(f"✅ Timesheet JSON data saved at {json_path}")
+
+            # Save CSV, streaming each row to TIMESHEET_OUTPUT (stdout by default) in the same pass
+            with span(metrics, "csv_write"):
+                with atomic_write(csv_path, newline="") as csvfile, \
+                        tee_rows(TIMECARD_COLUMNS, csvfile, markers=timesheet_markers(employee)) as writer:
+                    writer.writeheader()
+                    writer.writerows(build_timecard_row(rec) for rec in records)
+            print(f"✅ Timesheet CSV file saved at {csv_path}")
+        else:
+            print("⏭️ JSON/CSV export skipped (EXPORT_FILES=false).")
 
-                        for col in columns:
-                            if col == "Account":
-                                row_data.append(account_value)
-                            elif col == "ActShortCode":
-                                row_data.append(act_short_code_value)
-                            elif col == "Facility":
-                                row_data.append(facility_value)
-                            else:
-                                row_data.append(rec.get(column_field_map.get(col, col), ""))
+        # 6-7) Screenshot the timesheet table (or keep its HTML for a deferred one)
+        if not wants_screenshot(changed=True):
+            print("📸 Screenshot skipped (SCREENSHOT_MODE=never).")
+        elif page is None:
+            print("📸 Screenshot skipped (no rendered timesheet page in direct fetch mode).")
+        else:
+            with span(metrics, "screenshot"):
+                take_screenshot(page, weekly_output_dir)
 
-                        writer.writerow(row_data)
-                print(f"✅ Timesheet CSV file saved at {csv_path}")
+        write_saved_hash(weekly_output_dir, digest)
+        print("✅ Script completed successfully with JSON and CSV saved.")
+        return weekly_output_dir
 
-                # --- Output CSV contents to stdout for automation ---
-                print("-----BEGIN_TIMESHEET_CSV-----")
-                with open(csv_path, "r", encoding="utf-8") as csvfile:
-                    print(csvfile.read().strip())
-                print("-----END_TIMESHEET_CSV-----")
+    except Exception as e:
+        print(f"❌ Failed to process captured JSON data and save files: {e}")
+        return None
 
-                # 6) Locate the timesheet table element (moved here as it depends on json processing success)
-                timesheet_element = page.query_selector(TIMESHEET_SELECTOR)
-                if not timesheet_element:
-                    print("❌ Could not find timesheet element on iframe page for screenshot.")
-                else:
-                    # 7) Save screenshot
-                    timesheet_element.screenshot(path=screenshot_path)
-                    print(f"📸 Screenshot saved at {screenshot_path}")
+def login_and_grab_timesheet(metrics=None):
+    """Runs one export; stage timings and counts go to `metrics` (a run_metrics.RunMetrics) if given."""
+    with sync_playwright() as p:
+        with span(metrics, "browser_launch"):
+            browser = p.chromium.launch(headless=True)
 
-                print("✅ Script completed successfully with JSON and CSV saved.")
+        # Use a fixed "timeCard" folder inside the script's directory
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        base_output_dir = os.path.join(script_dir, "timeCard")
+        os.makedirs(base_output_dir, exist_ok=True)
+        print(f"📁 Base output directory: {base_output_dir}")
 
-            except Exception as e:
-                print(f"❌ Failed to process captured JSON data and save files: {e}")
+        direct = FETCH_MODE == "direct"
+        screenshots = not direct and SCREENSHOT_MODE != "never"
+        # Images, fonts, styles and analytics are not needed; styles and images come back for the screenshot
+        resource_filter = resource_filter_for(for_screenshot=screenshots)
+
+        # 1-2) Login, reusing the cached session from a previous run when still valid.
+        # In direct mode a warm session never opens a page at all.
+        with span(metrics, "login"):
+            context, page, warm = open_authenticated_context(
+                browser, NOVATIME_USERNAME, NOVATIME_PASSWORD, LOGIN_URL,
+                open_page=not direct,
+                resource_filter=resource_filter,
+                viewport={"width": 2560, "height": 1440},
+                device_scale_factor=SCREENSHOT_DEVICE_SCALE,
+            )
+        if metrics is not None:
+            metrics.label(session="warm" if warm else "cold")
+
+        if direct:
+            json_data = grab_direct(context, metrics)
         else:
-            print("❌ Did not detect any JSON API requests matching the prefix. No files saved.")
+            json_data = grab_via_ui(page, metrics)
 
+        # --- Process and save JSON/CSV data only once here ---
+        saved = None
+        if json_data:
+            saved = save_timesheet(json_data, base_output_dir, page=None if direct else page, metrics=metrics)
+        if saved is None and metrics is not None:
+            metrics.fail()
+
+        if resource_filter:
+            print(resource_filter.report())
+            count(metrics, "page_bytes", resource_filter.loaded_bytes)
+            count(metrics, "blocked_requests", sum(resource_filter.blocked.values()))
         browser.close()
+        return warm
 
 if __name__ == "__main__":
     if not NOVATIME_USERNAME or not NOVATIME_PASSWORD:
         print("❌ Missing NOVATIME_USERNAME or NOVATIME_PASSWORD in your .env file.")
+    elif FETCH_MODE == "direct" and not (os.getenv("NOVATIME_ACCESS_SEQ") and os.getenv("NOVATIME_EMPLOYEE_SEQ")):
+        print("❌ FETCH_MODE=direct needs NOVATIME_ACCESS_SEQ and NOVATIME_EMPLOYEE_SEQ in your .env file.")
     else:
-        login_and_grab_timesheet()
\ No newline at end of file
+        run_start = time.monotonic()
+        metrics = RunMetrics("timecard", fetch=FETCH_MODE)
+        try:
+            warm = login_and_grab_timesheet(metrics)
+        except BaseException:
+            metrics.fail()
+            raise
+        finally:
+            metrics.finish()
+            print(metrics.summary())
+        print(f"⏱️ Run finished in {time.monotonic() - run_start:.2f}s ({'warm' if warm else 'cold'} session, {FETCH_MODE} fetch)")
@@ -0,0 +1,186 @@
+import os
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta
+from playwright.sync_api import sync_playwright
+from dotenv import load_dotenv
+from session_cache import open_authenticated_context
+from novatime_api import pay_period_for
+from resource_filter import resource_filter_for
+from timecard import grab_direct, save_timesheet
+from run_metrics import RunMetrics
+
+# --- Load environment variables from .env ---
+load_dotenv()
+NOVATIME_USERNAME = os.getenv("NOVATIME_USERNAME")
+NOVATIME_PASSWORD = os.getenv("NOVATIME_PASSWORD")
+LOGIN_URL = os.getenv("LOGIN_URL")
+# Poll every DAEMON_POLL_SECONDS, or every DAEMON_FAST_POLL_SECONDS in the last DAEMON_FAST_WINDOW_HOURS of a pay period
+DAEMON_POLL_SECONDS = int(os.getenv("DAEMON_POLL_SECONDS", "1800"))
+DAEMON_FAST_POLL_SECONDS = int(os.getenv("DAEMON_FAST_POLL_SECONDS", "300"))
+DAEMON_FAST_WINDOW_HOURS = int(os.getenv("DAEMON_FAST_WINDOW_HOURS", "24"))
+# Start a fresh browser after this many polls or once Chromium's processes use this much memory
+DAEMON_RECYCLE_RUNS = int(os.getenv("DAEMON_RECYCLE_RUNS", "50"))
+DAEMON_RECYCLE_RSS_MB = int(os.getenv("DAEMON_RECYCLE_RSS_MB", "1024"))
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_OUTPUT_DIR = os.path.join(SCRIPT_DIR, "timeCard")
+
+
+def process_tree_rss_mb(pid=None):
+    """Resident memory of a process and all its descendants (the browser's), from /proc. 0 where unavailable."""
+    pid = pid or os.getpid()
+    children = {}
+    rss_kb = {}
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return 0.0
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/status", "r", encoding="utf-8") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue  # Exited while we were looking
+        children.setdefault(int(fields["PPid"]), []).append(int(entry))
+        rss_kb[int(entry)] = int(fields.get("VmRSS", "0 kB").split()[0])
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_kb.get(current, 0)
+        stack.extend(children.get(current, ()))
+    return total / 1024
+
+
+def next_poll_delay(now=None, failures=0):
+    """
+    Seconds until the next poll: DAEMON_FAST_POLL_SECONDS once the pay period is within
+    DAEMON_FAST_WINDOW_HOURS of closing, otherwise DAEMON_POLL_SECONDS; failed polls retry
+    sooner, backing off towards the regular interval.
+    """
+    now = now or datetime.now()
+    period_end = datetime.combine(pay_period_for(now.date())[1] + timedelta(days=1), datetime.min.time())
+    if period_end - now <= timedelta(hours=DAEMON_FAST_WINDOW_HOURS):
+        delay = DAEMON_FAST_POLL_SECONDS
+    else:
+        delay = DAEMON_POLL_SECONDS
+    if failures:
+        delay = min(delay, 30 * 2 ** (failures - 1))
+    return delay
+
+
+class TimecardDaemon:
+    """Keeps one Chromium and one authenticated context alive between polls of the current pay period."""
+
+    def __init__(self, playwright, headless=True):
+        self.playwright = playwright
+        self.headless = headless
+        self.browser = None
+        self.context = None
+        # One filter for the daemon's whole life so its report covers every browser
+        self.resource_filter = resource_filter_for()
+        self.runs = 0  # Polls since the browser was (re)started
+
+    def start_browser(self):
+        self.browser = self.playwright.chromium.launch(headless=self.headless)
+        self.runs = 0
+        self.authenticate()
+
+    def authenticate(self):
+        """Opens an authenticated context, reusing the cached session when still valid."""
+        if self.context is not None:
+            self.context.close()
+        self.context, page, warm = open_authenticated_context(
+            self.browser, NOVATIME_USERNAME, NOVATIME_PASSWORD, LOGIN_URL,
+            open_page=False, resource_filter=self.resource_filter,
+        )
+        if page is not None:
+            page.close()  # Only the cookies are needed between polls
+        print(f"🔐 Context ready ({'warm' if warm else 'cold'} session)")
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+        self.browser = self.context = None
+
+    def recycle_if_needed(self):
+        """Restarts Chromium after DAEMON_RECYCLE_RUNS polls or when its memory passes DAEMON_RECYCLE_RSS_MB."""
+        rss_mb = process_tree_rss_mb()
+        if self.runs >= DAEMON_RECYCLE_RUNS or rss_mb >= DAEMON_RECYCLE_RSS_MB:
+            print(f"♻️ Recycling browser after {self.runs} polls ({rss_mb:.0f} MB resident)")
+            self.close()
+            self.start_browser()
+
+    def poll(self):
+        """Fetches and saves the current pay period once. Returns True on success."""
+        if self.browser is None:
+            self.start_browser()
+        else:
+            self.recycle_if_needed()
+        self.runs += 1
+        metrics = RunMetrics("daemon")
+        try:
+            json_data = grab_direct(self.context, metrics)
+            if json_data is None:
+                # Most often an expired session: log in again (only if the cached one is really gone) and retry once
+                print("🔁 Re-authenticating and retrying...")
+                metrics.count("retries")
+                with metrics.span("login"):
+                    self.authenticate()
+                json_data = grab_direct(self.context, metrics)
+            if json_data is None or save_timesheet(json_data, BASE_OUTPUT_DIR, metrics=metrics) is None:
+                metrics.fail()
+                return False
+        except BaseException:
+            metrics.fail()
+            raise
+        finally:
+            metrics.finish()
+        print(f"⏱️ Poll {self.runs} finished: {metrics.summary()}")
+        return True
+
+
+def run_daemon(max_polls=None, headless=True):
+    """Polls until SIGINT/SIGTERM (or `max_polls`), sleeping an adaptive interval between polls."""
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
+    polls = failures = 0
+    with sync_playwright() as p:
+        daemon = TimecardDaemon(p, headless=headless)
+        try:
+            while not stopping.is_set():
+                try:
+                    ok = daemon.poll()
+                except Exception as e:
+                    print(f"❌ Poll failed: {e}")
+                    daemon.close()  # Start from a fresh browser next time
+                    ok = False
+                failures = 0 if ok else failures + 1
+                polls += 1
+                if max_polls and polls >= max_polls:
+                    break
+                delay = next_poll_delay(failures=failures)
+                print(f"💤 Next poll in {delay}s")
+                stopping.wait(delay)
+        finally:
+            daemon.close()
+    if daemon.resource_filter:
+        print(daemon.resource_filter.report())
+    print("👋 Daemon stopped.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll the current NovaTime pay period with a long-lived browser.")
+    parser.add_argument("--max-polls", type=int, help="exit after this many polls (default: run until stopped)")
+    args = parser.parse_args()
+
+    if not NOVATIME_USERNAME or not NOVATIME_PASSWORD:
+        print("❌ Missing NOVATIME_USERNAME or NOVATIME_PASSWORD in your .env file.")
+    elif not (os.getenv("NOVATIME_ACCESS_SEQ") and os.getenv("NOVATIME_EMPLOYEE_SEQ")):
+        print("❌ The daemon fetches directly and needs NOVATIME_ACCESS_SEQ and NOVATIME_EMPLOYEE_SEQ in your .env file.")
+    else:
+        run_daemon(max_polls=args.max_polls)
@@ -1,11 +1,11 @@
 import os
-import time
 import csv
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import json
 import re
 from dotenv import load_dotenv
+from page_waits import WAIT_TIMEOUT_MS, wait_for_timesheet_response, find_timesheet_frame, wait_for_render
 
 # --- Load environment variables from .env ---
 load_dotenv()
@@ -37,18 +37,6 @@ def login_and_grab_timesheet():
 
         captured_json_data = {"data": None, "found": False}
 
-        def handle_response(response):
-            url = response.url
-            if API_PREFIX in url:
-                print(f"✅ Found matching JSON API request: {url}")
-                try:
-                    captured_json_data["data"] = response.body().decode("utf-8")
-                    captured_json_data["found"] = True
-                except Exception as e:
-                    print(f"❌ Failed to capture JSON response body: {e}")
-
-        page.on("response", handle_response)
-
         # 1) Go to login page
         page.goto(LOGIN_URL)
         page.wait_for_selector("#txtUserName")
@@ -63,14 +51,11 @@ def login_and_grab_timesheet():
         # 3) Go to Timesheet
         page.wait_for_selector("h4:has-text('Timesheet')")
         page.click("h4:has-text('Timesheet')")
-        page.wait_for_load_state("networkidle")
-        # Extra wait to ensure Angular bindings are ready
-        page.wait_for_timeout(3000) 
         print(f"📄 Page URL after Timesheet click: {page.url}")
 
         # 4) Select the dropdown and choose the option labeled "Last Pay Period"
         try:
-            page.wait_for_selector("#MainContentFrame", state="attached", timeout=10000)
+            page.wait_for_selector("#MainContentFrame", state="attached", timeout=WAIT_TIMEOUT_MS)
             print("✅ MainContentFrame loaded")
             dropdown_locator = (page.locator("#MainContentFrame")
                               .content_frame
@@ -79,9 +64,10 @@ def login_and_grab_timesheet():
                               .locator("#titleRightDiv")
                               .get_by_role("combobox"))
 
-            # Wait for dropdown to be visible and have options
-            dropdown_locator.wait_for(state="visible", timeout=10000)
-            page.wait_for_timeout(5000)  # Additional wait for Angular to populate options
+            # Wait for dropdown to be visible and for Angular to populate its options
+            dropdown_locator.wait_for(state="visible", timeout=WAIT_TIMEOUT_MS)
+            dropdown_locator.locator("option[value]:not([value=''])").first.wait_for(
+                state="attached", timeout=WAIT_TIMEOUT_MS)
 
             # Get all available options
             options = dropdown_locator.locator("option").all()
@@ -97,62 +83,47 @@ def login_and_grab_timesheet():
                     selected_value = option.get_attribute("value")
                     break
 
+            # Selecting a period makes the page reload its data; wait for that API response
             if selected_value:
-                dropdown_locator.select_option(selected_value)
+                response = wait_for_timesheet_response(page, lambda: dropdown_locator.select_option(selected_value))
                 print(f"✅ Selected option: {desired_label} (value: {selected_value})")
             else:
                 print(f"⚠️ Option '{desired_label}' not found in dropdown.")
                 if option_values:
                     fallback_option = option_values[0]
-                    dropdown_locator.select_option(fallback_option)
+                    response = wait_for_timesheet_response(page, lambda: dropdown_locator.select_option(fallback_option))
                     print(f"✅ Selected fallback option: {option_texts[0]} (value: {fallback_option})")
                 else:
                     print("❌ No options available in dropdown.")
                     browser.close()
                     return
 
-            page.wait_for_timeout(5000)  # Wait for page to react to selection
-
         except Exception as e:
             print(f"❌ Failed to interact with dropdown: {e}")
             browser.close()
             return
 
         # 5) Find the iframe containing the timesheet
-        max_wait_time = 120  # seconds
-        start_time = time.time()
-        timesheet_frame = None
-
         print("🔎 Searching for timesheet iframe...")
-
-        while time.time() - start_time < max_wait_time:
-            for frame in page.frames:
-                try:
-                    # Check if "TimesheetSection" is in the frame's URL or content
-                    if "TimesheetSection" in frame.url or "TimesheetSection" in frame.content():
-                        print(f"✅ Found timesheet in frame: {frame.url}")
-                        timesheet_frame = frame
-                        break
-                except Exception as e:
-                    pass  # Silently ignore frames that can't be accessed
-            if timesheet_frame:
-                break
-            time.sleep(1)
+        timesheet_frame = find_timesheet_frame(page, response)
 
         if not timesheet_frame:
             print("❌ Could not find timesheet iframe after waiting.")
             browser.close()
             return
+        print(f"✅ Found timesheet in frame: {timesheet_frame.url}")
 
-        # 6) Navigate directly to the iframe URL
+        # 6) Navigate directly to the iframe URL and capture the data it loads
         iframe_url = timesheet_frame.url
         print(f"🌐 Navigating directly to timesheet iframe URL: {iframe_url}")
-        page.goto(iframe_url)
-        page.wait_for_load_state("networkidle")
-
-        # Wait additional time for data and network requests
-        print("⏳ Waiting 10 seconds for data and API request to finalize...")
-        time.sleep(10)  # Increased wait time to ensure all data is loaded and captured
+        try:
+            response = wait_for_timesheet_response(page, lambda: page.goto(iframe_url))
+            captured_json_data["data"] = response.body().decode("utf-8")
+            captured_json_data["found"] = True
+        except PlaywrightTimeoutError:
+            pass  # Reported below as no matching API request
+        except Exception as e:
+            print(f"❌ Failed to capture JSON response body: {e}")
 
         # --- Process and save JSON/CSV data only once here ---
         if captured_json_data["found"] and captured_json_data["data"]:
@@ -278,7 +249,7 @@ def login_and_grab_timesheet():
                 print(f"✅ Timesheet CSV file saved at {csv_path}")
 
                 # 7) Locate the timesheet table element
-                timesheet_element = page.query_selector(TIMESHEET_SELECTOR)
+                timesheet_element = wait_for_render(page, TIMESHEET_SELECTOR)
                 if not timesheet_element:
                     print("❌ Could not find timesheet element on iframe page for screenshot.")
                 else:
@@ -0,0 +1,311 @@
+import os
+import re
+import json
+import time
+import argparse
+from datetime import date, datetime
+from dotenv import load_dotenv
+from novatime_api import pay_period_for
+from novatime_time import parse_date, parse_datetime
+from timesheet_store import DEFAULT_EMPLOYEE, TIMESHEET_DB, open_store, record_ids
+from output_channel import atomic_write
+
+# pyarrow is optional: without it the archive is simply not written
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+# --- Load environment variables from .env ---
+load_dotenv()
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Parquet files laid out as <ARCHIVE_DIR>/year=YYYY/pay_period=YYYY-MM-DD/<employee>.parquet
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(SCRIPT_DIR, "archive"))
+# Every fetch is also archived when pyarrow is installed; "false" turns it off
+PARQUET_ARCHIVE = os.getenv("PARQUET_ARCHIVE", "true").lower() == "true"
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+
+# Groups kept as columns (group_<n> value, group_<n>_desc): the ones the CSV layouts read
+ARCHIVE_GROUPS = (1, 3, 12, 16, 17)
+
+# (column, NovaTime field) for the float hour columns
+_HOUR_FIELDS = (
+    ("reg_hours", "nWorkHours"),
+    ("ot1_hours", "nOT1Hours"),
+    ("ot2_hours", "nOT2Hours"),
+    ("ot1_pay", "nOT1Pay"),
+    ("ot2_pay", "nOT2Pay"),
+    ("total_hours", "nTotalHours"),
+    ("daily_hours", "nDailyHours"),
+    ("daily_total_hours", "nDailyTotalHours"),
+    ("weekly_hours", "nWeeklyHours"),
+)
+# (column, NovaTime field) for the free-text columns
+_TEXT_FIELDS = (
+    ("shift_exp", "cShiftExpression"),
+    ("exp_code", "cExpCode"),
+)
+
+
+def archive_enabled():
+    """Whether exporters should archive what they fetch: PARQUET_ARCHIVE is on and pyarrow is installed."""
+    return PARQUET_ARCHIVE and pq is not None
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise RuntimeError("The Parquet archive needs pyarrow (pip install pyarrow).")
+
+
+def _category():
+    # Pay codes, schedules and group values repeat on nearly every row
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def archive_schema():
+    _require_pyarrow()
+    fields = [
+        pa.field("record_id", pa.string()),
+        pa.field("employee", _category()),
+        pa.field("work_date", pa.date32()),
+        pa.field("pay_period_start", pa.date32()),
+        pa.field("pay_period_end", pa.date32()),
+        pa.field("time_in", pa.timestamp("s")),
+        pa.field("time_out", pa.timestamp("s")),
+        pa.field("pay_code", _category()),
+        *(pa.field(column, pa.float64()) for column, _ in _HOUR_FIELDS),
+        *(pa.field(column, pa.string()) for column, _ in _TEXT_FIELDS),
+        pa.field("schedule", _category()),
+    ]
+    for number in ARCHIVE_GROUPS:
+        fields += [pa.field(f"group_{number}", _category()), pa.field(f"group_{number}_desc", _category())]
+    fields.append(pa.field("fetched_at", pa.timestamp("s")))
+    return pa.schema(fields)
+
+
+def _date_of(value):
+    parsed = parse_date(value) if value else None
+    return parsed.date() if parsed else None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _first_groups(rec):
+    """iGroupNumber -> the record's first (value, description), GroupValueList before GroupingList."""
+    groups = {}
+    for source in ("GroupValueList", "GroupingList"):
+        for grp in rec.get(source) or ():
+            number = grp.get("iGroupNumber")
+            if number in ARCHIVE_GROUPS and number not in groups and grp.get("cGroupValue") is not None:
+                groups[number] = (str(grp["cGroupValue"]), grp.get("cGroupValueDescription"))
+    return groups
+
+
+def archive_row(rec, rec_id, employee, fetched_at):
+    """One DataList record (with its timesheet_store record id) as a dict of archive_schema() columns."""
+    work_date = _date_of(rec.get("dWorkDate"))
+    period_start, period_end = _date_of(rec.get("dPayPeriodStart")), _date_of(rec.get("dPayPeriodEnd"))
+    if not (period_start and period_end) and work_date:
+        period_start, period_end = pay_period_for(work_date)
+    row = {
+        "record_id": rec_id,
+        "employee": employee,
+        "work_date": work_date,
+        "pay_period_start": period_start,
+        "pay_period_end": period_end,
+        "time_in": parse_datetime(rec.get("dIn")) if rec.get("dIn") else None,
+        "time_out": parse_datetime(rec.get("dOut")) if rec.get("dOut") else None,
+        "pay_code": _text(rec.get("cPayCodeDescription")),
+        "schedule": _text(rec.get("cSchedule")),
+        "fetched_at": fetched_at,
+    }
+    for column, field in _HOUR_FIELDS:
+        row[column] = _float(rec.get(field))
+    for column, field in _TEXT_FIELDS:
+        row[column] = _text(rec.get(field))
+    groups = _first_groups(rec)
+    for number in ARCHIVE_GROUPS:
+        row[f"group_{number}"], row[f"group_{number}_desc"] = groups.get(number, (None, None))
+    return row
+
+
+def _table(rows, schema):
+    return pa.table({field.name: pa.array([row[field.name] for row in rows], type=field.type) for field in schema},
+                    schema=schema)
+
+
+def _employee_file(employee):
+    return (re.sub(r"[^A-Za-z0-9._-]", "_", employee) or "_") + ".parquet"
+
+
+def partition_path(period_start, employee, archive_dir=None):
+    archive_dir = archive_dir or ARCHIVE_DIR
+    return os.path.join(archive_dir, f"year={period_start.year}", f"pay_period={period_start.isoformat()}",
+                        _employee_file(employee))
+
+
+def _write_partition(path, table):
+    """Writes via a hidden temp file + rename (atomic_write), so readers never open a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path, binary=True) as f:
+        pq.write_table(table, f, compression=PARQUET_COMPRESSION)
+
+
+def _archive(identified, employee, archive_dir, replace_periods):
+    """Writes (record id, record) pairs into their pay periods' files. Returns the number archived."""
+    _require_pyarrow()
+    fetched_at = datetime.now().replace(microsecond=0)
+    schema = archive_schema()
+    by_period = {}
+    for rec_id, rec in identified:
+        row = archive_row(rec, rec_id, employee, fetched_at)
+        if row["pay_period_start"] is not None:
+            by_period.setdefault(row["pay_period_start"], []).append(row)
+
+    for period_start, rows in by_period.items():
+        path = partition_path(period_start, employee, archive_dir)
+        table = _table(rows, schema)
+        if os.path.exists(path) and not replace_periods:
+            kept = pq.read_table(path, schema=schema)
+            fresh_ids = pa.array(list({row["record_id"] for row in rows}), type=pa.string())
+            kept = kept.filter(pc.invert(pc.is_in(kept["record_id"], value_set=fresh_ids)))
+            table = pa.concat_tables([kept, table]).unify_dictionaries()
+        table = table.sort_by([("work_date", "ascending"), ("time_out", "ascending")])
+        _write_partition(path, table)
+    return sum(len(rows) for rows in by_period.values())
+
+
+def archive_records(records, employee=None, archive_dir=None, replace_periods=False):
+    """
+    Merges DataList records into their pay periods' Parquet files, replacing rows with the same
+    record id as the timesheet database assigns it. With `replace_periods` the records are a
+    complete fetch of their pay periods and each file is rewritten from them alone, so records
+    removed upstream disappear. Returns the number of records archived.
+    """
+    employee = employee or DEFAULT_EMPLOYEE
+    assign_id = record_ids(employee)
+    return _archive(((assign_id(rec), rec) for rec in records), employee, archive_dir, replace_periods)
+
+
+def archive_from_store(conn, employee=None, archive_dir=None):
+    """
+    Rewrites the file of every pay period held in the timesheet database from its stored records,
+    one period in memory at a time.
+    """
+    employee = employee or DEFAULT_EMPLOYEE
+    periods = [row[0] for row in conn.execute(
+        "SELECT DISTINCT pay_period_start FROM records WHERE employee = ? AND pay_period_start IS NOT NULL"
+        " ORDER BY pay_period_start", (employee,))]
+    count = 0
+    for period_start in periods:
+        stored = conn.execute("SELECT record_id, data FROM records WHERE employee = ? AND pay_period_start = ?"
+                              " ORDER BY work_date, time_out", (employee, period_start))
+        count += _archive(((rec_id, json.loads(data)) for rec_id, data in stored), employee, archive_dir,
+                          replace_periods=True)
+    return count
+
+
+def _partition_value(name, key):
+    prefix = f"{key}="
+    return name[len(prefix):] if name.startswith(prefix) else None
+
+
+def archive_files(start=None, end=None, employee=None, archive_dir=None):
+    """
+    Partition files that can hold work dates from `start` to `end` (dates, either optional),
+    oldest first. Whole years and pay periods outside the range are skipped by name, unopened.
+    """
+    archive_dir = archive_dir or ARCHIVE_DIR
+    file_name = _employee_file(employee or DEFAULT_EMPLOYEE)
+    first_period = pay_period_for(start)[0] if start else None
+    files = []
+    if not os.path.isdir(archive_dir):
+        return files
+    for year_dir in sorted(os.listdir(archive_dir)):
+        year = _partition_value(year_dir, "year")
+        if not (year and year.isdigit()):
+            continue
+        if (first_period and int(year) < first_period.year) or (end and int(year) > end.year):
+            continue
+        year_path = os.path.join(archive_dir, year_dir)
+        for period_dir in sorted(os.listdir(year_path)):
+            period = _partition_value(period_dir, "pay_period")
+            try:
+                period_start = date.fromisoformat(period)
+            except (TypeError, ValueError):
+                continue
+            if (first_period and period_start < first_period) or (end and period_start > end):
+                continue
+            path = os.path.join(year_path, period_dir, file_name)
+            if os.path.exists(path):
+                files.append(path)
+    return files
+
+
+def read_archive(start=None, end=None, columns=None, employee=None, archive_dir=None):
+    """
+    Archived records with work dates from `start` to `end` as a DataFrame, reading only
+    `columns` (default all) from the pay periods in range. Dates and timestamps come back as
+    datetime64, hours as float64 and dictionary columns as pandas categoricals.
+    """
+    _require_pyarrow()
+    schema = archive_schema()
+    columns = list(columns) if columns else schema.names
+    filters = []
+    if start:
+        filters.append(("work_date", ">=", start))
+    if end:
+        filters.append(("work_date", "<=", end))
+    files = archive_files(start, end, employee, archive_dir)
+    if not files:
+        return schema.empty_table().select(columns).to_pandas(date_as_object=False)
+    # The partition values are columns of every file already, so directory names are not parsed again
+    dataset = pq.ParquetDataset(files, schema=schema, filters=filters or None, partitioning=None)
+    return dataset.read(columns=columns).unify_dictionaries().to_pandas(date_as_object=False)
+
+
+def _parse_day(value):
+    return datetime.strptime(value, "%m/%d/%Y").date() if value else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or summarize the Parquet timesheet archive.")
+    parser.add_argument("--start", help="first work date (MM/DD/YYYY)")
+    parser.add_argument("--end", help="last work date (MM/DD/YYYY)")
+    parser.add_argument("--employee", help="NovaTime username the records were fetched with")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="archive directory")
+    parser.add_argument("--from-db", nargs="?", const=TIMESHEET_DB, metavar="DB",
+                        help="(re)build the archive from the timesheet database first")
+    args = parser.parse_args()
+
+    if args.from_db:
+        build_start = time.perf_counter()
+        store = open_store(args.from_db)
+        try:
+            archived = archive_from_store(store, args.employee, args.archive)
+        finally:
+            store.close()
+        print(f"📦 Archived {archived} records from {args.from_db} in {time.perf_counter() - build_start:.2f}s")
+
+    query_start = time.perf_counter()
+    frame = read_archive(_parse_day(args.start), _parse_day(args.end),
+                         columns=["pay_period_start", "pay_period_end", "total_hours", "ot1_hours", "ot2_hours"],
+                         employee=args.employee, archive_dir=args.archive)
+    elapsed_ms = (time.perf_counter() - query_start) * 1000
+    periods = frame.groupby(["pay_period_start", "pay_period_end"])[["total_hours", "ot1_hours", "ot2_hours"]].sum()
+    for (period_start, period_end), totals in periods.iterrows():
+        print(f"{period_start:%m/%d/%Y} - {period_end:%m/%d/%Y}: {totals['total_hours']:8.2f} h "
+              f"(OT-1 {totals['ot1_hours']:.2f}, OT-2 {totals['ot2_hours']:.2f})")
+    print(f"🔎 {len(frame)} records in {len(periods)} pay periods, "
+          f"{frame['total_hours'].sum():.2f} total hours ({elapsed_ms:.1f} ms)")
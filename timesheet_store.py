@@ -0,0 +1,448 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from dotenv import load_dotenv
+from novatime_api import pay_period_for, record_identity
+from novatime_time import parse_date, parse_datetime
+
+# --- Load environment variables from .env ---
+load_dotenv()
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TIMESHEET_DB = os.getenv("TIMESHEET_DB", os.path.join(SCRIPT_DIR, "timesheets.db"))
+# Records upserted per transaction
+STORE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", "5000"))
+# Every fetch lands in the database; timesheet JSON/CSV files are optional exports on top of it
+EXPORT_FILES = os.getenv("EXPORT_FILES", "true").lower() == "true"
+# Records are stored per login so team runs never mix employees
+DEFAULT_EMPLOYEE = os.getenv("NOVATIME_USERNAME", "")
+
+# PRAGMA user_version of the current layout; 1: records keyed by record_identity() instead of record_key()
+SCHEMA_VERSION = 1
+
+# Dates are stored as ISO strings so range queries are plain index scans
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_id        TEXT PRIMARY KEY,
+    employee         TEXT NOT NULL,
+    work_date        TEXT,
+    pay_period_start TEXT,
+    pay_period_end   TEXT,
+    time_in          TEXT,
+    time_out         TEXT,
+    pay_code         TEXT,
+    total_hours      REAL,
+    data             TEXT NOT NULL,
+    fetched_at       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_work_date ON records (employee, work_date, time_out);
+CREATE INDEX IF NOT EXISTS idx_records_pay_period ON records (employee, pay_period_start);
+
+CREATE TABLE IF NOT EXISTS record_groups (
+    record_id    TEXT NOT NULL,
+    group_number INTEGER NOT NULL,
+    group_value  TEXT NOT NULL,
+    group_desc   TEXT,
+    PRIMARY KEY (record_id, group_number, group_value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_record_groups_value ON record_groups (group_number, group_value);
+
+-- Materialized from records and kept current by every upsert (see _refresh_totals)
+CREATE TABLE IF NOT EXISTS daily_totals (
+    employee         TEXT NOT NULL,
+    work_date        TEXT NOT NULL,
+    pay_period_start TEXT,
+    punches          INTEGER NOT NULL,
+    open_punches     INTEGER NOT NULL,
+    total_hours      REAL NOT NULL,
+    reg_hours        REAL NOT NULL,
+    ot1_hours        REAL NOT NULL,
+    ot2_hours        REAL NOT NULL,
+    reported_daily   REAL,
+    reported_weekly  REAL,
+    PRIMARY KEY (employee, work_date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS period_totals (
+    employee         TEXT NOT NULL,
+    pay_period_start TEXT NOT NULL,
+    pay_period_end   TEXT,
+    days             INTEGER NOT NULL,
+    punches          INTEGER NOT NULL,
+    open_punches     INTEGER NOT NULL,
+    total_hours      REAL NOT NULL,
+    reg_hours        REAL NOT NULL,
+    ot1_hours        REAL NOT NULL,
+    ot2_hours        REAL NOT NULL,
+    reported_weekly  REAL,
+    PRIMARY KEY (employee, pay_period_start)
+) WITHOUT ROWID;
+"""
+
+_UPSERT_RECORD = """
+INSERT INTO records (record_id, employee, work_date, pay_period_start, pay_period_end,
+                     time_in, time_out, pay_code, total_hours, data, fetched_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (record_id) DO UPDATE SET
+    work_date = excluded.work_date,
+    pay_period_start = excluded.pay_period_start,
+    pay_period_end = excluded.pay_period_end,
+    time_in = excluded.time_in,
+    time_out = excluded.time_out,
+    pay_code = excluded.pay_code,
+    total_hours = excluded.total_hours,
+    data = excluded.data,
+    fetched_at = excluded.fetched_at
+"""
+
+# Hours come from the stored JSON, so databases created before the totals tables need no migration
+_HOURS = "COALESCE(CAST(json_extract(data, '$.{}') AS REAL), 0)"
+
+# The day's last non-empty value of a field, by Out punch (open punches sort first)
+_LAST_REPORTED = """(SELECT CAST(json_extract(last.data, '$.{0}') AS REAL) FROM records last
+     WHERE last.employee = r.employee AND last.work_date = r.work_date
+       AND json_extract(last.data, '$.{0}') IS NOT NULL
+     ORDER BY last.time_out DESC LIMIT 1)"""
+
+_REFRESH_DAY = f"""
+INSERT OR REPLACE INTO daily_totals
+SELECT r.employee, r.work_date, MIN(r.pay_period_start), COUNT(*), SUM(r.time_out IS NULL),
+       SUM(COALESCE(r.total_hours, 0)), SUM({_HOURS.format("nWorkHours")}),
+       SUM({_HOURS.format("nOT1Hours")}), SUM({_HOURS.format("nOT2Hours")}),
+       {_LAST_REPORTED.format("nDailyHours")}, {_LAST_REPORTED.format("nWeeklyHours")}
+FROM records r
+WHERE r.employee = ? AND r.work_date = ?
+GROUP BY r.employee, r.work_date
+"""
+
+_REFRESH_PERIOD = """
+INSERT OR REPLACE INTO period_totals
+SELECT d.employee, d.pay_period_start,
+       (SELECT MAX(pay_period_end) FROM records WHERE employee = d.employee AND pay_period_start = d.pay_period_start),
+       COUNT(*), SUM(d.punches), SUM(d.open_punches), SUM(d.total_hours), SUM(d.reg_hours),
+       SUM(d.ot1_hours), SUM(d.ot2_hours),
+       (SELECT last.reported_weekly FROM daily_totals last
+        WHERE last.employee = d.employee AND last.pay_period_start = d.pay_period_start
+          AND last.reported_weekly IS NOT NULL
+        ORDER BY last.work_date DESC LIMIT 1)
+FROM daily_totals d
+WHERE d.employee = ? AND d.pay_period_start = ?
+GROUP BY d.employee, d.pay_period_start
+"""
+
+_INSERT_GROUP = "INSERT OR IGNORE INTO record_groups (record_id, group_number, group_value, group_desc) VALUES (?, ?, ?, ?)"
+
+
+def open_store(path=None):
+    """Opens (creating if needed) the timesheet database in WAL mode."""
+    path = path or TIMESHEET_DB
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    # Team runs write from several threads; wait for the writer lock instead of failing
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Record ids are hashes, so index pages are hit at random; keep them in memory
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.executescript(SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        _rekey_records(conn)
+    elif conn.execute("SELECT EXISTS (SELECT 1 FROM records) AND NOT EXISTS (SELECT 1 FROM daily_totals)").fetchone()[0]:
+        # Records stored before the totals tables existed
+        rebuild_totals(conn)
+    return conn
+
+
+def record_id(rec, employee=None, occurrence=0):
+    """
+    Stable primary key: the employee plus novatime_api.record_identity(), so a punch keeps its id
+    when it is closed or its hours change. `occurrence` tells apart lines of one fetch that share
+    an identity (e.g. two lines of the same pay code without an In punch).
+    """
+    identity = (employee or DEFAULT_EMPLOYEE, *record_identity(rec))
+    if occurrence:
+        identity += (occurrence,)
+    return hashlib.sha1(repr(identity).encode("utf-8")).hexdigest()
+
+
+def record_ids(employee=None):
+    """Returns a function giving each record of one fetch, in order, its record_id()."""
+    seen = Counter()
+
+    def assign(rec):
+        identity = record_identity(rec)
+        occurrence = seen[identity]
+        seen[identity] += 1
+        return record_id(rec, employee, occurrence)
+    return assign
+
+
+def _rekey_records(conn):
+    """
+    Moves records stored under an older key to record_id(). Rows that now share an id are
+    versions of one record (e.g. a punch stored open, then closed): the last fetched one is kept.
+    """
+    stored = conn.execute("SELECT record_id, employee, data, fetched_at FROM records ORDER BY fetched_at, rowid")
+    new_ids, assigners = {}, {}
+    for old_id, employee, data, fetched_at in stored.fetchall():
+        # Occurrences are counted per fetch, as iter_upsert() counts them
+        assign = assigners.setdefault((employee, fetched_at), record_ids(employee))
+        new_ids[assign(json.loads(data))] = old_id
+    kept = set(new_ids.values())
+    with conn:
+        stale = [(old_id,) for (old_id,) in conn.execute("SELECT record_id FROM records") if old_id not in kept]
+        conn.executemany("DELETE FROM records WHERE record_id = ?", stale)
+        conn.executemany("DELETE FROM record_groups WHERE record_id = ?", stale)
+        for new_id, old_id in new_ids.items():
+            conn.execute("UPDATE records SET record_id = ? WHERE record_id = ?", (new_id, old_id))
+            conn.execute("UPDATE record_groups SET record_id = ? WHERE record_id = ?", (new_id, old_id))
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    rebuild_totals(conn)
+
+
+@lru_cache(maxsize=4096)
+def _iso_date(value):
+    parsed = parse_date(value) if value else None
+    return parsed.date().isoformat() if parsed else None
+
+
+@lru_cache(maxsize=4096)
+def _pay_period_iso(work_date):
+    start, end = pay_period_for(datetime.strptime(work_date, "%Y-%m-%d").date())
+    return start.isoformat(), end.isoformat()
+
+
+def _iso_datetime(value):
+    parsed = parse_datetime(value) if value else None
+    return parsed.isoformat(sep=" ") if parsed else None
+
+
+def _public_fields(rec):
+    """The record as NovaTime sent it: private keys (e.g. parsed _timestamps) are dropped."""
+    return {key: value for key, value in rec.items() if not key.startswith("_")}
+
+
+def _record_row(rec, rec_id, employee, fetched_at):
+    work_date = _iso_date(rec.get("dWorkDate"))
+    period_start = _iso_date(rec.get("dPayPeriodStart"))
+    period_end = _iso_date(rec.get("dPayPeriodEnd"))
+    if not (period_start and period_end) and work_date:
+        period_start, period_end = _pay_period_iso(work_date)
+    try:
+        total_hours = float(rec.get("nTotalHours"))
+    except (TypeError, ValueError):
+        total_hours = None
+    return (
+        rec_id, employee, work_date, period_start, period_end,
+        _iso_datetime(rec.get("dIn")), _iso_datetime(rec.get("dOut")),
+        rec.get("cPayCodeDescription"), total_hours,
+        json.dumps(_public_fields(rec), separators=(",", ":")), fetched_at,
+    )
+
+
+def _group_rows(rec, rec_id):
+    for source in ("GroupingList", "GroupValueList"):
+        for grp in rec.get(source) or ():
+            if grp.get("iGroupNumber") is not None and grp.get("cGroupValue") is not None:
+                yield rec_id, grp["iGroupNumber"], str(grp["cGroupValue"]), grp.get("cGroupValueDescription")
+
+
+def _refresh_totals(conn, days, periods):
+    """
+    Recomputes the daily_totals rows of the given (employee, work_date) pairs from their records,
+    then the period_totals rows of the given (employee, pay_period_start) pairs from daily_totals.
+    """
+    days = sorted({day for day in days if day[1]})
+    periods = sorted({period for period in periods if period[1]})
+    # Deleted first: a day or period whose records are all gone keeps no row
+    conn.executemany("DELETE FROM daily_totals WHERE employee = ? AND work_date = ?", days)
+    conn.executemany(_REFRESH_DAY, days)
+    conn.executemany("DELETE FROM period_totals WHERE employee = ? AND pay_period_start = ?", periods)
+    conn.executemany(_REFRESH_PERIOD, periods)
+
+
+def rebuild_totals(conn):
+    """Recomputes daily_totals and period_totals from every stored record."""
+    with conn:
+        conn.execute("DELETE FROM daily_totals")
+        conn.execute("DELETE FROM period_totals")
+        _refresh_totals(conn, conn.execute("SELECT DISTINCT employee, work_date FROM records").fetchall(),
+                        conn.execute("SELECT DISTINCT employee, pay_period_start FROM records").fetchall())
+
+
+def _drop_missing(conn, employee, fetched_ids):
+    """
+    Deletes the records of fully fetched pay periods ({pay_period_start: record ids}) that the
+    fetch no longer returned, i.e. that were removed upstream. Returns their (work_date, pay_period_start).
+    """
+    stale = []
+    for period_start, ids in fetched_ids.items():
+        for rec_id, work_date in conn.execute(
+                "SELECT record_id, work_date FROM records WHERE employee = ? AND pay_period_start = ?",
+                (employee, period_start)):
+            if rec_id not in ids:
+                stale.append((rec_id, work_date, period_start))
+    conn.executemany("DELETE FROM records WHERE record_id = ?", ((rec_id,) for rec_id, _, _ in stale))
+    conn.executemany("DELETE FROM record_groups WHERE record_id = ?", ((rec_id,) for rec_id, _, _ in stale))
+    return [(work_date, period_start) for _, work_date, period_start in stale]
+
+
+def _write_batch(conn, rows, groups, employee=None, complete_periods=None):
+    """Upserts one batch; with `complete_periods` (see _drop_missing) it also removes what they no longer hold."""
+    with conn:
+        conn.executemany(_UPSERT_RECORD, rows)
+        # A record's groups are replaced wholesale on every upsert
+        conn.executemany("DELETE FROM record_groups WHERE record_id = ?", ((row[0],) for row in rows))
+        conn.executemany(_INSERT_GROUP, groups)
+        days = [(row[1], row[2]) for row in rows]
+        periods = [(row[1], row[3]) for row in rows]
+        if complete_periods:
+            for work_date, period_start in _drop_missing(conn, employee, complete_periods):
+                days.append((employee, work_date))
+                periods.append((employee, period_start))
+        # Only the days and pay periods this batch touched are recomputed
+        _refresh_totals(conn, days, periods)
+
+
+def iter_upsert(conn, records, employee=None, batch_size=None, replace_periods=False):
+    """
+    Yields `records` unchanged while upserting them in batched transactions, so a streaming
+    export can feed the store without holding the whole DataList in memory. With
+    `replace_periods` the records are a complete fetch of their pay periods: stored records of
+    those periods that are not among them are deleted along with the last batch.
+    """
+    employee = employee or DEFAULT_EMPLOYEE
+    batch_size = batch_size or STORE_BATCH_SIZE
+    fetched_at = datetime.now().isoformat(timespec="seconds")
+    assign_id = record_ids(employee)
+    fetched_ids = {}
+    rows, groups = [], []
+    for rec in records:
+        row = _record_row(rec, assign_id(rec), employee, fetched_at)
+        rows.append(row)
+        groups.extend(_group_rows(rec, row[0]))
+        if replace_periods and row[3]:
+            fetched_ids.setdefault(row[3], set()).add(row[0])
+        if len(rows) >= batch_size:
+            _write_batch(conn, rows, groups)
+            rows, groups = [], []
+        yield rec
+    if rows or fetched_ids:
+        _write_batch(conn, rows, groups, employee, fetched_ids)
+
+
+def store_records(records, employee=None, path=None, replace_periods=False):
+    """
+    Upserts a list of DataList records into the timesheet database. Returns the number stored.
+    Pass `replace_periods` when the records are everything NovaTime has for their pay periods
+    (e.g. a current pay period fetch), so records removed upstream are removed here too.
+    """
+    conn = open_store(path)
+    try:
+        count = sum(1 for _ in iter_upsert(conn, records, employee, replace_periods=replace_periods))
+    finally:
+        conn.close()
+    print(f"🗄️ Stored {count} records in {path or TIMESHEET_DB}")
+    return count
+
+
+def _date_param(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def query_records(conn, start=None, end=None, employee=None, pay_period_start=None, group=None):
+    """
+    Returns stored DataList records ordered by work date and Out punch. Filters are optional:
+    a work date range (dates or ISO strings), one pay period by its start, and/or a group as
+    (iGroupNumber, cGroupValue).
+    """
+    sql = "SELECT r.data FROM records r"
+    where, params = ["r.employee = ?"], [employee or DEFAULT_EMPLOYEE]
+    if group is not None:
+        sql += " JOIN record_groups g ON g.record_id = r.record_id"
+        where += ["g.group_number = ?", "g.group_value = ?"]
+        params += [group[0], str(group[1])]
+    if start is not None:
+        where.append("r.work_date >= ?")
+        params.append(_date_param(start))
+    if end is not None:
+        where.append("r.work_date <= ?")
+        params.append(_date_param(end))
+    if pay_period_start is not None:
+        where.append("r.pay_period_start = ?")
+        params.append(_date_param(pay_period_start))
+    sql += " WHERE " + " AND ".join(where) + " ORDER BY r.work_date, r.time_out"
+    return [json.loads(data) for (data,) in conn.execute(sql, params)]
+
+
+def _query_totals(conn, table, date_column, start, end, employee):
+    sql = f"SELECT * FROM {table} WHERE employee = ?"
+    params = [employee or DEFAULT_EMPLOYEE]
+    if start is not None:
+        sql += f" AND {date_column} >= ?"
+        params.append(_date_param(start))
+    if end is not None:
+        sql += f" AND {date_column} <= ?"
+        params.append(_date_param(end))
+    cursor = conn.execute(sql + f" ORDER BY {date_column}", params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+def query_daily_totals(conn, start=None, end=None, employee=None):
+    """
+    Per work day from `start` to `end`: punches, open punches (no Out), total/Reg/OT-1/OT-2 hours
+    summed over the day's records and the day's last reported Daily and Weekly Hours. One dict per day.
+    """
+    return _query_totals(conn, "daily_totals", "work_date", start, end, employee)
+
+
+def query_period_totals(conn, start=None, end=None, employee=None):
+    """Like query_daily_totals() rolled up per pay period, for the periods starting from `start` to `end`."""
+    return _query_totals(conn, "period_totals", "pay_period_start", start, end, employee)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the local timesheet database.")
+    parser.add_argument("--start", help="first work date (MM/DD/YYYY)")
+    parser.add_argument("--end", help="last work date (MM/DD/YYYY)")
+    parser.add_argument("--employee", help="NovaTime username the records were fetched with")
+    parser.add_argument("--group", help="only records with this group value, as NUMBER=VALUE (e.g. 12=4100)")
+    parser.add_argument("--db", default=TIMESHEET_DB, help="database path")
+    parser.add_argument("--periods", action="store_true", help="print the totals of every pay period in range")
+    args = parser.parse_args()
+
+    start_date = datetime.strptime(args.start, "%m/%d/%Y").date() if args.start else None
+    end_date = datetime.strptime(args.end, "%m/%d/%Y").date() if args.end else None
+    group_filter = None
+    if args.group:
+        number, _, value = args.group.partition("=")
+        group_filter = (int(number), value)
+
+    store = open_store(args.db)
+    query_start = time.perf_counter()
+    if group_filter:
+        # Group values are per record, so this one needs the raw records
+        found = query_records(store, start_date, end_date, employee=args.employee, group=group_filter)
+        elapsed_ms = (time.perf_counter() - query_start) * 1000
+        hours = sum(float(rec.get("nTotalHours") or 0) for rec in found)
+        print(f"🔎 {len(found)} records, {hours:.2f} total hours ({elapsed_ms:.1f} ms)")
+    else:
+        days = query_daily_totals(store, start_date, end_date, employee=args.employee)
+        periods = query_period_totals(store, start_date and pay_period_for(start_date)[0], end_date,
+                                      employee=args.employee) if args.periods else []
+        elapsed_ms = (time.perf_counter() - query_start) * 1000
+        for period in periods:
+            print(f"{period['pay_period_start']} - {period['pay_period_end']}: {period['total_hours']:8.2f} h "
+                  f"(Reg {period['reg_hours']:.2f}, OT-1 {period['ot1_hours']:.2f}, OT-2 {period['ot2_hours']:.2f}) "
+                  f"over {period['days']} days, {period['punches']} records")
+        records = sum(day["punches"] for day in days)
+        hours = sum(day["total_hours"] for day in days)
+        print(f"🔎 {records} records on {len(days)} days, {hours:.2f} total hours ({elapsed_ms:.1f} ms)")
+    store.close()